@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+
+#  Copyright (c) 2010 Franz Allan Valencia See
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""
+Benchmarks the DatabaseLibrary keywords against a generated sqlite3 database.
+
+For every scale (number of rows in the generated table), each benchmark calls
+a keyword repeatedly for `--duration` seconds (but at least `--min-calls`
+times) and reports its throughput, its latency percentiles and the peak
+resident memory of the process running it: every benchmark runs in a fresh
+process of its own, so that its memory is not hidden by the peak of the
+benchmarks run before it. The data and the statements are generated from
+`--seed`, so two runs do the same work.
+
+Usage:
+    python benchmarks/benchmark.py [--scales 1000,100000,10000000]
+                                   [--output results.json]
+                                   [--baseline baseline.json] [--threshold 0.2]
+
+With `--baseline`, the throughput of every benchmark is compared with the
+same benchmark in a file written earlier with `--output`, and the script
+exits with status 1 if any is more than `--threshold` (a fraction) slower.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from DatabaseLibrary import DatabaseLibrary
+
+DEFAULT_SCALES = '1000,100000,10000000'
+CATEGORIES = 100
+LOAD_CHUNK_SIZE = 10000
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks the DatabaseLibrary keywords against sqlite3.')
+    parser.add_argument('--scales', default=DEFAULT_SCALES,
+                        help='comma separated numbers of rows to generate (default: %(default)s)')
+    parser.add_argument('--duration', type=float, default=2.0,
+                        help='seconds to spend on each benchmark (default: %(default)s)')
+    parser.add_argument('--min-calls', type=int, default=5,
+                        help='minimum number of calls of each benchmark (default: %(default)s)')
+    parser.add_argument('--script-statements', type=int, default=10000,
+                        help='number of statements of the generated SQL script (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='file to write the results to, as JSON')
+    parser.add_argument('--baseline', help='results written earlier with --output to compare with')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='largest accepted throughput loss against the baseline (default: %(default)s)')
+    parser.add_argument('--work-dir', help='directory for the generated files (default: a temporary one)')
+    arguments = parser.parse_args()
+
+    workDir = arguments.work_dir or tempfile.mkdtemp(prefix='dblib-benchmark-')
+    try:
+        results = []
+        for scale in [int(scale) for scale in arguments.scales.split(',')]:
+            results.extend(run_scale(scale, workDir, arguments))
+    finally:
+        if not arguments.work_dir:
+            shutil.rmtree(workDir, ignore_errors=True)
+
+    report = {'python': platform.python_version(), 'sqlite': sqlite3.sqlite_version,
+              'platform': platform.platform(), 'seed': arguments.seed, 'results': results}
+    if arguments.output:
+        with open(arguments.output, 'w') as outputFile:
+            json.dump(report, outputFile, indent=2)
+    if arguments.baseline:
+        with open(arguments.baseline) as baselineFile:
+            baseline = json.load(baselineFile)
+        if compare(baseline['results'], results, arguments.threshold):
+            sys.exit(1)
+
+def run_scale(scale, workDir, arguments):
+    """
+    Generates a database of `scale` rows and runs every benchmark on it.
+    """
+    databaseFile = os.path.join(workDir, 'benchmark_%d.db' % scale)
+    scriptFile = os.path.join(workDir, 'benchmark_script.sql')
+    generate_database(databaseFile, scale, arguments.seed)
+    generate_script(scriptFile, arguments.script_statements)
+
+    # The calls only use the library when they are called, so the names can
+    # be listed without one.
+    names = [name for name, call in benchmark_calls(None, scale, databaseFile, scriptFile, arguments.seed)]
+    pool = multiprocessing.get_context('spawn').Pool(1, maxtasksperchild=1)
+    results = []
+    try:
+        for name in names:
+            result = pool.apply(run_benchmark, (name, scale, databaseFile, scriptFile, arguments.seed,
+                                                arguments.duration, arguments.min_calls))
+            results.append(result)
+            print('%10d %-32s %10.1f ops/s  p50 %9.3f ms  p95 %9.3f ms  p99 %9.3f ms  rss %7.1f MB'
+                  % (scale, name, result['throughput'], result['p50'] * 1000, result['p95'] * 1000,
+                     result['p99'] * 1000, result['peakRss'] / 1048576.0))
+            sys.stdout.flush()
+    finally:
+        pool.close()
+        pool.join()
+        os.remove(databaseFile)
+    return results
+
+def run_benchmark(name, scale, databaseFile, scriptFile, seed, duration, minCalls):
+    """
+    Runs the benchmark `name` on its own connection and returns its result,
+    in the process of a worker that runs nothing else.
+    """
+    library = DatabaseLibrary(slowQueryThreshold=None)
+    library.connect_to_database_using_custom_params('sqlite3', "database=%r" % databaseFile)
+    try:
+        call = dict(benchmark_calls(library, scale, databaseFile, scriptFile, seed))[name]
+        result = measure(call, duration, minCalls)
+        result.update({'scale': scale, 'benchmark': name})
+        return result
+    finally:
+        library.disconnect_from_all_databases()
+
+def benchmark_calls(library, scale, databaseFile, scriptFile, seed):
+    """
+    Returns the (name, call) pairs of the benchmarks run with `library`.
+    """
+    connectString = "database=%r" % databaseFile
+    randomIds = random.Random(seed)
+    categoryRows = scale // CATEGORIES
+
+    def some_id():
+        return randomIds.randint(1, scale)
+
+    def some_category():
+        return randomIds.randint(0, CATEGORIES - 1)
+
+    def execute_script():
+        library.execute_sql_script(scriptFile)
+        library.execute_sql_string('DELETE FROM bench_script')
+
+    def connect_and_disconnect():
+        library.connect_to_database_using_custom_params('sqlite3', connectString, alias='churn')
+        library.query('SELECT 1', alias='churn')
+        library.disconnect_from_database('churn')
+
+    return [
+        ('query_by_id', lambda: library.query('SELECT * FROM bench WHERE id = %d' % some_id())),
+        ('query_by_id_with_parameters', lambda: library.query('SELECT * FROM bench WHERE id = ?', parameters=[some_id()])),
+        ('query_category', lambda: library.query('SELECT * FROM bench WHERE category = %d' % some_category())),
+        ('query_first_100_rows', lambda: library.query('SELECT * FROM bench WHERE category = %d' % some_category(), maxRows=100)),
+        ('row_count', lambda: library.row_count('SELECT * FROM bench WHERE category = %d' % some_category())),
+        ('row_count_of_table', lambda: library.row_count('SELECT * FROM bench')),
+        ('check_if_exists_in_database', lambda: library.check_if_exists_in_database(
+            'SELECT * FROM bench WHERE id = %d' % some_id())),
+        ('check_if_not_exists_in_database', lambda: library.check_if_not_exists_in_database(
+            'SELECT * FROM bench WHERE id = %d' % (scale + some_id()))),
+        ('row_count_is_0', lambda: library.row_count_is_0('SELECT * FROM bench WHERE id = %d' % (scale + some_id()))),
+        ('row_count_is_equal_to_x', lambda: library.row_count_is_equal_to_x(
+            'SELECT * FROM bench WHERE category = %d' % some_category(), categoryRows)),
+        ('row_count_is_greater_than_x', lambda: library.row_count_is_greater_than_x('SELECT * FROM bench', 0)),
+        ('row_count_is_less_than_x', lambda: library.row_count_is_less_than_x('SELECT * FROM bench', scale + 1)),
+        ('execute_sql_script', execute_script),
+        ('connect_and_disconnect', connect_and_disconnect),
+    ]
+
+def measure(call, duration, minCalls):
+    """
+    Calls `call` for `duration` seconds, and at least `minCalls` times, and
+    returns its throughput and latency percentiles.
+    """
+    latencies = []
+    startTime = time.perf_counter()
+    endTime = startTime + duration
+    while len(latencies) < minCalls or time.perf_counter() < endTime:
+        callStart = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - callStart)
+    elapsed = time.perf_counter() - startTime
+    latencies.sort()
+    return {'calls': len(latencies), 'seconds': elapsed, 'throughput': len(latencies) / elapsed,
+            'p50': percentile(latencies, 50), 'p95': percentile(latencies, 95),
+            'p99': percentile(latencies, 99), 'peakRss': peak_rss()}
+
+def generate_database(databaseFile, scale, seed):
+    """
+    Writes a table of `scale` rows, generated from `seed`, to `databaseFile`.
+    The table is loaded with sqlite3 directly, as it is not being measured.
+    """
+    if os.path.exists(databaseFile):
+        os.remove(databaseFile)
+    values = random.Random(seed)
+    connection = sqlite3.connect(databaseFile)
+    try:
+        connection.execute('CREATE TABLE bench (id INTEGER PRIMARY KEY, category INTEGER NOT NULL, '
+                           'name TEXT NOT NULL, amount REAL NOT NULL)')
+        connection.execute('CREATE TABLE bench_script (id INTEGER, name TEXT)')
+        for start in range(1, scale + 1, LOAD_CHUNK_SIZE):
+            rows = [(rowId, rowId % CATEGORIES, 'name %d' % values.randint(0, 1000000), values.random() * 1000)
+                    for rowId in range(start, min(start + LOAD_CHUNK_SIZE, scale + 1))]
+            connection.executemany('INSERT INTO bench VALUES (?, ?, ?, ?)', rows)
+        connection.execute('CREATE INDEX bench_category ON bench (category)')
+        connection.commit()
+    finally:
+        connection.close()
+
+def generate_script(scriptFile, statements):
+    with open(scriptFile, 'w') as script:
+        script.write('-- generated by benchmark.py\n')
+        for number in range(statements):
+            script.write("INSERT INTO bench_script (id, name) VALUES (%d, 'row; %d');\n" % (number, number))
+
+def compare(baselineResults, results, threshold):
+    """
+    Prints the throughput of `results` against `baselineResults` and returns
+    whether any benchmark lost more than `threshold` of its throughput.
+    """
+    baseline = dict(((result['scale'], result['benchmark']), result) for result in baselineResults)
+    regressed = False
+    for result in results:
+        before = baseline.get((result['scale'], result['benchmark']))
+        if before is None:
+            continue
+        change = result['throughput'] / before['throughput'] - 1
+        marker = ''
+        if change < -threshold:
+            marker = '  REGRESSION'
+            regressed = True
+        print('%10d %-32s %10.1f -> %10.1f ops/s (%+.1f%%)%s'
+              % (result['scale'], result['benchmark'], before['throughput'], result['throughput'], change * 100, marker))
+    return regressed
+
+def percentile(sortedValues, percent):
+    return sortedValues[min(len(sortedValues) - 1, int(len(sortedValues) * percent / 100.0))]
+
+def peak_rss():
+    """
+    Returns the peak resident memory of the process so far, in bytes, which
+    is the peak of the benchmark run in it.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+if __name__ == '__main__':
+    main()
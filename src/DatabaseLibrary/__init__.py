@@ -15,10 +15,19 @@
 from DatabaseLibrary.connection_manager import ConnectionManager
 from DatabaseLibrary.query import Query
 from DatabaseLibrary.assertion import Assertion
+from DatabaseLibrary.bulk_insert import BulkInsert
+from DatabaseLibrary.comparison import Comparison
+from DatabaseLibrary.data_generator import DataGenerator
+from DatabaseLibrary.database_checks import DatabaseChecks
+from DatabaseLibrary.parallel_query import ParallelQuery
+from DatabaseLibrary.query_plan import QueryPlan
+from DatabaseLibrary.transaction import Transaction
+from DatabaseLibrary.wait import Wait
+from DatabaseLibrary.listener import LibraryListener
 
 __version__ = '0.6'
 
-class DatabaseLibrary(ConnectionManager, Query, Assertion):
+class DatabaseLibrary(ConnectionManager, Query, Assertion, BulkInsert, ParallelQuery, Transaction, Comparison, QueryPlan, Wait, DatabaseChecks, DataGenerator):
     """
     Database Library contains utilities meant for Robot Framework's usage.
     
@@ -64,3 +73,62 @@ class DatabaseLibrary(ConnectionManager, Query, Assertion):
     
     ROBOT_LIBRARY_SCOPE = 'GLOBAL'
 
+    def __init__(self, poolSize=8, maxConnectionAge=None, validationInterval=30, slowQueryThreshold=1, statisticsFile=None, isolateTests=False,
+                 sqlLogLevel='DEBUG', maxLoggedLength=1000, maxLoggedRows=10, brokerSocket=None, brokerPoolSize=8):
+        """
+        Database Library can be imported with optional arguments tuning its
+        connection pool: `poolSize` is the maximum number of connections
+        kept open at the same time, `maxConnectionAge` is the number of
+        seconds after which a connection is recycled (by default never), and
+        `validationInterval` is the number of idle seconds after which a
+        connection is checked before being used again.
+
+        Every statement is timed (see `Get Database Statistics`). Statements
+        taking at least `slowQueryThreshold` seconds (1 by default, `None`
+        to disable) are logged as warnings, and if `statisticsFile` is
+        given, the statistics are written to it at the end of the run, as
+        CSV if its name ends with `.csv` and as JSON otherwise.
+
+        With `isolateTests=True`, every test runs as if between `Begin
+        Isolated Test` and `Rollback Isolated Test` on the connection that
+        is current when it starts (so connect in the suite setup), undoing
+        its changes when it ends.
+
+        What is logged about statements and results is bounded, however
+        large they are: statements are logged at `sqlLogLevel` (`NONE` to
+        not log them) and only formatted if that level is logged, statements
+        longer than `maxLoggedLength` characters are cut and shown with
+        their length and MD5 hash, and failure messages show at most
+        `maxLoggedRows` rows of a result (only their number if 0). See `Set
+        Logging Policy` to change this for one connection.
+
+        With `brokerSocket`, the path of a Unix socket, connections are made
+        through a connection broker listening on it, which the library
+        launches as a separate process if it is not running yet. The broker
+        keeps at most `brokerPoolSize` connections per database, shared by
+        all the processes of the run (e.g. the workers of pabot), and stops a
+        minute after the last of them has disconnected. A connection keeps
+        the same database connection from its first statement until it
+        commits or rolls back. Features that need the connection of the
+        driver itself (server-side cursors and prepared statements, `COPY`,
+        notifications, SQLite backups and PostgreSQL template snapshots) are
+        not available through the broker: `Snapshot Database` dumps the
+        tables instead. Every connection of the broker to an SQLite
+        `:memory:` database is a different database.
+        The broker needs Unix domain sockets, so it is not available on
+        Windows.
+
+        Example usage:
+        | Library | DatabaseLibrary | |
+        | Library | DatabaseLibrary | poolSize=2 | maxConnectionAge=3600 |
+        | Library | DatabaseLibrary | slowQueryThreshold=0.5 | statisticsFile=${OUTPUT DIR}/db-statistics.json |
+        | Library | DatabaseLibrary | isolateTests=True | |
+        | Library | DatabaseLibrary | sqlLogLevel=INFO | maxLoggedLength=300 | maxLoggedRows=0 |
+        | Library | DatabaseLibrary | brokerSocket=/tmp/dblib-broker.sock | brokerPoolSize=4 |
+        """
+        ConnectionManager.__init__(self, poolSize, maxConnectionAge, validationInterval, slowQueryThreshold, statisticsFile,
+                                   sqlLogLevel, maxLoggedLength, maxLoggedRows, brokerSocket, brokerPoolSize)
+        Query.__init__(self)
+        Transaction.__init__(self, isolateTests)
+        self.ROBOT_LIBRARY_LISTENER = LibraryListener(self)
+
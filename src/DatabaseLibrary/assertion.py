@@ -12,12 +12,21 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 
+EXISTENCE_SAMPLE_SIZE = 5
+
 class Assertion(object):
     """
     Assertion handles all the assertions of Database Library.
+
+    Like the `Query` keywords, every assertion runs against the current
+    connection or against the connection registered under `alias`.
+
+    The `Check If *` and `Row Count Is *` assertions only look at as many
+    rows as they need to decide, e.g. `Check If Exists In Database` and
+    `Row Count Is Greater Than X` with 0 stop at the first row.
     """
 
-    def check_if_exists_in_database(self,selectStatement):
+    def check_if_exists_in_database(self, selectStatement, alias=None, parameters=None):
         """
         Check if any row would be returned by given the input 
         `selectStatement`. If there are no results, then this will 
@@ -35,11 +44,12 @@ class Assertion(object):
         | Check If Exists In Database | select id from person where first_name = 'Franz Allan' | # PASS |
         | Check If Exists In Database | select id from person where first_name = 'John' | # FAIL |          
         """
-        if not self.query(selectStatement):
-            raise AssertionError("Expected to have have at least one row from '%s' "
-                                 "but got 0 rows." % selectStatement)
+        failure = exists_failure(self._get_logging_policy(alias).sql(selectStatement),
+                                 self._exists(selectStatement, alias, parameters))
+        if failure is not None:
+            raise AssertionError(failure)
             
-    def check_if_not_exists_in_database(self,selectStatement):
+    def check_if_not_exists_in_database(self, selectStatement, alias=None, parameters=None):
         """
         This is the negation of `check_if_exists_in_database`.
         
@@ -58,13 +68,17 @@ class Assertion(object):
         Then you will get the following:
         | Check If Not Exists In Database | select id from person where first_name = 'John' | # PASS |          
         | Check If Not Exists In Database | select id from person where first_name = 'Franz Allan' | # FAIL |
+
+        Only the first few rows are fetched, and shown in the failure message
+        as far as the logging policy allows (see `Set Logging Policy`).
         """
-        queryResults = self.query(selectStatement) 
-        if queryResults:
-            raise AssertionError("Expected to have have no rows from '%s' "
-                                 "but got some rows : %s." % (selectStatement, queryResults))
+        queryResults = self._fetch_first_rows(selectStatement, alias, EXISTENCE_SAMPLE_SIZE, parameters)
+        loggingPolicy = self._get_logging_policy(alias)
+        failure = not_exists_failure(loggingPolicy.sql(selectStatement), queryResults, loggingPolicy)
+        if failure is not None:
+            raise AssertionError(failure)
 
-    def row_count_is_0(self,selectStatement):
+    def row_count_is_0(self, selectStatement, alias=None, parameters=None):
         """
         Check if any rows are returned from the submitted `selectStatement`.
         If there are, then this will throw an AssertionError.
@@ -81,12 +95,12 @@ class Assertion(object):
         | Row Count is 0 | select id from person where first_name = 'Franz Allan' | # FAIL |
         | Row Count is 0 | select id from person where first_name = 'John' | # PASS |          
         """
-        num_rows = self.row_count(selectStatement)
-        if (num_rows > 0):
-            raise AssertionError("Expected zero rows to be returned from '%s' "
-                                 "but got rows back. Number of rows returned was %s" % (selectStatement, num_rows))
+        num_rows = self._count_rows(selectStatement, alias, 1, parameters)
+        failure = no_rows_failure(self._get_logging_policy(alias).sql(selectStatement), num_rows)
+        if failure is not None:
+            raise AssertionError(failure)
 
-    def row_count_is_equal_to_x(self,selectStatement,numRows):
+    def row_count_is_equal_to_x(self, selectStatement, numRows, alias=None, parameters=None):
         """
         Check if the number of rows returned from `selectStatement` is equal to
         the value submitted. If not, then this will throw an AssertionError.
@@ -104,12 +118,13 @@ class Assertion(object):
         | Row Count Is Equal To X | select id from person | 1 | # FAIL |
         | Row Count Is Equal To X | select id from person where first_name = 'John' | 0 | # PASS |          
         """
-        num_rows = self.row_count(selectStatement)
-        if (num_rows != int(numRows.encode('ascii'))):
-            raise AssertionError("Expected same number of rows to be returned from '%s' "
-                                 "than the returned rows of %s" % (selectStatement, num_rows))
+        expected_rows = int(numRows)
+        num_rows = self._count_rows(selectStatement, alias, expected_rows + 1, parameters)
+        failure = equal_rows_failure(self._get_logging_policy(alias).sql(selectStatement), num_rows, expected_rows)
+        if failure is not None:
+            raise AssertionError(failure)
 
-    def row_count_is_greater_than_x(self,selectStatement,numRows):
+    def row_count_is_greater_than_x(self, selectStatement, numRows, alias=None, parameters=None):
         """
         Check if the number of rows returned from `selectStatement` is greater
         than the value submitted. If not, then this will throw an AssertionError.
@@ -127,12 +142,13 @@ class Assertion(object):
         | Row Count Is Greater Than X | select id from person | 1 | # PASS |
         | Row Count Is Greater Than X | select id from person where first_name = 'John' | 0 | # FAIL |          
         """
-        num_rows = self.row_count(selectStatement)
-        if (num_rows <= int(numRows.encode('ascii'))):
-            raise AssertionError("Expected more rows to be returned from '%s' "
-                                 "than the returned rows of %s" % (selectStatement, num_rows))
+        expected_rows = int(numRows)
+        num_rows = self._count_rows(selectStatement, alias, expected_rows + 1, parameters)
+        failure = more_rows_failure(self._get_logging_policy(alias).sql(selectStatement), num_rows, expected_rows)
+        if failure is not None:
+            raise AssertionError(failure)
 
-    def row_count_is_less_than_x(self,selectStatement,numRows):
+    def row_count_is_less_than_x(self, selectStatement, numRows, alias=None, parameters=None):
         """
         Check if the number of rows returned from `selectStatement` is less
         than the value submitted. If not, then this will throw an AssertionError.
@@ -150,12 +166,13 @@ class Assertion(object):
         | Row Count Is Less Than X | select id from person | 3 | # PASS |
         | Row Count Is Less Than X | select id from person where first_name = 'John' | 1 | # FAIL |          
         """
-        num_rows = self.row_count(selectStatement)
-        if (num_rows >= int(numRows.encode('ascii'))):
-            raise AssertionError("Expected less rows to be returned from '%s' "
-                                 "than the returned rows of %s" % (selectStatement, num_rows))
+        expected_rows = int(numRows)
+        num_rows = self._count_rows(selectStatement, alias, expected_rows, parameters)
+        failure = less_rows_failure(self._get_logging_policy(alias).sql(selectStatement), num_rows, expected_rows)
+        if failure is not None:
+            raise AssertionError(failure)
                                  
-    def table_must_exist(self,tableName):
+    def table_must_exist(self, tableName, alias=None):
         """
         Check if the table given exists in the database.
         
@@ -167,10 +184,111 @@ class Assertion(object):
         Then you will get the following:
         | Table Must Exist | person | # PASS |
         | Table Must Exist | first_name | # FAIL |
+
+        Tables, views, columns and indexes are looked up in a schema
+        catalog of the connection, read from the catalog of the database
+        (`sqlite_master`, `pg_catalog`, `information_schema` or `ALL_TABLES`)
+        the first time it is needed and then kept, so checking many of them
+        costs no further round-trips. The catalog is read again after
+        `Execute Sql String` or `Execute Sql Script` run a `CREATE`, `ALTER`,
+        `DROP` or `RENAME`, and before failing, in case the schema was changed
+        by someone else.
+
+        The catalog holds the tables visible without a schema prefix: those
+        of the schemas on the `search_path` on PostgreSQL, of the current
+        database on MySQL and of the current user on Oracle. As before the
+        catalog was used, `Table Must Exist` also passes for a table of
+        another schema (or database) listed in `information_schema.tables`,
+        but `Column Must Exist`, `Index Must Exist` and `Get Table Columns`
+        only know the tables of the catalog.
         """
-        selectStatement = ("select * from information_schema.tables where table_name='%s'" % tableName)
-        num_rows = self.row_count(selectStatement)
-        if (num_rows == 0):
+        if self._get_schema_catalog(alias).table_columns(tableName) is not None:
+            return
+        anySchemaStatement = self._get_dialect(alias).table_in_any_schema(tableName)
+        if anySchemaStatement is None or self._count_rows(anySchemaStatement, alias, 1) == 0:
             raise AssertionError("Table '%s' does not exist in the db" % tableName)
 
+    def column_must_exist(self, tableName, columnName, alias=None):
+        """
+        Check if the table (or view) `tableName` has a column `columnName`,
+        from the schema catalog (see `Table Must Exist`).
+
+        For example:
+        | Column Must Exist | person | first_name |
+        """
+        catalog = self._get_schema_catalog(alias)
+        if catalog.column(tableName, columnName) is None:
+            if catalog.table_columns(tableName, False) is None:
+                raise AssertionError("Table '%s' does not exist in the db" % tableName)
+            raise AssertionError("Column '%s' does not exist in table '%s'" % (columnName, tableName))
+
+    def index_must_exist(self, tableName, indexName=None, alias=None, columns=None):
+        """
+        Check if the table `tableName` has an index named `indexName`, or an
+        index whose first columns are `columns` (a list, or a string of
+        comma separated names), or both, from the schema catalog (see `Table
+        Must Exist`). Unique and primary key constraints count, as databases
+        enforce them with indexes.
+
+        For example:
+        | Index Must Exist | person | person_last_name_idx |
+        | Index Must Exist | person | columns=last_name, first_name |
+        """
+        if indexName is None and columns is None:
+            raise ValueError("Give the name or the columns of the index")
+        if isinstance(columns, str):
+            columns = columns.split(',')
+        if columns is not None:
+            columns = [column.strip().lower() for column in columns]
+        catalog = self._get_schema_catalog(alias)
+        for reload in (False, True):
+            indexes = catalog.table_indexes(tableName, reload)
+            if indexes is None:
+                raise RuntimeError("Listing indexes is not supported for %s databases" % catalog.dialect.name)
+            for index in indexes:
+                if indexName is not None and index.name.lower() != indexName.lower():
+                    continue
+                if columns is not None and [column.lower() for column in index.columns[:len(columns)]] != columns:
+                    continue
+                return
+        description = ' '.join(filter(None, [indexName and "'%s'" % indexName,
+                                             columns and 'on (%s)' % ', '.join(columns)]))
+        raise AssertionError("Index %s does not exist in table '%s'" % (description, tableName))
+
+# The failures of the assertions, shared with `Run Database Checks`: each
+# returns the message of the AssertionError for the (logged) statement `sql`,
+# or None if the assertion holds. Row counts stop at the number of rows the
+# assertion fetches, hence the "at least".
+
+def exists_failure(sql, exists):
+    if not exists:
+        return "Expected to have have at least one row from '%s' but got 0 rows." % sql
+
+def not_exists_failure(sql, rows, loggingPolicy):
+    if rows:
+        return ("Expected to have have no rows from '%s' but got some rows : %s."
+                % (sql, loggingPolicy.rows(rows, len(rows) == EXISTENCE_SAMPLE_SIZE)))
+
+def no_rows_failure(sql, num_rows):
+    if num_rows > 0:
+        return ("Expected zero rows to be returned from '%s' but got rows back. "
+                "Number of rows returned was at least %s" % (sql, num_rows))
+
+def equal_rows_failure(sql, num_rows, expected_rows):
+    if num_rows != expected_rows:
+        return ("Expected same number of rows to be returned from '%s' than the returned rows of %s"
+                % (sql, _at_least(num_rows, expected_rows + 1)))
+
+def more_rows_failure(sql, num_rows, expected_rows):
+    if num_rows <= expected_rows:
+        return "Expected more rows to be returned from '%s' than the returned rows of %s" % (sql, num_rows)
+
+def less_rows_failure(sql, num_rows, expected_rows):
+    if num_rows >= expected_rows:
+        return ("Expected less rows to be returned from '%s' than the returned rows of %s"
+                % (sql, _at_least(num_rows, expected_rows)))
 
+def _at_least(num_rows, limit):
+    if num_rows >= limit:
+        return 'at least %s' % num_rows
+    return '%s' % num_rows
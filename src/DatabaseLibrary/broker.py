@@ -0,0 +1,776 @@
+#  Copyright (c) 2010 Franz Allan Valencia See
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import datetime
+import decimal
+import importlib
+import os
+import socket
+import socketserver
+import struct
+import subprocess
+import sys
+import threading
+import time
+from DatabaseLibrary.dialect import dialect_for_module
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+DEFAULT_BROKER_POOL_SIZE = 8
+BROKER_IDLE_TIMEOUT = 60
+LEASE_TIMEOUT = 30
+STARTUP_TIMEOUT = 10
+PREFETCH_ROWS = 500
+LOG_TAIL_LINES = 20
+
+_LENGTH = struct.Struct('!I')
+_INTEGER = struct.Struct('!q')
+_FLOAT = struct.Struct('!d')
+_ROWS = struct.Struct('!IH')
+_INTEGER_RANGE = (-(1 << 63), (1 << 63) - 1)
+
+class BrokerError(RuntimeError):
+    pass
+
+class BrokerClient(object):
+    """
+    BrokerClient connects to the connection broker listening on the Unix
+    socket `socketPath`, launching it as a separate process if none is
+    running, so that all the Robot Framework processes of a run (e.g. the
+    workers of pabot) share the database connections the broker keeps.
+
+    Each connection of the library is a session of its own with the broker.
+    The broker lends it one of its connections to the same database from
+    its first statement until it commits or rolls back (or, in autocommit
+    mode, for one statement), so a transaction always stays on the same
+    database connection, while connections are shared between transactions.
+    The broker keeps at most `poolSize` connections per database, and stops
+    once it has had no sessions for `idleTimeout` seconds.
+    """
+
+    def __init__(self, socketPath, poolSize=DEFAULT_BROKER_POOL_SIZE, idleTimeout=BROKER_IDLE_TIMEOUT):
+        if not unix_sockets_available():
+            raise BrokerError("The connection broker needs Unix domain sockets and file locks, "
+                              "which are not available on this platform")
+        self.socketPath = os.path.abspath(socketPath)
+        self.poolSize = int(poolSize)
+        self.idleTimeout = float(idleTimeout)
+
+    def connector(self, dbApiModule):
+        """
+        Returns a function taking the arguments of `dbApiModule.connect`, and
+        returning a connection to the same database through the broker.
+        """
+        def connect(*args, **kwargs):
+            return BrokeredConnection(self._open_socket(), dbApiModule, args, kwargs)
+        return connect
+
+    def _open_socket(self):
+        try:
+            return _connect_socket(self.socketPath)
+        except socket.error:
+            pass
+        deadline = time.time() + STARTUP_TIMEOUT
+        process = self._launch()
+        while True:
+            try:
+                return _connect_socket(self.socketPath)
+            except socket.error as e:
+                if time.time() >= deadline:
+                    raise BrokerError("Could not connect to the connection broker at '%s' : %s%s"
+                                      % (self.socketPath, e, self._log_tail()))
+            status = process.poll()
+            if status == 0:
+                # Another broker held the lock, possibly while stopping: launch again.
+                process = self._launch()
+            elif status is not None:
+                raise BrokerError("The connection broker at '%s' exited with status %s%s"
+                                  % (self.socketPath, status, self._log_tail()))
+            time.sleep(0.05)
+
+    def _log_tail(self):
+        """
+        Returns the last lines of the log of the broker, to end an error
+        message with, or an empty string if it has none.
+        """
+        try:
+            with open(self.socketPath + '.log', 'rb') as logFile:
+                lines = logFile.read().decode('utf-8', 'replace').splitlines()[-LOG_TAIL_LINES:]
+        except (IOError, OSError):
+            return ''
+        if not lines:
+            return ''
+        return ', the end of its log %s.log :\n%s' % (self.socketPath, '\n'.join(lines))
+
+    def _launch(self):
+        packageDirectory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        environment = dict(os.environ)
+        environment['PYTHONPATH'] = os.pathsep.join([packageDirectory] + [path for path in
+                                                     [environment.get('PYTHONPATH')] if path])
+        logFile = open(self.socketPath + '.log', 'ab')
+        try:
+            return subprocess.Popen([sys.executable, '-m', 'DatabaseLibrary.broker', self.socketPath,
+                                     str(self.poolSize), str(self.idleTimeout)],
+                                    stdin=subprocess.DEVNULL, stdout=logFile, stderr=logFile,
+                                    env=environment, close_fds=True, start_new_session=True)
+        finally:
+            logFile.close()
+
+class BrokeredConnection(object):
+    """
+    A DB API 2.0 connection whose statements are run by the broker. Errors
+    are raised as the exception class of the same name of the driver when
+    it has one.
+    """
+
+    # Tells the connection pool the connection is brokered.
+    brokered = True
+
+    def __init__(self, sock, dbApiModule, args, kwargs):
+        self._socket = sock
+        self._dbApiModule = dbApiModule
+        self._autocommit = False
+        try:
+            self._request('connect', dbApiModule.__name__, tuple(args), dict(kwargs))
+        except Exception:
+            self._socket.close()
+            raise
+
+    def cursor(self, *args, **kwargs):
+        if args or kwargs:
+            raise BrokerError("Server-side cursors are not available through the connection broker")
+        return BrokeredCursor(self, self._request('cursor'))
+
+    def commit(self):
+        self._request('commit')
+
+    def rollback(self):
+        self._request('rollback')
+
+    def close(self):
+        if self._socket is None:
+            return
+        try:
+            self._request('close')
+        except Exception:
+            pass
+        finally:
+            self._socket.close()
+            self._socket = None
+
+    @property
+    def autocommit(self):
+        return self._autocommit
+
+    @autocommit.setter
+    def autocommit(self, value):
+        self._request('autocommit', bool(value))
+        self._autocommit = bool(value)
+
+    @property
+    def isolation_level(self):
+        # The attribute sqlite3 turns autocommit on and off with.
+        return None if self._autocommit else ''
+
+    @isolation_level.setter
+    def isolation_level(self, value):
+        self.autocommit = value is None
+
+    def _request(self, *message):
+        if self._socket is None:
+            raise BrokerError("The brokered connection is closed")
+        _send(self._socket, message)
+        reply = _receive(self._socket)
+        if reply is None:
+            self._socket.close()
+            self._socket = None
+            raise BrokerError("The connection broker closed the connection")
+        if reply[0] == 'error':
+            raise _driver_error(self._dbApiModule, reply[1], reply[2])
+        return reply[1]
+
+class BrokeredCursor(object):
+    """
+    A cursor of a BrokeredConnection. The first rows of a result come with
+    the reply to `execute`, and the next ones are fetched in batches of at
+    least `PREFETCH_ROWS` rows.
+    """
+
+    def __init__(self, connection, cursorId):
+        self.connection = connection
+        self.arraysize = 1
+        self.description = None
+        self.rowcount = -1
+        self.lastrowid = None
+        self._id = cursorId
+        self._rows = []
+        self._position = 0
+        self._done = True
+
+    def execute(self, operation, parameters=None):
+        self._run(operation, parameters, False)
+
+    def executemany(self, operation, seqOfParameters):
+        self._run(operation, list(seqOfParameters), True)
+
+    def _run(self, operation, parameters, many):
+        description, self.rowcount, self.lastrowid, self._rows, self._done = \
+            self.connection._request('execute', self._id, operation, parameters, many, PREFETCH_ROWS)
+        self.description = None if description is None else [tuple(column) for column in description]
+        self._position = 0
+
+    def fetchone(self):
+        rows = self.fetchmany(1)
+        return rows[0] if rows else None
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        available = len(self._rows) - self._position
+        if available < size and not self._done:
+            rows, self._done = self.connection._request('fetch', self._id, max(size - available, PREFETCH_ROWS))
+            self._rows = self._rows[self._position:] + rows
+            self._position = 0
+        rows = self._rows[self._position:self._position + size]
+        self._position += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._rows[self._position:]
+        if not self._done:
+            rows += self.connection._request('fetch', self._id, -1)[0]
+            self._done = True
+        self._rows = []
+        self._position = 0
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def close(self):
+        if self.connection._socket is not None:
+            self.connection._request('close_cursor', self._id)
+
+def unix_sockets_available():
+    """
+    Returns whether the platform has the Unix domain sockets and the file
+    locks the broker needs, which e.g. Windows does not.
+    """
+    return fcntl is not None and hasattr(socket, 'AF_UNIX') and hasattr(socketserver, 'UnixStreamServer')
+
+class ConnectionBroker(socketserver.ThreadingMixIn, getattr(socketserver, 'UnixStreamServer', object)):
+    """
+    The broker process: serves every session on a thread of its own, from
+    pools of connections shared by all sessions to the same database.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socketPath, poolSize, idleTimeout):
+        self.poolSize = poolSize
+        self.idleTimeout = idleTimeout
+        self._pools = {}
+        self._lock = threading.Lock()
+        self._sessions = 0
+        self._idleSince = time.time()
+        super(ConnectionBroker, self).__init__(socketPath, _BrokerSession)
+
+    def pool_for(self, moduleName, args, kwargs):
+        key = encode((moduleName, args, sorted(kwargs.items())))
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = self._pools[key] = _SharedPool(moduleName, args, kwargs, self.poolSize)
+            return pool
+
+    def session_started(self):
+        with self._lock:
+            self._sessions += 1
+
+    def session_ended(self):
+        with self._lock:
+            self._sessions -= 1
+            self._idleSince = time.time()
+
+    def serve_until_idle(self):
+        watcher = threading.Thread(target=self._stop_when_idle)
+        watcher.daemon = True
+        watcher.start()
+        self.serve_forever(poll_interval=0.2)
+
+    def _stop_when_idle(self):
+        while True:
+            time.sleep(min(1.0, self.idleTimeout))
+            with self._lock:
+                idle = self._sessions == 0 and time.time() - self._idleSince >= self.idleTimeout
+            if idle:
+                # New clients launch a new broker rather than reach this one,
+                # which stops once the sessions that just started have ended.
+                os.unlink(self.server_address)
+                while self._sessions:
+                    time.sleep(0.05)
+                self.shutdown()
+                return
+
+    def close_pools(self):
+        with self._lock:
+            pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            pool.close()
+
+class _SharedPool(object):
+    """
+    The connections of the broker to one database, lent to one session at
+    a time.
+    """
+
+    def __init__(self, moduleName, args, kwargs, size):
+        self.dbApiModule = importlib.import_module(moduleName)
+        self.dialect = dialect_for_module(moduleName)
+        self.args = args
+        self.kwargs = dict(kwargs)
+        if self.dialect.threadBoundConnections:
+            # Connections move between session threads, but are used by one at a time.
+            self.kwargs['check_same_thread'] = False
+        self.size = size
+        self._idle = []
+        self._opened = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, autocommit):
+        deadline = time.time() + LEASE_TIMEOUT
+        with self._condition:
+            while not self._idle and self._opened >= self.size:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise BrokerError("All %s connections of the broker to the database are in use" % self.size)
+                self._condition.wait(remaining)
+            lease = self._idle.pop() if self._idle else None
+            if lease is None:
+                self._opened += 1
+        if lease is None:
+            try:
+                lease = _Lease(self.dbApiModule.connect(*self.args, **self.kwargs))
+            except Exception:
+                self.release(None, False)
+                raise
+        if lease.autocommit != autocommit:
+            self.dialect.set_autocommit(lease.connection, autocommit)
+            lease.autocommit = autocommit
+        return lease
+
+    def release(self, lease, reusable=True):
+        with self._condition:
+            if reusable:
+                self._idle.append(lease)
+            else:
+                self._opened -= 1
+            self._condition.notify()
+        if not reusable and lease is not None:
+            _close_quietly(lease.connection)
+
+    def close(self):
+        with self._condition:
+            idle, self._idle = self._idle, []
+            self._opened -= len(idle)
+        for lease in idle:
+            _close_quietly(lease.connection)
+
+class _Lease(object):
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.autocommit = False
+
+class _SessionCursor(object):
+
+    def __init__(self):
+        self.cursor = None
+        self.buffered = None
+
+class _BrokerSession(socketserver.BaseRequestHandler):
+    """
+    Serves the requests of one connection of a client, each a tuple of an
+    operation and its arguments, answered with ('ok', result) or ('error',
+    exception class name, message).
+    """
+
+    def setup(self):
+        self.pool = None
+        self.lease = None
+        self.autocommit = False
+        self.cursors = {}
+        self.nextCursorId = 0
+        self.operations = {
+            'connect': self._connect, 'cursor': self._cursor, 'execute': self._execute, 'fetch': self._fetch,
+            'close_cursor': self._close_cursor, 'commit': self._commit, 'rollback': self._rollback,
+            'autocommit': self._set_autocommit, 'close': self._rollback,
+        }
+        self.server.session_started()
+
+    def handle(self):
+        while True:
+            message = _receive(self.request)
+            if message is None:
+                return
+            try:
+                reply = ('ok', self.operations[message[0]](*message[1:]))
+            except Exception as e:
+                reply = ('error', type(e).__name__, str(e))
+            _send(self.request, reply)
+            if message[0] == 'close':
+                return
+
+    def finish(self):
+        try:
+            self._rollback()
+        finally:
+            self.server.session_ended()
+
+    def _connect(self, moduleName, args, kwargs):
+        self.pool = self.server.pool_for(moduleName, args, kwargs)
+        # Fail now rather than on the first statement if the database cannot be reached.
+        self._lease()
+        self._end_lease()
+
+    def _cursor(self):
+        self.nextCursorId += 1
+        self.cursors[self.nextCursorId] = _SessionCursor()
+        return self.nextCursorId
+
+    def _execute(self, cursorId, operation, parameters, many, prefetch):
+        sessionCursor = self.cursors[cursorId]
+        sessionCursor.buffered = None
+        lease = self._lease()
+        try:
+            if sessionCursor.cursor is None:
+                sessionCursor.cursor = lease.connection.cursor()
+            cur = sessionCursor.cursor
+            if many:
+                cur.executemany(operation, parameters)
+            elif parameters is None:
+                cur.execute(operation)
+            else:
+                cur.execute(operation, parameters)
+            description = cur.description
+            if self.autocommit:
+                # Nothing holds the connection after the statement: keep the rows and give it back.
+                sessionCursor.buffered = cur.fetchall() if description is not None else []
+                rows, done = self._take_buffered(sessionCursor, prefetch)
+            else:
+                rows = cur.fetchmany(prefetch) if description is not None else []
+                done = len(rows) < prefetch
+            return (None if description is None else [tuple(column) for column in description],
+                    cur.rowcount, getattr(cur, 'lastrowid', None), _Rows(rows), done)
+        finally:
+            if self.autocommit:
+                self._end_lease()
+
+    def _fetch(self, cursorId, size):
+        sessionCursor = self.cursors[cursorId]
+        if sessionCursor.buffered is not None:
+            rows, done = self._take_buffered(sessionCursor, size)
+            return _Rows(rows), done
+        if sessionCursor.cursor is None:
+            raise BrokerError("The cursor has no result to fetch, e.g. after the end of the transaction")
+        rows = sessionCursor.cursor.fetchall() if size < 0 else sessionCursor.cursor.fetchmany(size)
+        return _Rows(rows), size < 0 or len(rows) < size
+
+    def _take_buffered(self, sessionCursor, size):
+        if size < 0:
+            size = len(sessionCursor.buffered)
+        rows, sessionCursor.buffered = sessionCursor.buffered[:size], sessionCursor.buffered[size:]
+        return rows, not sessionCursor.buffered
+
+    def _close_cursor(self, cursorId):
+        sessionCursor = self.cursors.pop(cursorId, None)
+        if sessionCursor is not None and sessionCursor.cursor is not None:
+            sessionCursor.cursor.close()
+
+    def _commit(self):
+        if self.lease is not None:
+            self._end_lease(self.lease.connection.commit)
+
+    def _rollback(self):
+        if self.lease is not None:
+            self._end_lease(self.lease.connection.rollback)
+
+    def _set_autocommit(self, autocommit):
+        self.autocommit = autocommit
+        if self.lease is not None:
+            self.pool.dialect.set_autocommit(self.lease.connection, autocommit)
+            self.lease.autocommit = autocommit
+
+    def _lease(self):
+        if self.pool is None:
+            raise BrokerError("The session is not connected to a database")
+        if self.lease is None:
+            self.lease = self.pool.acquire(self.autocommit)
+        return self.lease
+
+    def _end_lease(self, end=None):
+        """
+        Ends the transaction with `end` (if any) and gives the connection back
+        to the pool, or closes it if ending the transaction failed.
+        """
+        lease, self.lease = self.lease, None
+        for sessionCursor in self.cursors.values():
+            if sessionCursor.cursor is not None:
+                _close_quietly(sessionCursor.cursor)
+                sessionCursor.cursor = None
+        reusable = False
+        try:
+            if end is not None:
+                end()
+            reusable = True
+        finally:
+            self.pool.release(lease, reusable)
+
+class _Rows(list):
+    """
+    Rows of a result, encoded as their number, their number of columns and
+    the values one after the other.
+    """
+
+def encode(value):
+    parts = []
+    _encode(value, parts)
+    return b''.join(parts)
+
+def decode(data):
+    return _decode(memoryview(data), 0)[0]
+
+def _encode(value, parts):
+    encoder = _ENCODERS.get(type(value))
+    if encoder is None:
+        encoder = _encode_other
+    encoder(value, parts)
+
+def _encode_integer(value, parts):
+    if _INTEGER_RANGE[0] <= value <= _INTEGER_RANGE[1]:
+        parts.append(b'i' + _INTEGER.pack(value))
+    else:
+        _encode_text(b'I', str(value), parts)
+
+def _encode_text(tag, text, parts):
+    data = text.encode('utf-8')
+    parts.append(tag + _LENGTH.pack(len(data)))
+    parts.append(data)
+
+def _encode_bytes(value, parts):
+    parts.append(b'b' + _LENGTH.pack(len(value)))
+    parts.append(bytes(value))
+
+def _encode_sequence(tag, values, parts):
+    parts.append(tag + _LENGTH.pack(len(values)))
+    for value in values:
+        _encode(value, parts)
+
+def _encode_rows(rows, parts):
+    columns = len(rows[0]) if rows else 0
+    parts.append(b'R' + _ROWS.pack(len(rows), columns))
+    for row in rows:
+        for value in row:
+            _encode(value, parts)
+
+def _encode_dict(value, parts):
+    parts.append(b'o' + _LENGTH.pack(len(value)))
+    for key, item in value.items():
+        _encode(key, parts)
+        _encode(item, parts)
+
+def _encode_other(value, parts):
+    for valueType, encoder in _ENCODERS.items():
+        if isinstance(value, valueType):
+            return encoder(value, parts)
+    _encode_text(b's', str(value), parts)
+
+_ENCODERS = {
+    type(None): lambda value, parts: parts.append(b'N'),
+    bool: lambda value, parts: parts.append(b'T' if value else b'F'),
+    int: _encode_integer,
+    float: lambda value, parts: parts.append(b'f' + _FLOAT.pack(value)),
+    str: lambda value, parts: _encode_text(b's', value, parts),
+    bytes: _encode_bytes,
+    bytearray: _encode_bytes,
+    memoryview: _encode_bytes,
+    decimal.Decimal: lambda value, parts: _encode_text(b'D', str(value), parts),
+    datetime.datetime: lambda value, parts: _encode_text(b't', value.isoformat(), parts),
+    datetime.date: lambda value, parts: _encode_text(b'd', value.isoformat(), parts),
+    datetime.time: lambda value, parts: _encode_text(b'm', value.isoformat(), parts),
+    list: lambda value, parts: _encode_sequence(b'l', value, parts),
+    tuple: lambda value, parts: _encode_sequence(b'u', value, parts),
+    dict: _encode_dict,
+    _Rows: _encode_rows,
+}
+
+def _decode(data, offset):
+    return _DECODERS[data[offset]](data, offset + 1)
+
+def _decode_text(data, offset):
+    length = _LENGTH.unpack_from(data, offset)[0]
+    offset += _LENGTH.size
+    return str(data[offset:offset + length], 'utf-8'), offset + length
+
+def _decode_bytes(data, offset):
+    length = _LENGTH.unpack_from(data, offset)[0]
+    offset += _LENGTH.size
+    return data[offset:offset + length].tobytes(), offset + length
+
+def _decode_converted(convert):
+    def decode_converted(data, offset):
+        text, offset = _decode_text(data, offset)
+        return convert(text), offset
+    return decode_converted
+
+def _decode_values(data, offset, count):
+    values = []
+    for index in range(count):
+        value, offset = _decode(data, offset)
+        values.append(value)
+    return values, offset
+
+def _decode_list(data, offset):
+    count = _LENGTH.unpack_from(data, offset)[0]
+    return _decode_values(data, offset + _LENGTH.size, count)
+
+def _decode_tuple(data, offset):
+    values, offset = _decode_list(data, offset)
+    return tuple(values), offset
+
+def _decode_rows(data, offset):
+    count, columns = _ROWS.unpack_from(data, offset)
+    values, offset = _decode_values(data, offset + _ROWS.size, count * columns)
+    if columns == 0:
+        return [()] * count, offset
+    return list(zip(*[iter(values)] * columns)), offset
+
+def _decode_dict(data, offset):
+    count = _LENGTH.unpack_from(data, offset)[0]
+    values, offset = _decode_values(data, offset + _LENGTH.size, count * 2)
+    return dict(zip(values[::2], values[1::2])), offset
+
+_DECODERS = {
+    ord('N'): lambda data, offset: (None, offset),
+    ord('T'): lambda data, offset: (True, offset),
+    ord('F'): lambda data, offset: (False, offset),
+    ord('i'): lambda data, offset: (_INTEGER.unpack_from(data, offset)[0], offset + _INTEGER.size),
+    ord('I'): _decode_converted(int),
+    ord('f'): lambda data, offset: (_FLOAT.unpack_from(data, offset)[0], offset + _FLOAT.size),
+    ord('s'): _decode_text,
+    ord('b'): _decode_bytes,
+    ord('D'): _decode_converted(decimal.Decimal),
+    ord('t'): _decode_converted(lambda text: datetime.datetime.fromisoformat(text)),
+    ord('d'): _decode_converted(lambda text: datetime.date.fromisoformat(text)),
+    ord('m'): _decode_converted(lambda text: datetime.time.fromisoformat(text)),
+    ord('l'): _decode_list,
+    ord('u'): _decode_tuple,
+    ord('o'): _decode_dict,
+    ord('R'): _decode_rows,
+}
+
+def _send(sock, message):
+    payload = encode(message)
+    sock.sendall(_LENGTH.pack(len(payload)) + payload)
+
+def _receive(sock):
+    """
+    Returns the next message from `sock`, or None if it was closed.
+    """
+    header = _receive_exactly(sock, _LENGTH.size)
+    if header is None:
+        return None
+    payload = _receive_exactly(sock, _LENGTH.unpack(header)[0])
+    if payload is None:
+        return None
+    return decode(payload)
+
+def _receive_exactly(sock, size):
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:])
+        if count == 0:
+            return None
+        received += count
+    return buffer
+
+def _connect_socket(socketPath):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socketPath)
+    except Exception:
+        sock.close()
+        raise
+    return sock
+
+def _driver_error(dbApiModule, className, message):
+    errorClass = getattr(dbApiModule, className, None)
+    if not (isinstance(errorClass, type) and issubclass(errorClass, Exception)):
+        errorClass = getattr(dbApiModule, 'DatabaseError', None) if className not in _BUILTIN_ERRORS else _BUILTIN_ERRORS[className]
+    if not (isinstance(errorClass, type) and issubclass(errorClass, Exception)):
+        return BrokerError("%s: %s" % (className, message))
+    try:
+        return errorClass(message)
+    except Exception:
+        return BrokerError("%s: %s" % (className, message))
+
+_BUILTIN_ERRORS = {'BrokerError': BrokerError, 'RuntimeError': RuntimeError, 'ValueError': ValueError,
+                   'TypeError': TypeError, 'KeyError': KeyError}
+
+def _close_quietly(closeable):
+    try:
+        closeable.close()
+    except Exception:
+        pass
+
+def main(socketPath, poolSize=DEFAULT_BROKER_POOL_SIZE, idleTimeout=BROKER_IDLE_TIMEOUT):
+    """
+    Runs the broker on `socketPath` until it is idle, unless another broker
+    serves that socket already.
+    """
+    lockFile = open(socketPath + '.lock', 'w')
+    deadline = time.time() + STARTUP_TIMEOUT
+    while True:
+        try:
+            fcntl.flock(lockFile, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            break
+        except (IOError, OSError):
+            try:
+                _connect_socket(socketPath).close()
+                return 0
+            except socket.error:
+                # The broker holding the lock is stopping, or about to listen.
+                if time.time() >= deadline:
+                    return 1
+                time.sleep(0.05)
+    try:
+        if os.path.exists(socketPath):
+            os.unlink(socketPath)
+        broker = ConnectionBroker(socketPath, int(poolSize), float(idleTimeout))
+        try:
+            broker.serve_until_idle()
+        finally:
+            broker.server_close()
+            broker.close_pools()
+            if os.path.exists(socketPath):
+                os.unlink(socketPath)
+    finally:
+        lockFile.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(*sys.argv[1:]))
@@ -0,0 +1,205 @@
+#  Copyright (c) 2010 Franz Allan Valencia See
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import csv
+import json
+import time
+from itertools import chain, islice
+from robot.api import logger
+from DatabaseLibrary.dialect import positional_placeholders
+
+DEFAULT_CHUNK_SIZE = 1000
+
+class BulkInsert(object):
+    """
+    BulkInsert handles loading many rows into a table at once.
+
+    Rows are sent in chunks of `chunkSize` rows with `executemany` (or with
+    the faster `execute_values` and `COPY` when the driver is psycopg2), and
+    everything is committed once at the end, so either all rows are loaded
+    or none are.
+    """
+
+    def insert_rows(self, tableName, rows, columns=None, chunkSize=DEFAULT_CHUNK_SIZE, alias=None):
+        """
+        Inserts `rows` into the table `tableName` and returns the number of
+        inserted rows.
+
+        `rows` is a list of lists (or tuples) of values, in the order of
+        `columns`, or a list of dictionaries keyed by column name. `columns`
+        is a list or a comma separated string; if it is not given, the keys of
+        the first dictionary are used, or no column list at all for lists.
+
+        For example:
+        | @{row1} | Create List | 1 | Franz Allan | See |
+        | @{row2} | Create List | 2 | Jerry | Schneider |
+        | @{rows} | Create List | ${row1} | ${row2} |
+        | Insert Rows | person | ${rows} | id, first_name, last_name |
+        """
+        columns = _column_list(columns)
+        rows = iter(rows)
+        if columns is None:
+            try:
+                firstRow = next(rows)
+            except StopIteration:
+                return 0
+            if isinstance(firstRow, dict):
+                columns = list(firstRow.keys())
+            rows = chain([firstRow], rows)
+        if columns is not None:
+            rows = (_row_values(row, columns) for row in rows)
+        return self._insert_row_stream(tableName, columns, rows, chunkSize, alias)
+
+    def load_csv_into_table(self, tableName, csvFileName, columns=None, chunkSize=DEFAULT_CHUNK_SIZE, delimiter=',', alias=None):
+        """
+        Loads the rows of the CSV file `csvFileName` into the table
+        `tableName` and returns the number of loaded rows.
+
+        The first line of the file holds the column names, unless `columns`
+        is given, in which case every line is data. Empty values are loaded
+        as NULL, whether they are quoted (`""`) or not, so a file loads the
+        same way with every driver.
+
+        The file is read as it is loaded, so its size is not limited by
+        memory. With psycopg2 it is streamed with a single `COPY`.
+
+        For example:
+        | Load CSV Into Table | person | ${EXECDIR}${/}resources${/}person.csv |
+        | Load CSV Into Table | person | persons.txt | id,first_name,last_name | delimiter=; |
+        """
+        if len(delimiter) != 1:
+            raise ValueError("The delimiter must be a single character, got '%s'" % delimiter)
+        # The csv module handles the line endings itself, including those of quoted values.
+        csvFile = open(csvFileName, newline='')
+        try:
+            columns = _column_list(columns)
+            reader = csv.reader(csvFile, delimiter=delimiter)
+            header = columns is None
+            if header:
+                columns = next(reader, None)
+                if not columns:
+                    raise ValueError("The CSV file '%s' has no header line" % csvFileName)
+            if self._is_psycopg2(alias):
+                # COPY skips the header itself, which may span several lines.
+                csvFile.seek(0)
+                return self._copy_csv(tableName, columns, csvFile, delimiter, alias, header)
+            rows = ([value if value != '' else None for value in row] for row in reader if row)
+            return self._insert_row_stream(tableName, columns, rows, chunkSize, alias)
+        finally:
+            csvFile.close()
+
+    def load_jsonl_into_table(self, tableName, jsonlFileName, columns=None, chunkSize=DEFAULT_CHUNK_SIZE, alias=None):
+        """
+        Loads the JSON Lines file `jsonlFileName`, i.e. one JSON object per
+        line, into the table `tableName` and returns the number of loaded
+        rows.
+
+        The object keys are the column names; if `columns` is not given, the
+        keys of the first object are used and missing keys are loaded as NULL.
+        Lines holding JSON arrays are loaded as they are, in `columns` order.
+
+        For example:
+        | Load JSONL Into Table | person | ${EXECDIR}${/}resources${/}person.jsonl |
+        """
+        jsonlFile = open(jsonlFileName)
+        try:
+            objects = (json.loads(line) for line in jsonlFile if line.strip())
+            return self.insert_rows(tableName, objects, columns, chunkSize, alias)
+        finally:
+            jsonlFile.close()
+
+    def _insert_row_stream(self, tableName, columns, rows, chunkSize, alias):
+        self._invalidate_query_cache(alias)
+        chunkSize = int(chunkSize)
+        usePsycopg2 = self._is_psycopg2(alias)
+        if usePsycopg2:
+            from psycopg2.extras import execute_values
+        paramstyle = self._get_pooled_connection(alias).paramstyle
+        startTime = time.time()
+        rowCount = 0
+        cur = None
+        try:
+            connection = self._get_connection(alias)
+            cur = connection.cursor()
+            while True:
+                chunk = list(islice(rows, chunkSize))
+                if not chunk:
+                    break
+                if usePsycopg2:
+                    execute_values(cur, 'INSERT INTO %s%s VALUES %%s' % (tableName, _column_clause(columns)),
+                                   chunk, page_size=chunkSize)
+                else:
+                    insertStatement = 'INSERT INTO %s%s VALUES (%s)' % (tableName, _column_clause(columns),
+                        ', '.join(positional_placeholders(paramstyle, len(chunk[0]))))
+                    cur.executemany(insertStatement, chunk)
+                rowCount += len(chunk)
+                logger.debug("Inserted %s rows into %s so far" % (rowCount, tableName))
+            connection.commit()
+            logger.info("Inserted %s rows into %s in %.3f s" % (rowCount, tableName, time.time() - startTime))
+            return rowCount
+        finally:
+            if cur :
+                connection.rollback()
+
+    def _copy_csv(self, tableName, columns, csvFile, delimiter, alias, header=False):
+        self._invalidate_query_cache(alias)
+        startTime = time.time()
+        cur = None
+        try:
+            connection = self._get_connection(alias)
+            cur = connection.cursor()
+            cur.copy_expert(_copy_statement(tableName, columns, delimiter, header), csvFile)
+            rowCount = cur.rowcount
+            connection.commit()
+            logger.info("Copied %s rows into %s in %.3f s" % (rowCount, tableName, time.time() - startTime))
+            return rowCount
+        finally:
+            if cur :
+                connection.rollback()
+
+    def _is_psycopg2(self, alias):
+        """
+        Returns whether the connection of `alias` is a psycopg2 connection
+        itself, and not one through the connection broker.
+        """
+        dbApiModule = self._get_pooled_connection(alias).dbApiModule
+        return getattr(dbApiModule, '__name__', None) == 'psycopg2' and self._broker is None
+
+def _column_list(columns):
+    if columns is None or columns == '':
+        return None
+    if isinstance(columns, str):
+        columns = columns.split(',')
+    return [column.strip() for column in columns]
+
+def _column_clause(columns):
+    if columns is None:
+        return ''
+    return ' (%s)' % ', '.join(columns)
+
+def _copy_statement(tableName, columns, delimiter, header=False):
+    """
+    Returns the `COPY` statement loading CSV text into `tableName`, whose
+    first line is skipped if `header` is true. COPY loads a quoted empty
+    value as an empty string, so `FORCE_NULL` makes it NULL like the empty
+    values `Load CSV Into Table` loads with the other drivers.
+    """
+    forceNull = '' if columns is None else ', FORCE_NULL (%s)' % ', '.join(columns)
+    return "COPY %s%s FROM STDIN WITH (FORMAT csv, DELIMITER '%s'%s%s)" % (
+        tableName, _column_clause(columns), delimiter.replace("'", "''"), ', HEADER true' if header else '', forceNull)
+
+def _row_values(row, columns):
+    if isinstance(row, dict):
+        return [row.get(column) for column in columns]
+    return row
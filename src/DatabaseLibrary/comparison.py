@@ -0,0 +1,295 @@
+#  Copyright (c) 2010 Franz Allan Valencia See
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import hashlib
+from collections import Counter
+from decimal import Decimal
+from robot.api import logger
+
+CHECKSUM_BUCKETS = 256
+MAX_COMPARED_BUCKETS = 16
+MAX_REPORTED_ROWS = 10
+MAX_DIFFED_ROWS = 10000
+COMPARISON_FETCH_SIZE = 1000
+
+_CHECKSUM_MASK = (1 << 64) - 1
+_BUCKET_BITS = 8
+_MAX_DEPTH = 64 // _BUCKET_BITS
+
+class Comparison(object):
+    """
+    Comparison checks that two sets of rows are equal without loading them
+    in memory.
+
+    Both sides are hashed row by row into `CHECKSUM_BUCKETS` buckets, each
+    keeping a row count and an order-independent checksum. Only the rows of
+    the buckets that differ are then read again and compared, to report
+    them, splitting large buckets further so that memory stays bounded
+    however much the sides differ. On PostgreSQL the hashing is done by the database, so only the
+    checksums and the rows of differing buckets are sent over.
+    """
+
+    def result_sets_should_be_equal(self, firstStatement, secondStatement, alias=None, secondAlias=None):
+        """
+        Fails if `firstStatement` and `secondStatement` do not return the
+        same rows, in any order (duplicates count). `firstStatement` runs on
+        the connection of `alias` (or the current connection), and
+        `secondStatement` on the one of `secondAlias`, by default the same.
+
+        Values are compared by value rather than by type, e.g. 1, 1.0 and
+        Decimal('1.00') are equal. The failure message shows some of the
+        differing rows.
+
+        For example:
+        | Result Sets Should Be Equal | select * from invoice_expected | select * from invoice |
+        | Result Sets Should Be Equal | select id, total from invoice | select id, total from invoice | alias=legacy | secondAlias=new |
+        """
+        secondAlias = secondAlias or alias
+        firstDialect = self._get_dialect(alias)
+        secondDialect = self._get_dialect(secondAlias)
+        if firstDialect.bucket_checksums(firstStatement, CHECKSUM_BUCKETS) is not None and \
+                type(firstDialect) is type(secondDialect):
+            differences = self._compare_on_server(firstStatement, secondStatement, alias, secondAlias, firstDialect)
+            if differences is not None:
+                _report(differences, 'the first result set', 'the second result set', self._get_logging_policy(alias))
+                return
+        differences = _compare_row_streams(
+            lambda: self._stream_rows(firstStatement, alias),
+            lambda: self._stream_rows(secondStatement, secondAlias))
+        _report(differences, 'the first result set', 'the second result set', self._get_logging_policy(alias))
+
+    def table_should_match_snapshot(self, tableName, snapshotName='default', alias=None):
+        """
+        Fails if the rows of the table `tableName` are not the same (in any
+        order) as when `Snapshot Database` saved the snapshot `snapshotName`
+        of the connection of `alias` (or the current connection).
+
+        For example:
+        | Snapshot Database | before_batch |
+        | Run Batch Job |
+        | Table Should Match Snapshot | reference_data | before_batch |
+        """
+        pooledConnection = self._get_pooled_connection(alias)
+        snapshot = self._snapshots.get((pooledConnection.alias, snapshotName))
+        if snapshot is None:
+            raise RuntimeError("No snapshot '%s' of '%s', use 'Snapshot Database' first" % (snapshotName, pooledConnection.alias))
+        differences = _compare_row_streams(
+            lambda: self._stream_rows('SELECT * FROM %s' % tableName, alias),
+            lambda: snapshot.rows(pooledConnection, tableName))
+        _report(differences, "table '%s'" % tableName, "snapshot '%s'" % snapshotName, pooledConnection.loggingPolicy)
+
+    def _stream_rows(self, selectStatement, alias):
+        for batch in self._fetch_batches(selectStatement, alias, COMPARISON_FETCH_SIZE):
+            for row in batch:
+                yield row
+
+    def _compare_on_server(self, firstStatement, secondStatement, alias, secondAlias, dialect):
+        """
+        Compares the bucket checksums computed by the database, then the
+        rows of the differing buckets. Returns None if the checksums differ
+        but the rows do not (e.g. a column is an integer on one side and a
+        decimal on the other), so that the caller compares the rows instead.
+        """
+        firstChecksums = self._bucket_checksums(firstStatement, alias, dialect)
+        secondChecksums = self._bucket_checksums(secondStatement, secondAlias, dialect)
+        differingBuckets = sorted([bucket for bucket in set(firstChecksums) | set(secondChecksums)
+                                   if firstChecksums.get(bucket) != secondChecksums.get(bucket)])
+        logger.info("%s of %s buckets differ" % (len(differingBuckets), CHECKSUM_BUCKETS))
+        if not differingBuckets:
+            return _Differences(sum([count for count, checksum in firstChecksums.values()]))
+        comparedBuckets = differingBuckets[:MAX_COMPARED_BUCKETS]
+        differences = _diff_rows(
+            lambda: self._stream_rows(dialect.rows_in_buckets(firstStatement, CHECKSUM_BUCKETS, comparedBuckets), alias),
+            lambda: self._stream_rows(dialect.rows_in_buckets(secondStatement, CHECKSUM_BUCKETS, comparedBuckets), secondAlias))
+        if not differences.onlyInFirst and not differences.onlyInSecond:
+            return None
+        differences.differingBuckets = len(differingBuckets)
+        return differences
+
+    def _bucket_checksums(self, selectStatement, alias, dialect):
+        checksums = {}
+        for bucket, count, checksum in self._stream_rows(dialect.bucket_checksums(selectStatement, CHECKSUM_BUCKETS), alias):
+            checksums[int(bucket)] = (int(count), int(checksum))
+        return checksums
+
+class _Differences(object):
+
+    def __init__(self, rowCount=0):
+        self.rowCount = rowCount
+        self.differingBuckets = 0
+        self.onlyInFirst = []
+        self.onlyInSecond = []
+        self.onlyInFirstCount = 0
+        self.onlyInSecondCount = 0
+        self.complete = True
+
+    def add(self, firstCounter, secondCounter, examples):
+        """
+        Adds the rows counted more often in `firstCounter` than in
+        `secondCounter` and the other way around, keeping the first
+        `MAX_REPORTED_ROWS` of each side as examples.
+        """
+        for counter, rows in ((firstCounter - secondCounter, self.onlyInFirst),
+                              (secondCounter - firstCounter, self.onlyInSecond)):
+            for key, count in counter.items():
+                rows.extend([examples[key]] * min(count, MAX_REPORTED_ROWS - len(rows)))
+        self.onlyInFirstCount += sum((firstCounter - secondCounter).values())
+        self.onlyInSecondCount += sum((secondCounter - firstCounter).values())
+
+    def is_full(self):
+        return len(self.onlyInFirst) >= MAX_REPORTED_ROWS or len(self.onlyInSecond) >= MAX_REPORTED_ROWS
+
+def _compare_row_streams(firstRows, secondRows):
+    """
+    Compares the rows yielded by the functions `firstRows` and `secondRows`
+    by bucket checksums, then reads both again to diff the rows of the
+    differing buckets.
+    """
+    firstCounts, firstChecksums = _bucket_checksums(firstRows())
+    secondCounts, secondChecksums = _bucket_checksums(secondRows())
+    differingBuckets = [bucket for bucket in range(CHECKSUM_BUCKETS)
+                        if (firstCounts[bucket], firstChecksums[bucket]) != (secondCounts[bucket], secondChecksums[bucket])]
+    logger.info("%s of %s buckets differ" % (len(differingBuckets), CHECKSUM_BUCKETS))
+    if not differingBuckets:
+        return _Differences(sum(firstCounts))
+    comparedBuckets = set(differingBuckets[:MAX_COMPARED_BUCKETS])
+    differences = _diff_rows(lambda: _rows_in_buckets(firstRows(), comparedBuckets),
+                             lambda: _rows_in_buckets(secondRows(), comparedBuckets))
+    differences.differingBuckets = len(differingBuckets)
+    return differences
+
+def _bucket_checksums(rows, depth=0):
+    """
+    Returns the row counts and checksums of the buckets of `rows`, bucketed
+    by the bits of their digest at `depth` (the lowest bits at depth 0).
+    """
+    counts = [0] * CHECKSUM_BUCKETS
+    checksums = [0] * CHECKSUM_BUCKETS
+    for row in rows:
+        digest = _row_digest(row)
+        bucket = (digest >> (_BUCKET_BITS * depth)) % CHECKSUM_BUCKETS
+        counts[bucket] += 1
+        checksums[bucket] = (checksums[bucket] + (digest >> 8)) & _CHECKSUM_MASK
+    return counts, checksums
+
+def _rows_in_buckets(rows, buckets, depth=0):
+    for row in rows:
+        if (_row_digest(row) >> (_BUCKET_BITS * depth)) % CHECKSUM_BUCKETS in buckets:
+            yield row
+
+def _diff_rows(firstRows, secondRows, differences=None, depth=1):
+    """
+    Returns the rows yielded more often on one side than on the other by
+    the functions `firstRows` and `secondRows`, which read the rows again
+    on each call.
+
+    Both sides are counted in memory if they have at most `MAX_DIFFED_ROWS`
+    distinct rows. Otherwise they are split into buckets by the next bits
+    of the digests of their rows, and the differing buckets are diffed in
+    groups small enough to be counted, until `MAX_REPORTED_ROWS` differing
+    rows are found on a side.
+    """
+    if differences is None:
+        differences = _Differences()
+    examples = {}
+    limit = MAX_DIFFED_ROWS if depth < _MAX_DEPTH else None
+    firstCounter = _count_rows(firstRows(), examples, limit)
+    secondCounter = None if firstCounter is None else _count_rows(secondRows(), examples, limit)
+    if secondCounter is not None:
+        differences.add(firstCounter, secondCounter, examples)
+        return differences
+    examples = firstCounter = None
+    firstCounts, firstChecksums = _bucket_checksums(firstRows(), depth)
+    secondCounts, secondChecksums = _bucket_checksums(secondRows(), depth)
+    groups = []
+    groupSize = 0
+    for bucket in range(CHECKSUM_BUCKETS):
+        if (firstCounts[bucket], firstChecksums[bucket]) == (secondCounts[bucket], secondChecksums[bucket]):
+            continue
+        bucketSize = max(firstCounts[bucket], secondCounts[bucket])
+        if not groups or groupSize + bucketSize > MAX_DIFFED_ROWS:
+            groups.append(set())
+            groupSize = 0
+        groups[-1].add(bucket)
+        groupSize += bucketSize
+    logger.debug("Diffing the differing rows in %s groups of buckets at depth %s" % (len(groups), depth))
+    for buckets in groups:
+        if differences.is_full():
+            differences.complete = False
+            break
+        _diff_rows(lambda: _rows_in_buckets(firstRows(), buckets, depth),
+                   lambda: _rows_in_buckets(secondRows(), buckets, depth), differences, depth + 1)
+    return differences
+
+def _count_rows(rows, examples, limit):
+    """
+    Counts `rows` by their canonical value, keeping the first row of each
+    value in `examples`, or returns None as soon as there are more than
+    `limit` distinct values.
+    """
+    counter = Counter()
+    try:
+        for row in rows:
+            key = _canonical_row(row)
+            if key not in counter:
+                if limit is not None and len(counter) >= limit:
+                    return None
+                examples.setdefault(key, tuple(row))
+            counter[key] += 1
+        return counter
+    finally:
+        close = getattr(rows, 'close', None)
+        if close is not None:
+            close()
+
+def _report(differences, firstName, secondName, loggingPolicy):
+    if not differences.differingBuckets:
+        logger.info("Both sides have the same %s rows" % differences.rowCount)
+        return
+    message = ["Rows of %s and %s differ (in %s of %s checksum buckets)."
+               % (firstName, secondName, differences.differingBuckets, CHECKSUM_BUCKETS)]
+    if differences.differingBuckets > MAX_COMPARED_BUCKETS:
+        message.append("Showing differences from the first %s buckets only." % MAX_COMPARED_BUCKETS)
+    for title, rows, rowCount in (("Only in %s" % firstName, differences.onlyInFirst, differences.onlyInFirstCount),
+                                  ("Only in %s" % secondName, differences.onlyInSecond, differences.onlyInSecondCount)):
+        if rows:
+            message.append("%s (%s%s rows):" % (title, '' if differences.complete else 'at least ', rowCount))
+            reportedRows = min(MAX_REPORTED_ROWS, loggingPolicy.maxRows)
+            message.extend(['  %s' % loggingPolicy.value(row) for row in rows[:reportedRows]])
+            if rowCount > reportedRows:
+                message.append('  ...')
+    raise AssertionError('\n'.join(message))
+
+def _row_digest(row):
+    canonical = repr(_canonical_row(row)).encode('utf-8')
+    return int(hashlib.md5(canonical).hexdigest()[:16], 16)
+
+def _canonical_row(row):
+    return tuple([_canonical_value(value) for value in row])
+
+def _canonical_value(value):
+    """
+    Returns a representation of `value` that is the same for equal values
+    of different types, as drivers return numbers as int, float or Decimal.
+    """
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (int, float, Decimal)):
+        decimal = Decimal(repr(value)) if isinstance(value, float) else Decimal(value)
+        if decimal.is_finite() and decimal == decimal.to_integral_value():
+            return int(decimal)
+        return str(decimal.normalize())
+    if isinstance(value, (bytearray, memoryview)):
+        return bytes(value)
+    return value
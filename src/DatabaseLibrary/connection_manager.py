@@ -16,20 +16,53 @@ try:
     import ConfigParser
 except:
     import configparser as ConfigParser
+import shutil
+import tempfile
+import time
 from robot.api import logger
+from DatabaseLibrary.connection_pool import ConnectionPool
+from DatabaseLibrary.logging_policy import LoggingPolicy
+from DatabaseLibrary.query_statistics import QueryStatistics
+from DatabaseLibrary.snapshot import snapshot_for
+from DatabaseLibrary.utils import to_boolean, to_seconds
 
 class ConnectionManager(object):
     """
     Connection Manager handles the connection & disconnection to the database.
     """
 
-    def __init__(self):
+    def __init__(self, poolSize=8, maxConnectionAge=None, validationInterval=30, slowQueryThreshold=1, statisticsFile=None,
+                 sqlLogLevel='DEBUG', maxLoggedLength=1000, maxLoggedRows=10, brokerSocket=None, brokerPoolSize=8):
         """
-        Initializes _dbconnection to None.
+        Initializes the connection pool with no connections, the query
+        statistics, the logging policy of new connections and the client of
+        the connection broker, if any. The arguments are described in the
+        importing section of `DatabaseLibrary`.
         """
-        self._dbconnection = None
+        self._connectionPool = ConnectionPool(int(poolSize),
+                                              to_seconds(maxConnectionAge),
+                                              to_seconds(validationInterval))
+        self._loggingPolicy = LoggingPolicy(sqlLogLevel, maxLoggedLength, maxLoggedRows)
+        self._statistics = QueryStatistics(to_seconds(slowQueryThreshold), statisticsFile, self._get_logging_policy)
+        self._broker = None
+        if brokerSocket is not None and str(brokerSocket).upper() != 'NONE':
+            # Imported only here, as the broker is not available on every platform.
+            from DatabaseLibrary.broker import BrokerClient
+            self._broker = BrokerClient(brokerSocket, int(brokerPoolSize))
+        self._snapshots = {}
+        self._snapshotDirectory = None
+        self._currentAlias = None
         
-    def connect_to_database(self, dbapiModuleName=None, dbName=None, dbUsername=None, dbPassword=None, dbHost=None, dbPort=None, dbConfigFile="./resources/db.cfg"):
+    @property
+    def _dbconnection(self):
+        """
+        The connection of the current alias, or None if not connected.
+        """
+        if self._currentAlias is None:
+            return None
+        return self._connectionPool.acquire(self._currentAlias)
+
+    def connect_to_database(self, dbapiModuleName=None, dbName=None, dbUsername=None, dbPassword=None, dbHost=None, dbPort=None, dbConfigFile="./resources/db.cfg", alias='default', autocommit=False, serverSideCursors=False):
         """
         Loads the DB API 2.0 module given `dbapiModuleName` then uses it to 
         connect to the database using `dbName`, `dbUsername`, and `dbPassword`.
@@ -43,6 +76,23 @@ class ConnectionManager(object):
         
         The `dbConfigFile` is useful if you don't want to check into your SCM
         your database credentials.
+
+        The connection is registered in the connection pool under `alias`
+        (`default` if not given) and becomes the current connection. Connecting
+        again with an alias that is already in use replaces that connection.
+
+        With `autocommit=True`, every statement is committed by the database
+        as it runs, and the keywords make no commit or rollback round-trips
+        of their own. `Begin Transaction` still groups statements.
+
+        With `serverSideCursors=True`, the keywords fetching rows in batches
+        (`Query` with `fetchSize` or `maxRows`, `For Each Row`, `For Each
+        Batch`, `Export Query To File` and the row counts that cannot be
+        done by the database) leave the result on the server and transfer
+        it as they go, instead of letting the driver download all of it when
+        the statement runs. This uses named cursors with psycopg2 and
+        `SSCursor` with MySQLdb and PyMySQL; sqlite3 always fetches lazily.
+        Those keywords also take a `serverSide` argument to decide per call.
         
         Example usage:
         | # explicitly specifies all db property values |
@@ -59,6 +109,11 @@ class ConnectionManager(object):
         
         | # uses explicit `dbapiModuleName` and `dbName` but uses the `dbUsername` and `dbPassword` in './resources/db.cfg' |
         | Connect To Database | psycopg2 | my_db_test |    
+
+        | # keeps two connections open and switches between them |
+        | Connect To Database | psycopg2 | oltp_db | alias=oltp |
+        | Connect To Database | psycopg2 | reporting_db | alias=reporting |
+        | Switch Database | oltp |
         """
     
         config = ConfigParser.ConfigParser()
@@ -75,19 +130,24 @@ class ConnectionManager(object):
         if dbapiModuleName in ["MySQLdb", "pymysql"]:
             dbPort = dbPort or 3306
             logger.debug ('Connecting using : %s.connect(db=%s, user=%s, passwd=%s, host=%s, port=%s) ' % (dbapiModuleName, dbName, dbUsername, dbPassword, dbHost, dbPort))
-            self._dbconnection = db_api_2.connect (db=dbName, user=dbUsername, passwd=dbPassword, host=dbHost, port=dbPort)
+            connect = _connector(self._connect_function(db_api_2), (), dict(db=dbName, user=dbUsername, passwd=dbPassword, host=dbHost, port=dbPort))
         elif dbapiModuleName in ["psycopg2"]:
             dbPort = dbPort or 5432            
             logger.debug ('Connecting using : %s.connect(database=%s, user=%s, password=%s, host=%s, port=%s) ' % (dbapiModuleName, dbName, dbUsername, dbPassword, dbHost, dbPort))
-            self._dbconnection = db_api_2.connect (database=dbName, user=dbUsername, password=dbPassword, host=dbHost, port=dbPort)
+            connect = _connector(self._connect_function(db_api_2), (), dict(database=dbName, user=dbUsername, password=dbPassword, host=dbHost, port=dbPort))
         else:
             logger.debug ('Connecting using : %s.connect(database=%s, user=%s, password=%s, host=%s, port=%s) ' % (dbapiModuleName, dbName, dbUsername, dbPassword, dbHost, dbPort))
-            self._dbconnection = db_api_2.connect (database=dbName, user=dbUsername, password=dbPassword, host=dbHost, port=dbPort)
+            connect = _connector(self._connect_function(db_api_2), (), dict(database=dbName, user=dbUsername, password=dbPassword, host=dbHost, port=dbPort))
+        self._register_connection(alias, db_api_2, connect, autocommit, serverSideCursors)
             
-    def connect_to_database_using_custom_params(self, dbapiModuleName=None, db_connect_string=''):
+    def connect_to_database_using_custom_params(self, dbapiModuleName=None, db_connect_string='', alias='default', autocommit=False, serverSideCursors=False):
         """
         Loads the DB API 2.0 module given `dbapiModuleName` then uses it to 
         connect to the database using the map string `db_custom_param_string`.
+
+        The connection is registered in the connection pool under `alias`,
+        and can be put in `autocommit` mode or use `serverSideCursors`, as
+        with `Connect To Database`.
         
         Example usage:
         | # for psycopg2 |
@@ -95,19 +155,241 @@ class ConnectionManager(object):
         
         | # for JayDeBeApi | 
         | Connect To Database Using Custom Params | JayDeBeApi | 'oracle.jdbc.driver.OracleDriver', 'my_db_test', 'system', 's3cr3t' |
+
+        | # for sqlite3, registered under the alias `fixtures` |
+        | Connect To Database Using Custom Params | sqlite3 | database='fixtures.db' | alias=fixtures |
         """
         db_api_2 = __import__(dbapiModuleName)
         
         db_connect_string = 'db_api_2.connect(%s)' % db_connect_string
+        args, kwargs = eval(db_connect_string, globals(), {'db_api_2': _ArgumentRecorder()})
         
-        self._dbconnection = eval(db_connect_string)
+        self._register_connection(alias, db_api_2, _connector(self._connect_function(db_api_2), args, kwargs), autocommit, serverSideCursors)
         
-    def disconnect_from_database(self):
+    def switch_database(self, alias):
+        """
+        Makes the connection registered under `alias` the current one, and
+        returns the alias that was current before.
+
+        All `Query` and `Assertion` keywords use the current connection unless
+        they are given an explicit `alias` argument.
+
+        For example:
+        | Connect To Database | psycopg2 | oltp_db | alias=oltp |
+        | Connect To Database | psycopg2 | reporting_db | alias=reporting |
+        | ${previous} | Switch Database | oltp | # ${previous} is 'reporting' |
+        | Check If Exists In Database | select id from person | alias=reporting |
+        """
+        self._connectionPool.get_entry(alias)
+        previousAlias = self._currentAlias
+        self._currentAlias = alias
+        return previousAlias
+
+    def disconnect_from_database(self, alias=None):
         """
         Disconnects from the database.
         
+        If `alias` is not given, the current connection is closed. Once the
+        current connection is closed, there is no current connection until
+        `Switch Database` or `Connect To Database` is used again.
+
         For example:
         | Disconnect From Database | # disconnects from current connection to the database | 
+        | Disconnect From Database | reporting | # disconnects from the connection registered as `reporting` |
         """
-        self._dbconnection.close()
+        alias = alias or self._currentAlias
+        if alias is None:
+            return
+        self._connectionPool.close(alias)
+        if alias == self._currentAlias:
+            self._currentAlias = None
         
+    def disconnect_from_all_databases(self):
+        """
+        Disconnects from all the databases in the connection pool.
+
+        For example:
+        | Disconnect From All Databases |
+        """
+        self._connectionPool.close_all()
+        self._currentAlias = None
+
+    def set_logging_policy(self, sqlLogLevel='', maxLoggedLength=None, maxLoggedRows=None, alias=None):
+        """
+        Changes what is logged about the statements and results of the
+        connection of `alias` (or of the current connection), until it is
+        registered again. Settings that are not given are kept; new
+        connections start with the policy given when importing the library.
+
+        `sqlLogLevel` is the level statements are logged at, `NONE` to not
+        log them; statements are only formatted when Robot Framework logs
+        that level. Statements longer than `maxLoggedLength` characters are
+        cut and shown with their length and MD5 hash. Results in failure
+        messages show at most `maxLoggedRows` rows, or only the number of
+        rows if it is 0, and are cut to `maxLoggedLength` characters.
+
+        For example:
+        | Set Logging Policy | sqlLogLevel=NONE | # e.g. before running a generated script of many megabytes |
+        | Set Logging Policy | INFO | maxLoggedLength=200 | maxLoggedRows=0 | alias=reporting |
+        """
+        pooledConnection = self._get_pooled_connection(alias)
+        # An empty default, as Robot Framework turns `NONE` into None for
+        # arguments defaulting to None.
+        pooledConnection.loggingPolicy = pooledConnection.loggingPolicy.changed(sqlLogLevel or None, maxLoggedLength, maxLoggedRows)
+
+    def snapshot_database(self, snapshotName='default', alias=None, tables=None):
+        """
+        Saves the state of the database of `alias` (or of the current
+        connection) under `snapshotName`, so that `Restore Database
+        Snapshot` can bring it back much faster than replaying SQL scripts.
+
+        The fastest mechanism of the database is used: the online backup API
+        for SQLite and a copy of the database made by the server (`CREATE
+        DATABASE ... TEMPLATE`) for PostgreSQL, which requires all other
+        sessions to be disconnected from the database. For other databases,
+        through the connection broker (whose sessions stay connected to the
+        database), or if `tables` (a list or a comma separated string) is
+        given, the rows of the tables are dumped to a binary file instead,
+        parent tables first as far as the foreign keys of the catalog tell.
+
+        Taking a snapshot again under the same name replaces it.
+
+        For example:
+        | Execute Sql Script | ${EXECDIR}${/}resources${/}fixtures.sql |
+        | Snapshot Database | fixtures |
+        | Snapshot Database | reference | tables=country, city |
+        """
+        pooledConnection = self._get_snapshot_connection(alias)
+        key = (pooledConnection.alias, snapshotName)
+        if key in self._snapshots:
+            self._snapshots.pop(key).discard()
+        if tables is not None and not isinstance(tables, (list, tuple)):
+            tables = [table.strip() for table in tables.split(',')]
+        if self._snapshotDirectory is None:
+            self._snapshotDirectory = tempfile.mkdtemp(prefix='dblib-snapshots-')
+        snapshot = snapshot_for(pooledConnection, snapshotName, self._snapshotDirectory, tables)
+        startTime = time.time()
+        snapshot.take(pooledConnection)
+        self._snapshots[key] = snapshot
+        logger.info("Took snapshot '%s' of '%s' in %.3f s" % (snapshotName, pooledConnection.alias, time.time() - startTime))
+
+    def restore_database_snapshot(self, snapshotName='default', alias=None):
+        """
+        Brings the database of `alias` (or of the current connection) back
+        to the state saved by `Snapshot Database` under `snapshotName`. The
+        snapshot is kept, so it can be restored again, e.g. in every test
+        setup.
+
+        For example:
+        | Restore Database Snapshot | fixtures |
+        """
+        pooledConnection = self._get_snapshot_connection(alias)
+        snapshot = self._snapshots.get((pooledConnection.alias, snapshotName))
+        if snapshot is None:
+            raise RuntimeError("No snapshot '%s' of '%s', use 'Snapshot Database' first" % (snapshotName, pooledConnection.alias))
+        self._invalidate_query_cache(pooledConnection.alias)
+        self._invalidate_schema_catalog(pooledConnection.alias)
+        startTime = time.time()
+        snapshot.restore(pooledConnection)
+        logger.info("Restored snapshot '%s' of '%s' in %.3f s" % (snapshotName, pooledConnection.alias, time.time() - startTime))
+
+    def _get_snapshot_connection(self, alias):
+        pooledConnection = self._get_pooled_connection(alias)
+        if pooledConnection.holdsTransaction:
+            raise RuntimeError("Cannot snapshot or restore '%s' inside a transaction or an isolated test" % pooledConnection.alias)
+        connection = self._connectionPool.acquire(pooledConnection.alias)
+        connection.rollback()
+        return pooledConnection
+
+    def _discard_snapshots(self):
+        for (alias, snapshotName), snapshot in self._snapshots.items():
+            try:
+                snapshot.discard()
+            except Exception as e:
+                logger.warn("Could not discard snapshot '%s' of '%s' : %s" % (snapshotName, alias, e))
+        self._snapshots = {}
+        if self._snapshotDirectory is not None:
+            shutil.rmtree(self._snapshotDirectory, ignore_errors=True)
+            self._snapshotDirectory = None
+
+    def _connect_function(self, dbApiModule):
+        """
+        Returns the `connect` function of `dbApiModule`, or one connecting
+        through the connection broker if the library uses one.
+        """
+        if self._broker is None:
+            return dbApiModule.connect
+        return self._broker.connector(dbApiModule)
+
+    def _register_connection(self, alias, dbApiModule, connect, autocommit=False, serverSideCursors=False):
+        entry = self._connectionPool.register(alias, dbApiModule, connect, to_boolean(autocommit), to_boolean(serverSideCursors))
+        entry.loggingPolicy = self._loggingPolicy
+        self._currentAlias = alias
+
+    def _get_connection(self, alias=None, ownTransaction=False):
+        """
+        Returns the pooled connection of `alias`, or of the current alias if
+        no alias is given, instrumented to collect the query statistics.
+
+        Unless the caller controls the transaction itself (`ownTransaction`),
+        commits and rollbacks on the returned connection are skipped while a
+        transaction is held (see `Begin Transaction`) and in autocommit mode,
+        where there is nothing to end.
+        """
+        alias = alias or self._currentAlias
+        if alias is None:
+            raise RuntimeError("No database connection is open, use 'Connect To Database' first")
+        connection = self._connectionPool.acquire(alias)
+        entry = self._connectionPool.get_entry(alias)
+        keepTransaction = not ownTransaction and (entry.holdsTransaction or entry.autocommit)
+        return self._statistics.instrument(connection, alias, keepTransaction)
+
+    def _get_pooled_connection(self, alias=None):
+        """
+        Returns the pool entry of `alias`, or of the current alias if no
+        alias is given, without opening its connection.
+        """
+        alias = alias or self._currentAlias
+        if alias is None:
+            raise RuntimeError("No database connection is open, use 'Connect To Database' first")
+        return self._connectionPool.get_entry(alias)
+
+    def _get_dialect(self, alias=None):
+        return self._get_pooled_connection(alias).dialect
+
+    def _get_logging_policy(self, alias=None):
+        """
+        Returns the logging policy of the connection of `alias`, or the one
+        of new connections if there is no such connection.
+        """
+        try:
+            return self._get_pooled_connection(alias).loggingPolicy
+        except RuntimeError:
+            return self._loggingPolicy
+
+_DATABASE_ARGUMENTS = ('database', 'dbname', 'db')
+
+def _connector(connect, args, kwargs):
+    """
+    Returns a function calling `connect` with `args` and `kwargs`, which can
+    also be told to connect to another `database` of the same server (e.g.
+    to restore a PostgreSQL snapshot). The arguments are kept as its
+    `arguments` attribute, e.g. to open connections with an async driver.
+    """
+    def connect_to(database=None):
+        connectKwargs = dict(kwargs)
+        if database is not None:
+            databaseArgument = [name for name in _DATABASE_ARGUMENTS if name in kwargs] or ['dbname']
+            connectKwargs[databaseArgument[0]] = database
+        return connect(*args, **connectKwargs)
+    connect_to.arguments = (args, kwargs)
+    return connect_to
+
+class _ArgumentRecorder(object):
+    """
+    Stands for the DB API 2.0 module while evaluating a custom connect
+    string, to get the arguments of `connect` without connecting.
+    """
+
+    def connect(self, *args, **kwargs):
+        return args, kwargs
@@ -0,0 +1,295 @@
+#  Copyright (c) 2010 Franz Allan Valencia See
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import threading
+import time
+from collections import OrderedDict
+from robot.api import logger
+from DatabaseLibrary.dialect import dialect_for_module
+from DatabaseLibrary.logging_policy import LoggingPolicy
+from DatabaseLibrary.statement_cache import StatementCache
+
+class PooledConnection(object):
+    """
+    A named connection of the pool, together with the recipe to (re)open it.
+    """
+
+    def __init__(self, alias, dbApiModule, connect, autocommit=False, serverSideCursors=False, pool=None):
+        self.alias = alias
+        self.dbApiModule = dbApiModule
+        self.dialect = dialect_for_module(getattr(dbApiModule, '__name__', None))
+        self.paramstyle = getattr(dbApiModule, 'paramstyle', 'qmark')
+        self.connection = None
+        self.statementCache = None
+        self.schemaCatalog = None
+        self.loggingPolicy = LoggingPolicy()
+        self.createdAt = None
+        self.lastUsed = None
+        self.autocommit = autocommit
+        self.serverSideCursors = serverSideCursors
+        self.inTransaction = False
+        self.isolationDepth = 0
+        self.transactionIsolationDepth = None
+        self._connect = connect
+        self._pool = pool
+        self._spareConnections = []
+        self._borrowedAt = {}
+        self._spareLock = threading.Lock()
+
+    def is_open(self):
+        return self.connection is not None
+
+    @property
+    def holdsTransaction(self):
+        """
+        Whether the connection is inside a transaction that the keywords
+        must neither commit nor roll back, nor the pool close.
+        """
+        return self.inTransaction or self.isolationDepth > 0
+
+    def suspend_autocommit(self):
+        """
+        Turns autocommit off before a transaction is held, if the connection
+        was opened in autocommit mode.
+        """
+        if self.autocommit and not self.holdsTransaction:
+            self.dialect.set_autocommit(self.connection, False)
+
+    def restore_autocommit(self):
+        """
+        Turns autocommit back on once no transaction is held anymore.
+        """
+        if self.autocommit and not self.holdsTransaction and self.connection is not None:
+            self.dialect.set_autocommit(self.connection, True)
+
+    def open(self):
+        self.connection = self._open_connection()
+        # Statements prepared on the server would not follow a brokered connection to the next one.
+        serverSidePrepare = self.dialect.serverSidePrepare and not getattr(self.connection, 'brokered', False)
+        self.statementCache = StatementCache(self.paramstyle, serverSidePrepare)
+        self.createdAt = self.lastUsed = time.time()
+        return self.connection
+
+    def connect_arguments(self):
+        """
+        Returns the positional and keyword arguments of the `connect` function
+        of the driver, or None if they are not known.
+        """
+        return getattr(self._connect, 'arguments', None)
+
+    def connect_to(self, database):
+        """
+        Opens an extra connection to another `database` of the same server,
+        owned by the caller.
+        """
+        return self._connect(database)
+
+    def borrow_connection(self):
+        """
+        Returns an extra connection with the same parameters, for the use of
+        a single worker thread until it is given back. It is opened like the
+        connection of the entry, e.g. in autocommit mode. A spare connection
+        is handed out again only if the pool would reuse the connection of
+        the entry at the same age and after the same idle time.
+        """
+        while True:
+            with self._spareLock:
+                if not self._spareConnections:
+                    break
+                connection, createdAt, lastUsed = self._spareConnections.pop()
+            if self._pool is None or self._pool.is_reusable(self, connection, createdAt, lastUsed):
+                with self._spareLock:
+                    self._borrowedAt[id(connection)] = createdAt
+                return connection
+            self._close_connection(connection)
+        connection = self._open_connection()
+        with self._spareLock:
+            self._borrowedAt[id(connection)] = time.time()
+        return connection
+
+    def rollback_borrowed_connection(self, connection):
+        """
+        Rolls back what a worker left on a borrowed `connection`, unless it
+        is in autocommit mode, where there is no transaction to end.
+        """
+        if not self.autocommit:
+            connection.rollback()
+
+    def give_back_connection(self, connection, reusable=True, maxSpareConnections=None):
+        """
+        Keeps a borrowed connection for the next worker, unless it is not
+        `reusable`, the driver binds connections to the thread that opened
+        them (sqlite3) or `maxSpareConnections` (e.g. the number of worker
+        threads) are kept already, in which case it is closed.
+        """
+        with self._spareLock:
+            createdAt = self._borrowedAt.pop(id(connection), None)
+            if reusable and not self.dialect.threadBoundConnections and createdAt is not None and \
+                    (maxSpareConnections is None or len(self._spareConnections) < int(maxSpareConnections)):
+                self._spareConnections.append((connection, createdAt, time.time()))
+                return
+        self._close_connection(connection)
+
+    def close(self):
+        self.close_spare_connections()
+        if self.connection is None:
+            return
+        self._close_connection(self.connection)
+        self.connection = None
+
+    def close_spare_connections(self):
+        with self._spareLock:
+            spareConnections, self._spareConnections = self._spareConnections, []
+        for connection, createdAt, lastUsed in spareConnections:
+            self._close_connection(connection)
+
+    def _open_connection(self):
+        connection = self._connect()
+        if self.autocommit:
+            self.dialect.set_autocommit(connection, True)
+        return connection
+
+    def _close_connection(self, connection):
+        try:
+            connection.close()
+        except Exception as e:
+            logger.debug("Ignoring error while closing '%s' : %s" % (self.alias, e))
+
+class ConnectionPool(object):
+    """
+    ConnectionPool keeps the named connections of the Database Library.
+
+    At most `maxSize` connections are kept open at the same time; when that
+    limit is exceeded the least recently used one is closed, but its alias
+    stays registered and is transparently reopened the next time it is used.
+    Connections older than `maxAge` seconds are recycled, and connections
+    idle for more than `validationInterval` seconds are checked with
+    `validationQuery` (by default the one of the dialect of the connection)
+    before being handed out again, as are the spare connections kept for
+    worker threads (see `PooledConnection.borrow_connection`). Connections
+    holding a transaction are never closed by the pool.
+    """
+
+    def __init__(self, maxSize=8, maxAge=None, validationInterval=30, validationQuery=None):
+        self.maxSize = maxSize
+        self.maxAge = maxAge
+        self.validationInterval = validationInterval
+        self.validationQuery = validationQuery
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+
+    def register(self, alias, dbApiModule, connect, autocommit=False, serverSideCursors=False):
+        """
+        Registers (or replaces) `alias`, opening its connection right away.
+        """
+        with self._lock:
+            self.close(alias)
+            entry = PooledConnection(alias, dbApiModule, connect, autocommit, serverSideCursors, self)
+            entry.open()
+            self._entries[alias] = entry
+            self._evict(alias)
+            return entry
+
+    def acquire(self, alias):
+        """
+        Returns an open, validated connection for `alias`.
+        """
+        with self._lock:
+            entry = self.get_entry(alias)
+            now = time.time()
+            if not entry.is_open():
+                logger.debug("Reopening evicted connection '%s'" % alias)
+                entry.open()
+            elif entry.holdsTransaction:
+                pass
+            elif not self.is_reusable(entry, entry.connection, entry.createdAt, entry.lastUsed):
+                entry.close()
+                entry.open()
+            entry.lastUsed = now
+            self._touch(alias)
+            self._evict(alias)
+            return entry.connection
+
+    def is_reusable(self, entry, connection, createdAt, lastUsed):
+        """
+        Returns whether `connection` of `entry`, opened at `createdAt` and
+        last used at `lastUsed`, can be used again: it must not be older
+        than `maxAge`, and must pass validation if idle for longer than
+        `validationInterval`.
+        """
+        now = time.time()
+        if self.maxAge is not None and now - createdAt > self.maxAge:
+            logger.debug("Recycling connection '%s' older than %s seconds" % (entry.alias, self.maxAge))
+            return False
+        if self.validationInterval is not None and now - lastUsed > self.validationInterval:
+            if not self._is_valid(connection, self.validationQuery or entry.dialect.validationQuery):
+                logger.debug("Connection '%s' failed validation, reconnecting" % entry.alias)
+                return False
+        return True
+
+    def get_entry(self, alias):
+        with self._lock:
+            try:
+                return self._entries[alias]
+            except KeyError:
+                raise RuntimeError("No database connection registered with alias '%s'" % alias)
+
+    def aliases(self):
+        with self._lock:
+            return list(self._entries.keys())
+
+    def close(self, alias):
+        """
+        Closes `alias` and forgets about it.
+        """
+        with self._lock:
+            entry = self._entries.pop(alias, None)
+            if entry is not None:
+                entry.close()
+
+    def close_all(self):
+        with self._lock:
+            for alias in self.aliases():
+                self.close(alias)
+
+    def _touch(self, alias):
+        entry = self._entries.pop(alias)
+        self._entries[alias] = entry
+
+    def _evict(self, keepAlias):
+        openEntries = [entry for entry in self._entries.values() if entry.is_open()]
+        for entry in list(openEntries):
+            if len(openEntries) <= self.maxSize:
+                break
+            if entry.alias == keepAlias or entry.holdsTransaction:
+                continue
+            logger.debug("Evicting least recently used connection '%s'" % entry.alias)
+            entry.close()
+            openEntries.remove(entry)
+
+    def _is_valid(self, connection, validationQuery):
+        cur = None
+        try:
+            cur = connection.cursor()
+            cur.execute(validationQuery)
+            cur.fetchall()
+            return True
+        except Exception:
+            return False
+        finally:
+            if cur is not None:
+                try:
+                    cur.close()
+                except Exception:
+                    pass
@@ -0,0 +1,378 @@
+#  Copyright (c) 2010 Franz Allan Valencia See
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import csv
+import io
+import random
+import re
+import uuid
+from datetime import date, datetime, timedelta
+from itertools import islice, repeat
+from robot.api import logger
+from DatabaseLibrary.schema_catalog import CatalogColumn
+
+GENERATED_CHUNK_SIZE = 10000
+NULL_RATIO = 0.1
+FIRST_DATE = date(2020, 1, 1)
+DATE_RANGE_DAYS = 5 * 365
+
+_WORDS = ('alpha', 'bravo', 'charlie', 'delta', 'echo', 'foxtrot', 'golf', 'hotel', 'india', 'juliett',
+          'kilo', 'lima', 'mike', 'november', 'oscar', 'papa', 'quebec', 'romeo', 'sierra', 'tango',
+          'uniform', 'victor', 'whiskey', 'xray', 'yankee', 'zulu', 'amber', 'basalt', 'cobalt', 'dune',
+          'ember', 'fjord', 'granite', 'harbor', 'island', 'jade', 'lagoon', 'meadow', 'nectar', 'orchid')
+_DATES = tuple((FIRST_DATE + timedelta(days=day)).isoformat() for day in range(DATE_RANGE_DAYS))
+_TIMES = tuple('%02d:%02d:00' % divmod(minute, 60) for minute in range(24 * 60))
+
+_KIND_PATTERNS = (
+    ('boolean', re.compile(r'^(bool(ean)?|bit|tinyint\(1\))', re.IGNORECASE)),
+    ('integer', re.compile(r'^((tiny|small|medium|big)?int(eger)?[0-9]*|(small|big)?serial[0-9]*)\b', re.IGNORECASE)),
+    ('decimal', re.compile(r'^(numeric|decimal|dec|number|money)\b', re.IGNORECASE)),
+    ('float', re.compile(r'^(real|float|double|binary_float|binary_double)', re.IGNORECASE)),
+    ('timestamp', re.compile(r'^(timestamp|datetime|smalldatetime)', re.IGNORECASE)),
+    ('date', re.compile(r'^date\b', re.IGNORECASE)),
+    ('time', re.compile(r'^time\b', re.IGNORECASE)),
+    ('binary', re.compile(r'^(blob|bytea|(var)?binary|raw|long raw|image|(tiny|medium|long)blob)', re.IGNORECASE)),
+    ('uuid', re.compile(r'^(uuid|uniqueidentifier)', re.IGNORECASE)),
+)
+_SIZE_PATTERN = re.compile(r'\(\s*(\d+)\s*(?:,\s*(\d+)\s*)?\)')
+_DESCRIPTION_TYPES = (('NUMBER', 'integer'), ('DATETIME', 'timestamp'), ('BINARY', 'blob'), ('STRING', 'text'))
+
+class DataGenerator(object):
+    """
+    DataGenerator fills tables with synthetic rows, to load test data of a
+    realistic volume without writing it.
+
+    The rows are generated from the schema of the table, a chunk of rows at
+    a time and column by column, and loaded through the bulk path of
+    `Insert Rows`, or streamed into `COPY` with psycopg2.
+    """
+
+    def generate_rows_for_table(self, tableName, numRows, seed=0, columns=None, chunkSize=GENERATED_CHUNK_SIZE, alias=None):
+        """
+        Inserts `numRows` rows of generated data into the table `tableName`
+        and returns the number of inserted rows.
+
+        The values follow the types of the columns found in the catalog of
+        the database (or, for a table that is not in it, the description of
+        a query on the table): numbers, text fitting the length of the
+        column, dates, times and timestamps, booleans, binary values and
+        UUIDs. Nullable columns get NULL in about one row out of ten, NOT
+        NULL columns never do.
+
+        A column that is a primary or unique key on its own gets distinct
+        values, continuing after the rows already in the table, which must
+        fit the length of the column: e.g. a unique `VARCHAR(4)` column
+        holds at most 10000 of them. A column that is a foreign key on its
+        own gets values of the column it refers to, so fill the referenced
+        table first. Keys over several columns are not taken into account.
+
+        The same `seed` generates the same rows into the same tables.
+        `columns` (a list or a comma separated string) restricts the columns
+        that are filled, e.g. to leave identity columns and columns with a
+        default value to the database.
+
+        For example:
+        | Generate Rows For Table | customer | 10000 |
+        | Generate Rows For Table | orders | 100000 | seed=42 |
+        | Generate Rows For Table | orders | 1000 | columns=customer_id, amount, created |
+        """
+        numRows = int(numRows)
+        chunkSize = int(chunkSize)
+        generators = self._column_generators(tableName, columns, str(seed), numRows, alias)
+        columnNames = [generator.name for generator in generators]
+        logger.info("Generating %s rows for %s : %s" % (numRows, tableName, ', '.join(
+            '%s %s' % (generator.name, generator.describe()) for generator in generators)))
+        if self._is_psycopg2(alias):
+            rows = _generated_rows(generators, numRows, chunkSize, True)
+            return self._copy_csv(tableName, columnNames, _CsvStream(rows, chunkSize), ',', alias)
+        return self._insert_row_stream(tableName, columnNames, _generated_rows(generators, numRows, chunkSize, False),
+                                       chunkSize, alias)
+
+    def _column_generators(self, tableName, columns, seed, numRows, alias):
+        catalog = self._get_schema_catalog(alias)
+        tableColumns = catalog.table_columns(tableName)
+        if tableColumns is None:
+            tableColumns = self._described_columns(tableName, alias)
+            keys = []
+        else:
+            keys = catalog.table_keys(tableName) or []
+        if columns is not None and columns != '':
+            if isinstance(columns, str):
+                columns = columns.split(',')
+            byName = dict((column.name.lower(), column) for column in tableColumns)
+            for name in columns:
+                if name.strip().lower() not in byName:
+                    raise ValueError("Table '%s' has no column '%s'" % (tableName, name.strip()))
+            tableColumns = [byName[name.strip().lower()] for name in columns]
+        uniqueColumns = set(key.columns[0].lower() for key in keys
+                            if key.kind in ('PRIMARY KEY', 'UNIQUE') and len(key.columns) == 1)
+        foreignKeys = dict((key.columns[0].lower(), key) for key in keys
+                           if key.kind == 'FOREIGN KEY' and len(key.columns) == 1)
+        rowCount = None
+        generators = []
+        for column in tableColumns:
+            unique = column.name.lower() in uniqueColumns
+            generator = _ColumnGenerator(column, '%s/%s/%s' % (seed, tableName.lower(), column.name.lower()), unique)
+            foreignKey = foreignKeys.get(column.name.lower())
+            if foreignKey is not None:
+                generator.choices = self._referenced_values(tableName, column, foreignKey, unique, generator.rng,
+                                                            numRows, alias)
+            elif unique and generator.kind in ('integer', 'decimal', 'float'):
+                maxValue = self._fetch_value('SELECT MAX(%s) FROM %s' % (column.name, tableName), alias)
+                generator.start = 1 if maxValue is None else int(maxValue) + 1
+            elif unique:
+                if rowCount is None:
+                    rowCount = int(self._fetch_value('SELECT COUNT(*) FROM %s' % tableName, alias))
+                generator.start = rowCount
+            generator.prepare(numRows)
+            generators.append(generator)
+        return generators
+
+    def _referenced_values(self, tableName, column, foreignKey, unique, rng, numRows, alias):
+        """
+        Returns the values of the column referenced by `foreignKey` to choose
+        from, or, for a unique column, the `numRows` values it takes in turn.
+        """
+        referencedColumn = foreignKey.referencedColumns[0] if foreignKey.referencedColumns else None
+        if referencedColumn is None:
+            primaryKeys = [key for key in self._get_schema_catalog(alias).table_keys(foreignKey.referencedTable) or []
+                           if key.kind == 'PRIMARY KEY' and len(key.columns) == 1]
+            if not primaryKeys:
+                raise RuntimeError("Cannot tell the column referenced by the foreign key of column '%s'" % column.name)
+            referencedColumn = primaryKeys[0].columns[0]
+        selectStatement = 'SELECT DISTINCT %s FROM %s WHERE %s IS NOT NULL' % (
+            referencedColumn, foreignKey.referencedTable, referencedColumn)
+        if unique:
+            selectStatement += ' AND %s NOT IN (SELECT %s FROM %s WHERE %s IS NOT NULL)' % (
+                referencedColumn, column.name, tableName, column.name)
+        values = [row[0] for batch in self._fetch_batches('%s ORDER BY %s' % (selectStatement, referencedColumn),
+                                                          alias, GENERATED_CHUNK_SIZE) for row in batch]
+        if unique and len(values) < numRows:
+            raise RuntimeError("Table '%s' has %s unused values of '%s' for the unique foreign key '%s', %s needed"
+                               % (foreignKey.referencedTable, len(values), referencedColumn, column.name, numRows))
+        if not values:
+            if not column.nullable:
+                raise RuntimeError("Table '%s' has no rows for the foreign key '%s' to refer to, fill it first"
+                                   % (foreignKey.referencedTable, column.name))
+            return [None]
+        return rng.sample(values, numRows) if unique else values
+
+    def _described_columns(self, tableName, alias):
+        """
+        Returns the columns of `tableName` guessed from the description of a
+        query on it, with the type objects of the DB API module.
+        """
+        dbApiModule = self._get_pooled_connection(alias).dbApiModule
+        connection = self._get_connection(alias)
+        try:
+            cur = connection.cursor()
+            cur.execute('SELECT * FROM %s WHERE 1 = 0' % tableName)
+            description = cur.description
+        finally:
+            connection.rollback()
+        return [CatalogColumn(column[0], _description_type(dbApiModule, column[1]), bool(column[6]))
+                for column in description]
+
+    def _fetch_value(self, selectStatement, alias):
+        for batch in self._fetch_batches(selectStatement, alias, 1):
+            return batch[0][0]
+        return None
+
+class _ColumnGenerator(object):
+    """
+    Generates the values of one column a chunk at a time, from random
+    generators of its own seeded with `seed`, so that the values of a
+    column do not depend on the other columns or on the chunk size: one for
+    the values, drawing the same numbers for every row, and one for NULLs.
+    """
+
+    def __init__(self, column, seed, unique):
+        self.name = column.name
+        self.type = column.type
+        self.kind = _kind(column.type)
+        self.length, self.scale = _size(column.type)
+        self.nullable = column.nullable and not unique
+        self.unique = unique
+        self.start = 0
+        self.choices = None
+        self.rng = random.Random(seed)
+        self._nullRng = random.Random('%s/null' % seed)
+
+    def prepare(self, numRows):
+        if self.kind == 'text':
+            if self.unique:
+                digits = len(str(max(self.start + numRows - 1, 0)))
+                if self.length and digits > self.length:
+                    raise RuntimeError("Column '%s' of type %s is too short for %s distinct values after %s rows, "
+                                       "which take up to %s characters" % (self.name, self.type, numRows, self.start, digits))
+                self.prefix = ('%s-' % self.name)[:self.length - digits] if self.length else '%s-' % self.name
+            else:
+                self.words = [word[:self.length] for word in _WORDS] if self.length else _WORDS
+        elif self.kind == 'integer':
+            self.span = 100 if self.type.strip().lower().startswith('tiny') else 10000
+        elif self.kind == 'decimal':
+            scale = self.scale if self.scale is not None else (2 if self.length is None else 0)
+            self.factor = 10 ** scale
+            self.span = min(10 ** (8 if self.length is None else self.length - scale), 10000) * self.factor
+        elif self.kind == 'date':
+            # Unique dates are the days from FIRST_DATE on, up to the last date Python has.
+            if self.unique and self.start + numRows > (date.max - FIRST_DATE).days + 1:
+                raise RuntimeError("Column '%s' of type %s holds at most %s distinct dates, %s needed after %s rows"
+                                   % (self.name, self.type, (date.max - FIRST_DATE).days + 1, numRows, self.start))
+        elif self.kind == 'binary':
+            self.size = min(self.length or 16, 16)
+            if self.unique and self.start + numRows > 256 ** self.size:
+                raise RuntimeError("Column '%s' of type %s is too short for %s distinct values after %s rows"
+                                   % (self.name, self.type, numRows, self.start))
+
+    def describe(self):
+        if self.choices is not None:
+            return 'referencing %s values' % len(self.choices)
+        return '%s%s%s' % (self.kind, ' unique' if self.unique else '', ' nullable' if self.nullable else '')
+
+    def values(self, offset, count):
+        if self.choices is not None:
+            if self.unique:
+                values = self.choices[offset:offset + count]
+            else:
+                values = self.rng.choices(self.choices, k=count)
+        elif self.unique and self.kind in _UNIQUE_VALUES:
+            values = _UNIQUE_VALUES[self.kind](self, self.start + offset, count)
+        else:
+            values = _RANDOM_VALUES[self.kind](self, count)
+        if self.nullable:
+            rand = self._nullRng.random
+            values = [None if rand() < NULL_RATIO else value for value in values]
+        return values
+
+def _integers(generator, count):
+    return generator.rng.choices(range(generator.span), k=count)
+
+def _decimals(generator, count):
+    rand, span, factor = generator.rng.random, generator.span, generator.factor
+    return [int(rand() * span) / factor for _ in repeat(None, count)]
+
+def _floats(generator, count):
+    rand = generator.rng.random
+    return [rand() * 10000 for _ in repeat(None, count)]
+
+def _texts(generator, count):
+    return generator.rng.choices(generator.words, k=count)
+
+def _dates(generator, count):
+    return generator.rng.choices(_DATES, k=count)
+
+def _timestamps(generator, count):
+    rand, dates, times = generator.rng.random, len(_DATES), len(_TIMES)
+    return ['%s %s' % (_DATES[int(rand() * dates)], _TIMES[int(rand() * times)]) for _ in repeat(None, count)]
+
+def _times(generator, count):
+    return generator.rng.choices(_TIMES, k=count)
+
+def _booleans(generator, count):
+    rand = generator.rng.random
+    return [rand() < 0.5 for _ in repeat(None, count)]
+
+def _binaries(generator, count):
+    getrandbits, size = generator.rng.getrandbits, generator.size
+    return [getrandbits(size * 8).to_bytes(size, 'big') for _ in repeat(None, count)]
+
+def _uuids(generator, count):
+    getrandbits = generator.rng.getrandbits
+    return [str(uuid.UUID(int=getrandbits(128), version=4)) for _ in repeat(None, count)]
+
+_RANDOM_VALUES = {
+    'integer': _integers, 'decimal': _decimals, 'float': _floats, 'text': _texts, 'date': _dates,
+    'timestamp': _timestamps, 'time': _times, 'boolean': _booleans, 'binary': _binaries, 'uuid': _uuids,
+}
+
+_UNIQUE_VALUES = {
+    'integer': lambda generator, start, count: list(range(start, start + count)),
+    'decimal': lambda generator, start, count: list(range(start, start + count)),
+    'float': lambda generator, start, count: list(range(start, start + count)),
+    'text': lambda generator, start, count: ['%s%d' % (generator.prefix, number) for number in range(start, start + count)],
+    'date': lambda generator, start, count: [(FIRST_DATE + timedelta(days=day)).isoformat()
+                                             for day in range(start, start + count)],
+    'timestamp': lambda generator, start, count: [(datetime(2020, 1, 1) + timedelta(seconds=second)).isoformat(' ')
+                                                  for second in range(start, start + count)],
+    'binary': lambda generator, start, count: [number.to_bytes(generator.size, 'big')
+                                               for number in range(start, start + count)],
+}
+
+def _generated_rows(generators, numRows, chunkSize, forCopy):
+    """
+    Generator that yields `numRows` rows, generated `chunkSize` rows at a
+    time column by column. Binary values are written as hexadecimal text for
+    `COPY` if `forCopy`.
+    """
+    for offset in range(0, numRows, chunkSize):
+        count = min(chunkSize, numRows - offset)
+        columnValues = []
+        for generator in generators:
+            values = generator.values(offset, count)
+            if forCopy and generator.kind == 'binary':
+                values = [None if value is None else '\\x%s' % value.hex() for value in values]
+            columnValues.append(values)
+        for row in zip(*columnValues):
+            yield row
+
+class _CsvStream(object):
+    """
+    A file-like object reading `rows` as CSV text, which formats them
+    `chunkSize` rows at a time as `COPY` reads it.
+    """
+
+    def __init__(self, rows, chunkSize):
+        self._rows = rows
+        self._chunkSize = chunkSize
+        self._buffer = ''
+        self._position = 0
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) - self._position < size:
+            chunk = list(islice(self._rows, self._chunkSize))
+            if not chunk:
+                break
+            text = io.StringIO()
+            csv.writer(text, lineterminator='\n').writerows(chunk)
+            self._buffer = self._buffer[self._position:] + text.getvalue()
+            self._position = 0
+        end = len(self._buffer) if size < 0 else self._position + size
+        data = self._buffer[self._position:end]
+        self._position = min(end, len(self._buffer))
+        return data
+
+def _kind(typeName):
+    for kind, pattern in _KIND_PATTERNS:
+        if pattern.match(typeName.strip()):
+            return kind
+    return 'text'
+
+def _size(typeName):
+    """
+    Returns the length (or precision) and scale declared in `typeName`, each
+    None if not declared.
+    """
+    match = _SIZE_PATTERN.search(typeName)
+    if match is None:
+        return None, None
+    return int(match.group(1)), None if match.group(2) is None else int(match.group(2))
+
+def _description_type(dbApiModule, typeCode):
+    if isinstance(typeCode, str):
+        return typeCode
+    for typeObject, typeName in _DESCRIPTION_TYPES:
+        if typeCode is not None and getattr(dbApiModule, typeObject, None) == typeCode:
+            return typeName
+    return 'text'
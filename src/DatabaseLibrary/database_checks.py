@@ -0,0 +1,378 @@
+#  Copyright (c) 2010 Franz Allan Valencia See
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import asyncio
+import importlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from robot.api import logger
+from DatabaseLibrary.assertion import (EXISTENCE_SAMPLE_SIZE, equal_rows_failure, exists_failure, less_rows_failure,
+                                       more_rows_failure, no_rows_failure, not_exists_failure)
+
+DEFAULT_CHECK_CONCURRENCY = 8
+ENGINES = ('auto', 'async', 'threads')
+
+class DatabaseChecks(object):
+    """
+    DatabaseChecks runs many checks at once on an asyncio event loop, so
+    that suites waiting on a remote database take about as long as their
+    slowest query rather than the sum of all of them.
+
+    Checks run through the async driver of the database when it is
+    installed (`aiosqlite` for sqlite3, `asyncpg` for psycopg2, `aiomysql`
+    for PyMySQL and MySQLdb), on connections opened for the keyword and
+    closed after it. Otherwise, or through the connection broker, each
+    check runs on a worker thread with a connection borrowed from the
+    pool, as `Execute Queries In Parallel` does. Either way the checks use
+    connections of their own, so they do not see the changes of an open
+    transaction, and an SQLite `:memory:` database is a different, empty
+    database for them.
+    """
+
+    def run_database_checks(self, checks, concurrency=DEFAULT_CHECK_CONCURRENCY, alias=None, engine='auto'):
+        """
+        Runs all `checks` concurrently, at most `concurrency` at a time, and
+        returns the list of their results in the same order: the rows for
+        `Query`, and None for the assertions. Once all checks are done, the
+        failed ones are reported together in an AssertionError.
+
+        Every check is a list of a keyword, a select statement and the other
+        arguments of the keyword, if any. The keywords are `Query`, `Check If
+        Exists In Database`, `Check If Not Exists In Database`, `Row Count Is
+        0`, `Row Count Is Equal To X`, `Row Count Is Greater Than X` and `Row
+        Count Is Less Than X`, which fetch only as many rows as they need
+        (the `Row Count Is *` checks count them on the server when the
+        database can limit rows) and fail with the same messages as the
+        keywords themselves.
+
+        `engine` is `auto` (the async driver if installed, else threads),
+        `async` or `threads`.
+
+        For example:
+        | ${check1} | Create List | Check If Exists In Database | select id from person where first_name = 'Franz Allan' |
+        | ${check2} | Create List | Row Count Is Equal To X | select id from person | 2 |
+        | ${check3} | Create List | Query | select count(*) from employee |
+        | ${results} | Run Database Checks | ${{[$check1, $check2, $check3]}} |
+        | Log | ${results[2][0][0]} employees |
+        """
+        checks = [_Check.parse(check) for check in checks]
+        if not checks:
+            return []
+        pooledConnection = self._get_pooled_connection(alias)
+        runner = self._check_runner(pooledConnection, engine, int(concurrency))
+        loop = asyncio.new_event_loop()
+        startTime = time.time()
+        try:
+            outcomes = loop.run_until_complete(_run_checks(runner, checks, pooledConnection.dialect, int(concurrency)))
+        finally:
+            try:
+                loop.run_until_complete(runner.close())
+            finally:
+                loop.close()
+        self._statistics.flush_warnings()
+        loggingPolicy = pooledConnection.loggingPolicy
+        results = []
+        failures = []
+        slowest = 0.0
+        for check, (fetched, error, elapsed) in zip(checks, outcomes):
+            slowest = max(slowest, elapsed)
+            self._statistics.record(pooledConnection.alias, check.statement, elapsed, check.fetched_rows(fetched),
+                                    failed=error is not None)
+            if error is None:
+                loggingPolicy.log_sql("%s in %.3f s" % (check.keyword, elapsed), check.statement)
+                failure = check.failure(fetched, loggingPolicy)
+            else:
+                failure = "'%s' failed : %s" % (loggingPolicy.sql(check.statement), error)
+            results.append(check.result(fetched) if failure is None else None)
+            if failure is not None:
+                failures.append("%s : %s" % (check.keyword, failure))
+        logger.info("Ran %s checks with %s in %.3f s, the slowest in %.3f s"
+                    % (len(checks), runner.name, time.time() - startTime, slowest))
+        if failures:
+            raise AssertionError("%s of %s database checks failed:\n%s" % (len(failures), len(checks), '\n'.join(failures)))
+        return results
+
+    def _check_runner(self, pooledConnection, engine, concurrency):
+        engine = str(engine).lower()
+        if engine not in ENGINES:
+            raise ValueError("Invalid engine '%s', expected one of %s" % (engine, ', '.join(ENGINES)))
+        if engine != 'threads':
+            runner = _AsyncDriverRunner.create(pooledConnection) if self._broker is None else None
+            if runner is not None:
+                return runner
+            if engine == 'async':
+                raise RuntimeError("No async driver is installed for %s" % pooledConnection.dbApiModule.__name__)
+        return _ThreadRunner(pooledConnection, concurrency)
+
+async def _run_checks(runner, checks, dialect, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(check):
+        async with semaphore:
+            startTime = time.time()
+            try:
+                fetched = await _fetch_check(runner, check, dialect)
+                return fetched, None, time.time() - startTime
+            except Exception as e:
+                return None, e, time.time() - startTime
+
+    return await asyncio.gather(*[run(check) for check in checks])
+
+async def _fetch_check(runner, check, dialect):
+    """
+    Returns the row count of `check` if it counts rows, and else its rows.
+    """
+    if check.counted:
+        # Only the first rows are counted, so no more than one value comes back.
+        countStatement = dialect.wrap_count(check.statement)
+        limitStatement = countStatement and dialect.wrap_limit(check.statement, check.maxRows, '1 AS one')
+        if limitStatement is not None:
+            try:
+                return int((await runner.fetch(dialect.wrap_count(limitStatement), 1))[0][0])
+            except Exception as e:
+                logger.debug("Counting on the server failed, counting fetched rows instead : %s" % e)
+        return len(await runner.fetch(check.statement, check.maxRows))
+    if check.maxRows is not None:
+        limitStatement = dialect.wrap_limit(check.statement, check.maxRows)
+        if limitStatement is not None:
+            try:
+                return await runner.fetch(limitStatement, check.maxRows)
+            except Exception as e:
+                logger.debug("Limiting rows on the server failed, fetching the first rows instead : %s" % e)
+    return await runner.fetch(check.statement, check.maxRows)
+
+class _Check(object):
+    """
+    A check of `Run Database Checks`: the keyword, its statement and
+    arguments, the number of rows it needs (None for all of them) and
+    whether it only counts them.
+    """
+
+    def __init__(self, keyword, statement, arguments):
+        self.keyword = keyword
+        self.statement = statement
+        kind = _CHECK_KINDS.get(str(keyword).lower().replace(' ', '').replace('_', ''))
+        if kind is None:
+            raise ValueError("Keyword '%s' cannot be used in Run Database Checks" % keyword)
+        maxRows, self._failure, self.counted = kind
+        try:
+            self.arguments = [int(argument) for argument in arguments]
+            self.maxRows = maxRows(*self.arguments)
+        except (TypeError, ValueError):
+            raise ValueError("Invalid arguments for '%s' in Run Database Checks : %s" % (keyword, list(arguments)))
+
+    @classmethod
+    def parse(cls, check):
+        if isinstance(check, str) or len(check) < 2:
+            raise ValueError("A database check is a list of a keyword, a statement and its arguments, got %s" % (check,))
+        return cls(check[0], check[1], check[2:])
+
+    def failure(self, fetched, loggingPolicy):
+        """
+        Returns the message the keyword of the check fails with for the
+        `fetched` rows (or row count), or None if the check passed.
+        """
+        if self._failure is None:
+            return None
+        return self._failure(loggingPolicy.sql(self.statement), fetched, loggingPolicy, *self.arguments)
+
+    def fetched_rows(self, fetched):
+        if fetched is None:
+            return 0
+        return 1 if self.counted else len(fetched)
+
+    def result(self, fetched):
+        return fetched if self._failure is None else None
+
+# The number of rows each keyword needs, from its arguments, its failure from
+# the fetched rows (or row count) and whether it counts rows.
+_CHECK_KINDS = {
+    'query': (lambda: None, None, False),
+    'checkifexistsindatabase': (lambda: 1, lambda sql, rows, loggingPolicy: exists_failure(sql, bool(rows)), False),
+    'checkifnotexistsindatabase': (lambda: EXISTENCE_SAMPLE_SIZE, not_exists_failure, False),
+    'rowcountis0': (lambda: 1, lambda sql, rowCount, loggingPolicy: no_rows_failure(sql, rowCount), True),
+    'rowcountisequaltox': (lambda numRows: numRows + 1,
+                           lambda sql, rowCount, loggingPolicy, numRows: equal_rows_failure(sql, rowCount, numRows), True),
+    'rowcountisgreaterthanx': (lambda numRows: numRows + 1,
+                               lambda sql, rowCount, loggingPolicy, numRows: more_rows_failure(sql, rowCount, numRows), True),
+    'rowcountislessthanx': (lambda numRows: numRows,
+                            lambda sql, rowCount, loggingPolicy, numRows: less_rows_failure(sql, rowCount, numRows), True),
+}
+
+class _ThreadRunner(object):
+    """
+    Runs the statements of the checks with the DB API 2.0 driver, on worker
+    threads each borrowing a connection of `pooledConnection`.
+    """
+
+    name = 'threads'
+
+    def __init__(self, pooledConnection, concurrency):
+        self._pooledConnection = pooledConnection
+        self._concurrency = concurrency
+        self._executor = ThreadPoolExecutor(max_workers=concurrency)
+
+    async def fetch(self, selectStatement, maxRows):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._fetch, selectStatement, maxRows)
+
+    def _fetch(self, selectStatement, maxRows):
+        connection = self._pooledConnection.borrow_connection()
+        reusable = False
+        try:
+            cur = connection.cursor()
+            try:
+                cur.execute(selectStatement)
+                return cur.fetchall() if maxRows is None else cur.fetchmany(maxRows)
+            finally:
+                self._pooledConnection.rollback_borrowed_connection(connection)
+                reusable = True
+        finally:
+            self._pooledConnection.give_back_connection(connection, reusable, self._concurrency)
+
+    async def close(self):
+        self._executor.shutdown(wait=True)
+
+class _AsyncDriverRunner(object):
+    """
+    Runs the statements of the checks with an async driver, on connections
+    opened as they are needed (as many as checks run at the same time).
+    """
+
+    def __init__(self, driver, args, kwargs):
+        self.name = driver.moduleName
+        self._driver = driver
+        self._args = args
+        self._kwargs = kwargs
+        self._idle = []
+        self._opened = []
+
+    @classmethod
+    def create(cls, pooledConnection):
+        """
+        Returns a runner for the async driver matching the driver of
+        `pooledConnection`, or None if it is not installed or the arguments
+        of the connection cannot be given to it.
+        """
+        driverClass = _ASYNC_DRIVERS.get(getattr(pooledConnection.dbApiModule, '__name__', None))
+        arguments = pooledConnection.connect_arguments()
+        if driverClass is None or arguments is None:
+            return None
+        try:
+            driver = driverClass(importlib.import_module(driverClass.moduleName))
+        except ImportError:
+            return None
+        arguments = driver.arguments(*arguments)
+        if arguments is None:
+            return None
+        return cls(driver, arguments[0], arguments[1])
+
+    async def fetch(self, selectStatement, maxRows):
+        connection = self._idle.pop() if self._idle else None
+        if connection is None:
+            connection = await self._driver.connect(self._args, self._kwargs)
+            self._opened.append(connection)
+        try:
+            return await self._driver.fetch(connection, selectStatement, maxRows)
+        finally:
+            self._idle.append(connection)
+
+    async def close(self):
+        for connection in self._opened:
+            try:
+                await connection.close() if self._driver.asyncClose else connection.close()
+            except Exception as e:
+                logger.debug("Ignoring error while closing a %s connection : %s" % (self.name, e))
+
+class _AsyncDriver(object):
+    """
+    Opens connections and runs statements with the async driver `module`.
+    """
+
+    moduleName = None
+    asyncClose = True
+
+    def __init__(self, module):
+        self.module = module
+
+class _AiosqliteDriver(_AsyncDriver):
+    moduleName = 'aiosqlite'
+
+    def arguments(self, args, kwargs):
+        return args, kwargs
+
+    async def connect(self, args, kwargs):
+        return await self.module.connect(*args, **kwargs)
+
+    async def fetch(self, connection, selectStatement, maxRows):
+        cur = await connection.execute(selectStatement)
+        try:
+            return list(await (cur.fetchall() if maxRows is None else cur.fetchmany(maxRows)))
+        finally:
+            await cur.close()
+            await connection.rollback()
+
+class _AsyncpgDriver(_AsyncDriver):
+    """
+    asyncpg takes the keyword arguments of psycopg2 under other names, and
+    runs every statement in a transaction of its own.
+    """
+
+    moduleName = 'asyncpg'
+    _ARGUMENT_NAMES = {'database': 'database', 'dbname': 'database', 'user': 'user', 'password': 'password',
+                       'host': 'host', 'port': 'port'}
+
+    def arguments(self, args, kwargs):
+        if args or set(kwargs) - set(self._ARGUMENT_NAMES):
+            return None
+        return (), dict([(self._ARGUMENT_NAMES[name], value) for name, value in kwargs.items()])
+
+    async def connect(self, args, kwargs):
+        return await self.module.connect(**kwargs)
+
+    async def fetch(self, connection, selectStatement, maxRows):
+        if maxRows is None:
+            return [tuple(record) for record in await connection.fetch(selectStatement)]
+        async with connection.transaction():
+            cur = await connection.cursor(selectStatement)
+            return [tuple(record) for record in await cur.fetch(maxRows)]
+
+class _AiomysqlDriver(_AsyncDriver):
+    moduleName = 'aiomysql'
+    asyncClose = False
+    _ARGUMENT_NAMES = {'db': 'db', 'database': 'db', 'user': 'user', 'passwd': 'password', 'password': 'password',
+                       'host': 'host', 'port': 'port'}
+
+    def arguments(self, args, kwargs):
+        if args or set(kwargs) - set(self._ARGUMENT_NAMES):
+            return None
+        return (), dict([(self._ARGUMENT_NAMES[name], value) for name, value in kwargs.items()])
+
+    async def connect(self, args, kwargs):
+        return await self.module.connect(**kwargs)
+
+    async def fetch(self, connection, selectStatement, maxRows):
+        cur = await connection.cursor()
+        try:
+            await cur.execute(selectStatement)
+            return list(await (cur.fetchall() if maxRows is None else cur.fetchmany(maxRows)))
+        finally:
+            await cur.close()
+            await connection.rollback()
+
+_ASYNC_DRIVERS = {
+    'sqlite3': _AiosqliteDriver,
+    'psycopg2': _AsyncpgDriver,
+    'pymysql': _AiomysqlDriver,
+    'MySQLdb': _AiomysqlDriver,
+}
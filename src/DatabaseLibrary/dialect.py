@@ -0,0 +1,464 @@
+#  Copyright (c) 2010 Franz Allan Valencia See
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import itertools
+import re
+import select
+import time
+
+_SELECT_PATTERN = re.compile(r'^\s*select\b', re.IGNORECASE)
+
+_cursorNumbers = itertools.count(1)
+
+class Dialect(object):
+    """
+    Dialect knows how to rewrite a statement for a family of databases.
+
+    The generic dialect only relies on SQL that every database understands,
+    and returns None for the rewrites it cannot do safely.
+    """
+
+    name = 'generic'
+    multiStatementExecute = False
+    serverSidePrepare = False
+    backslashEscapes = False
+    threadBoundConnections = False
+    serverSideCursorBlocksConnection = False
+    validationQuery = 'SELECT 1'
+
+    def wrap_count(self, selectStatement):
+        """
+        Returns a statement that counts the rows of `selectStatement` on the
+        server, or None if the statement cannot be used as a subquery.
+        """
+        selectStatement = strip_statement(selectStatement)
+        if not is_select(selectStatement):
+            return None
+        return 'SELECT COUNT(*) FROM (%s) row_count_query' % selectStatement
+
+    def wrap_exists(self, selectStatement):
+        """
+        Returns a statement whose single value is 1 if `selectStatement`
+        returns any row and 0 otherwise, or None if this dialect cannot ask
+        that question.
+        """
+        return None
+
+    def wrap_limit(self, selectStatement, maxRows, selectList='*'):
+        """
+        Returns a statement that selects `selectList` from at most `maxRows`
+        rows of `selectStatement`, or None if this dialect cannot limit rows.
+        """
+        return None
+
+    def bucket_checksums(self, selectStatement, buckets):
+        """
+        Returns a statement that hashes every row of `selectStatement` into
+        one of `buckets` buckets and returns the bucket number, row count and
+        checksum of each bucket, or None if this dialect cannot hash rows.
+        """
+        return None
+
+    def rows_in_buckets(self, selectStatement, buckets, selectedBuckets):
+        """
+        Returns a statement that selects the rows of `selectStatement` that
+        `bucket_checksums` puts in `selectedBuckets`.
+        """
+        return None
+
+    def list_tables(self):
+        """
+        Returns a statement listing the names of the tables of the current
+        database (or schema).
+        """
+        return ("SELECT table_name FROM information_schema.tables WHERE table_type = 'BASE TABLE' "
+                "AND table_schema NOT IN ('information_schema', 'pg_catalog') ORDER BY table_name")
+
+    def table_in_any_schema(self, tableName):
+        """
+        Returns a statement returning a row if a table named `tableName`
+        exists in any schema (or database) the connection can see, beyond
+        those of the schema catalog, or None if the dialect cannot tell.
+        """
+        return "SELECT table_name FROM information_schema.tables WHERE table_name = '%s'" % tableName.replace("'", "''")
+
+    def catalog_columns(self):
+        """
+        Returns a statement listing the columns of the tables and views of
+        the current database (or schema) as (table, column, type, nullable)
+        rows, the columns of a table in their order.
+        """
+        return ("SELECT table_name, column_name, data_type, is_nullable FROM information_schema.columns "
+                "WHERE table_schema NOT IN ('information_schema', 'pg_catalog') "
+                "ORDER BY table_name, ordinal_position")
+
+    def explain(self, selectStatement):
+        """
+        Returns the statement reading the plan of `selectStatement` without
+        running it, or None if the dialect does not know how to read plans.
+        """
+        return None
+
+    def catalog_indexes(self):
+        """
+        Returns a statement listing the indexes of the current database (or
+        schema) as (table, index, column) rows, the columns of an index in
+        their order, or None if the dialect does not know how.
+        """
+        return None
+
+    def catalog_keys(self):
+        """
+        Returns a statement listing the primary, unique and foreign keys of
+        the tables of the current database (or schema) as (table, key, kind,
+        column, referenced table, referenced column) rows, where `kind` is
+        `PRIMARY KEY`, `UNIQUE` or `FOREIGN KEY`, or None if the dialect
+        does not know how.
+        """
+        return ("SELECT tc.table_name, tc.constraint_name, tc.constraint_type, kcu.column_name, "
+                "ccu.table_name, ccu.column_name FROM information_schema.table_constraints tc "
+                "JOIN information_schema.key_column_usage kcu ON kcu.constraint_schema = tc.constraint_schema "
+                "AND kcu.constraint_name = tc.constraint_name AND kcu.table_name = tc.table_name "
+                "LEFT JOIN information_schema.constraint_column_usage ccu ON tc.constraint_type = 'FOREIGN KEY' "
+                "AND ccu.constraint_schema = tc.constraint_schema AND ccu.constraint_name = tc.constraint_name "
+                "WHERE tc.constraint_type IN ('PRIMARY KEY', 'UNIQUE', 'FOREIGN KEY') "
+                "AND tc.table_schema NOT IN ('information_schema', 'pg_catalog') "
+                "ORDER BY tc.table_name, tc.constraint_name, kcu.ordinal_position")
+
+    def set_autocommit(self, connection, autocommit):
+        """
+        Turns the autocommit mode of `connection` on or off, through the
+        `autocommit` attribute or method most drivers have.
+        """
+        setting = getattr(connection, 'autocommit', None)
+        if setting is None:
+            raise RuntimeError("%s connections do not support autocommit" % type(connection).__module__)
+        if callable(setting):
+            setting(autocommit)
+        else:
+            connection.autocommit = autocommit
+
+    def server_side_cursor(self, dbApiModule, withHold=False):
+        """
+        Returns the arguments (a tuple of args and kwargs) to pass to
+        `connection.cursor()` for a cursor that keeps its result on the
+        server, or None if the plain cursor of the driver already fetches
+        rows lazily (e.g. sqlite3) or the driver has no such cursor.
+        """
+        return None
+
+    def listen(self, channel):
+        """
+        Returns the statement subscribing the connection to the notifications
+        of `channel`, or None if the dialect cannot wait for notifications.
+        """
+        return None
+
+    def unlisten(self, channel):
+        return None
+
+    def wait_for_notification(self, connection, timeout):
+        """
+        Waits at most `timeout` seconds for a notification on a connection
+        that listens to a channel, and returns whether one arrived.
+        """
+        time.sleep(timeout)
+        return False
+
+    def savepoint(self, name):
+        return 'SAVEPOINT %s' % name
+
+    def rollback_to_savepoint(self, name):
+        return 'ROLLBACK TO SAVEPOINT %s' % name
+
+    def release_savepoint(self, name):
+        """
+        Returns the statement releasing the savepoint `name`, or None if
+        savepoints cannot be released (they end with the transaction).
+        """
+        return 'RELEASE SAVEPOINT %s' % name
+
+class LimitDialect(Dialect):
+    """
+    Dialect of the databases supporting `LIMIT n` (SQLite, PostgreSQL, MySQL).
+    """
+
+    def wrap_exists(self, selectStatement):
+        selectStatement = strip_statement(selectStatement)
+        if not is_select(selectStatement):
+            return None
+        return 'SELECT EXISTS (%s)' % selectStatement
+
+    def wrap_limit(self, selectStatement, maxRows, selectList='*'):
+        selectStatement = strip_statement(selectStatement)
+        if not is_select(selectStatement):
+            return None
+        return 'SELECT %s FROM (%s) limited_query LIMIT %d' % (selectList, selectStatement, maxRows)
+
+class SqliteDialect(LimitDialect):
+    name = 'sqlite'
+    threadBoundConnections = True
+
+    def list_tables(self):
+        return "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+
+    def table_in_any_schema(self, tableName):
+        return None
+
+    def explain(self, selectStatement):
+        return 'EXPLAIN QUERY PLAN %s' % strip_statement(selectStatement)
+
+    def catalog_columns(self):
+        return ("SELECT m.name, p.name, p.type, p.\"notnull\" = 0 FROM sqlite_master m "
+                "JOIN pragma_table_info(m.name) p WHERE m.type IN ('table', 'view') "
+                "AND m.name NOT LIKE 'sqlite_%' ORDER BY m.name, p.cid")
+
+    def catalog_indexes(self):
+        return ("SELECT m.tbl_name, m.name, i.name FROM sqlite_master m "
+                "JOIN pragma_index_info(m.name) i WHERE m.type = 'index' ORDER BY m.tbl_name, m.name, i.seqno")
+
+    def catalog_keys(self):
+        return ("SELECT m.name, 'PRIMARY KEY', 'PRIMARY KEY', p.name, NULL, NULL FROM sqlite_master m "
+                "JOIN pragma_table_info(m.name) p WHERE m.type = 'table' AND p.pk > 0 "
+                "UNION ALL SELECT m.name, l.name, 'UNIQUE', i.name, NULL, NULL FROM sqlite_master m "
+                "JOIN pragma_index_list(m.name) l JOIN pragma_index_info(l.name) i "
+                "WHERE m.type = 'table' AND l.\"unique\" AND l.origin != 'pk' AND NOT l.partial "
+                "UNION ALL SELECT m.name, 'FOREIGN KEY ' || f.id, 'FOREIGN KEY', f.\"from\", f.\"table\", f.\"to\" "
+                "FROM sqlite_master m JOIN pragma_foreign_key_list(m.name) f WHERE m.type = 'table' "
+                "ORDER BY 1, 2")
+
+    def set_autocommit(self, connection, autocommit):
+        connection.isolation_level = None if autocommit else ''
+
+class PostgresqlDialect(LimitDialect):
+    name = 'postgresql'
+
+    _ROW_BUCKET = "mod(('x' || substr(md5(hashed_rows::text), 1, 8))::bit(32)::bigint, %d)"
+    _ROW_CHECKSUM = "('x' || substr(md5(hashed_rows::text), 9, 15))::bit(60)::bigint"
+
+    def bucket_checksums(self, selectStatement, buckets):
+        return 'SELECT %s, COUNT(*), SUM(%s) FROM (%s) hashed_rows GROUP BY 1' % (
+            self._ROW_BUCKET % buckets, self._ROW_CHECKSUM, strip_statement(selectStatement))
+
+    def rows_in_buckets(self, selectStatement, buckets, selectedBuckets):
+        return 'SELECT * FROM (%s) hashed_rows WHERE %s IN (%s)' % (
+            strip_statement(selectStatement), self._ROW_BUCKET % buckets,
+            ', '.join([str(bucket) for bucket in selectedBuckets]))
+
+    def explain(self, selectStatement):
+        return 'EXPLAIN (FORMAT JSON) %s' % strip_statement(selectStatement)
+
+    def catalog_columns(self):
+        """
+        The columns of the tables and views found on the search path.
+        """
+        return ("SELECT c.relname, a.attname, pg_catalog.format_type(a.atttypid, a.atttypmod), NOT a.attnotnull "
+                "FROM pg_catalog.pg_class c JOIN pg_catalog.pg_attribute a ON a.attrelid = c.oid "
+                "WHERE c.relkind IN ('r', 'v', 'm', 'p', 'f') AND a.attnum > 0 AND NOT a.attisdropped "
+                "AND pg_catalog.pg_table_is_visible(c.oid) ORDER BY c.relname, a.attnum")
+
+    def catalog_indexes(self):
+        return ("SELECT t.relname, i.relname, a.attname FROM pg_catalog.pg_index x "
+                "JOIN pg_catalog.pg_class t ON t.oid = x.indrelid JOIN pg_catalog.pg_class i ON i.oid = x.indexrelid "
+                "JOIN pg_catalog.pg_attribute a ON a.attrelid = t.oid AND a.attnum = ANY (x.indkey) "
+                "WHERE pg_catalog.pg_table_is_visible(t.oid) "
+                "ORDER BY t.relname, i.relname, array_position(x.indkey::int2[], a.attnum)")
+
+class Psycopg2Dialect(PostgresqlDialect):
+    multiStatementExecute = True
+    serverSidePrepare = True
+
+    def server_side_cursor(self, dbApiModule, withHold=False):
+        """
+        A named cursor, declared on the server and read with `FETCH FORWARD`
+        as rows are fetched. Outside of a transaction (autocommit mode) it
+        must be declared `WITH HOLD`.
+        """
+        return ('dblib_cursor_%d' % next(_cursorNumbers),), {'withhold': withHold}
+
+    def listen(self, channel):
+        return 'LISTEN %s' % channel
+
+    def unlisten(self, channel):
+        return 'UNLISTEN %s' % channel
+
+    def wait_for_notification(self, connection, timeout):
+        """
+        Waits for the socket of the connection to become readable, then
+        reads (and drops) the notifications that arrived.
+        """
+        if select.select([connection], [], [], timeout) == ([], [], []):
+            return False
+        connection.poll()
+        notified = bool(connection.notifies)
+        del connection.notifies[:]
+        return notified
+
+class MysqlDialect(LimitDialect):
+    name = 'mysql'
+    backslashEscapes = True
+    serverSideCursorBlocksConnection = True
+
+    def list_tables(self):
+        return ("SELECT table_name FROM information_schema.tables WHERE table_type = 'BASE TABLE' "
+                "AND table_schema = DATABASE() ORDER BY table_name")
+
+    def explain(self, selectStatement):
+        return 'EXPLAIN %s' % strip_statement(selectStatement)
+
+    def catalog_columns(self):
+        return ("SELECT table_name, column_name, column_type, is_nullable FROM information_schema.columns "
+                "WHERE table_schema = DATABASE() ORDER BY table_name, ordinal_position")
+
+    def catalog_indexes(self):
+        return ("SELECT table_name, index_name, column_name FROM information_schema.statistics "
+                "WHERE table_schema = DATABASE() ORDER BY table_name, index_name, seq_in_index")
+
+    def catalog_keys(self):
+        return ("SELECT k.table_name, k.constraint_name, t.constraint_type, k.column_name, "
+                "k.referenced_table_name, k.referenced_column_name FROM information_schema.key_column_usage k "
+                "JOIN information_schema.table_constraints t ON t.constraint_schema = k.constraint_schema "
+                "AND t.table_name = k.table_name AND t.constraint_name = k.constraint_name "
+                "WHERE k.table_schema = DATABASE() ORDER BY k.table_name, k.constraint_name, k.ordinal_position")
+
+    def server_side_cursor(self, dbApiModule, withHold=False):
+        """
+        The unbuffered `SSCursor` of MySQLdb and PyMySQL, which reads the
+        rows from the socket as they are fetched. The connection cannot run
+        another statement until the cursor is closed.
+        """
+        cursors = getattr(dbApiModule, 'cursors', None)
+        if cursors is None or not hasattr(cursors, 'SSCursor'):
+            return None
+        return (cursors.SSCursor,), {}
+
+class OracleDialect(Dialect):
+    name = 'oracle'
+    validationQuery = 'SELECT 1 FROM DUAL'
+
+    def wrap_exists(self, selectStatement):
+        selectStatement = strip_statement(selectStatement)
+        if not is_select(selectStatement):
+            return None
+        return 'SELECT CASE WHEN EXISTS (%s) THEN 1 ELSE 0 END FROM DUAL' % selectStatement
+
+    def wrap_limit(self, selectStatement, maxRows, selectList='*'):
+        selectStatement = strip_statement(selectStatement)
+        if not is_select(selectStatement):
+            return None
+        return 'SELECT %s FROM (%s) limited_query FETCH FIRST %d ROWS ONLY' % (selectList, selectStatement, maxRows)
+
+    def release_savepoint(self, name):
+        return None
+
+    def list_tables(self):
+        return 'SELECT table_name FROM user_tables ORDER BY table_name'
+
+    def table_in_any_schema(self, tableName):
+        return None
+
+    def catalog_columns(self):
+        return ("SELECT c.table_name, c.column_name, c.data_type, c.nullable FROM all_tables t "
+                "JOIN all_tab_columns c ON c.owner = t.owner AND c.table_name = t.table_name "
+                "WHERE t.owner = USER ORDER BY c.table_name, c.column_id")
+
+    def catalog_indexes(self):
+        return ("SELECT table_name, index_name, column_name FROM all_ind_columns "
+                "WHERE table_owner = USER ORDER BY table_name, index_name, column_position")
+
+    def catalog_keys(self):
+        return ("SELECT c.table_name, c.constraint_name, "
+                "DECODE(c.constraint_type, 'P', 'PRIMARY KEY', 'U', 'UNIQUE', 'FOREIGN KEY'), cc.column_name, "
+                "rc.table_name, rc.column_name FROM all_constraints c "
+                "JOIN all_cons_columns cc ON cc.owner = c.owner AND cc.constraint_name = c.constraint_name "
+                "LEFT JOIN all_cons_columns rc ON rc.owner = c.r_owner AND rc.constraint_name = c.r_constraint_name "
+                "AND rc.position = cc.position "
+                "WHERE c.owner = USER AND c.constraint_type IN ('P', 'U', 'R') "
+                "ORDER BY c.table_name, c.constraint_name, cc.position")
+
+class MssqlDialect(Dialect):
+    name = 'mssql'
+
+    def wrap_exists(self, selectStatement):
+        selectStatement = strip_statement(selectStatement)
+        if not is_select(selectStatement):
+            return None
+        return 'SELECT CASE WHEN EXISTS (%s) THEN 1 ELSE 0 END' % selectStatement
+
+    def wrap_limit(self, selectStatement, maxRows, selectList='*'):
+        selectStatement = strip_statement(selectStatement)
+        if not is_select(selectStatement):
+            return None
+        return 'SELECT TOP %d %s FROM (%s) limited_query' % (maxRows, selectList, selectStatement)
+
+    def savepoint(self, name):
+        return 'SAVE TRANSACTION %s' % name
+
+    def rollback_to_savepoint(self, name):
+        return 'ROLLBACK TRANSACTION %s' % name
+
+    def release_savepoint(self, name):
+        return None
+
+    def catalog_indexes(self):
+        return ("SELECT t.name, i.name, c.name FROM sys.indexes i "
+                "JOIN sys.tables t ON t.object_id = i.object_id "
+                "JOIN sys.index_columns ic ON ic.object_id = i.object_id AND ic.index_id = i.index_id "
+                "JOIN sys.columns c ON c.object_id = ic.object_id AND c.column_id = ic.column_id "
+                "WHERE i.name IS NOT NULL AND ic.key_ordinal > 0 ORDER BY t.name, i.name, ic.key_ordinal")
+
+_DIALECTS_BY_MODULE = {
+    'sqlite3': SqliteDialect,
+    'pysqlite2': SqliteDialect,
+    'psycopg2': Psycopg2Dialect,
+    'psycopg': PostgresqlDialect,
+    'pg8000': PostgresqlDialect,
+    'MySQLdb': MysqlDialect,
+    'pymysql': MysqlDialect,
+    'mysql': MysqlDialect,
+    'cx_Oracle': OracleDialect,
+    'oracledb': OracleDialect,
+    'pymssql': MssqlDialect,
+}
+
+def dialect_for_module(dbApiModuleName):
+    """
+    Returns the dialect of the DB API 2.0 module named `dbApiModuleName`,
+    falling back to the generic dialect for unknown modules (e.g. JayDeBeApi
+    or pyodbc, which can talk to any database).
+    """
+    rootModuleName = (dbApiModuleName or '').split('.')[0]
+    return _DIALECTS_BY_MODULE.get(rootModuleName, Dialect)()
+
+def positional_placeholders(paramstyle, count):
+    """
+    Returns `count` positional placeholders for the DB API 2.0 `paramstyle`.
+
+    Drivers using the `named` paramstyle (cx_Oracle, oracledb) also accept
+    numbered placeholders bound to a sequence, so they get `:1`, `:2`...
+    """
+    if paramstyle == 'qmark':
+        return ['?'] * count
+    if paramstyle in ('numeric', 'named'):
+        return [':%d' % (index + 1) for index in range(count)]
+    return ['%s'] * count
+
+def strip_statement(sqlStatement):
+    """
+    Removes surrounding whitespace and trailing semi-colons.
+    """
+    return sqlStatement.strip().rstrip(';').rstrip()
+
+def is_select(sqlStatement):
+    return _SELECT_PATTERN.match(sqlStatement) is not None
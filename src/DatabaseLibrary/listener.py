@@ -0,0 +1,48 @@
+#  Copyright (c) 2010 Franz Allan Valencia See
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+from robot.api import logger
+from DatabaseLibrary.logging_policy import ROBOT_LOG_LEVEL
+
+class LibraryListener(object):
+    """
+    LibraryListener lets `DatabaseLibrary` react to the execution of the
+    test run, e.g. to isolate every test or to write its statistics when the
+    run ends. Listener methods are kept here so that they do not become
+    keywords.
+    """
+
+    ROBOT_LISTENER_API_VERSION = 2
+
+    def __init__(self, library):
+        self._library = library
+
+    def start_test(self, name, attributes):
+        try:
+            self._library._start_test()
+        except Exception as e:
+            logger.warn("Could not isolate test '%s' : %s" % (name, e))
+
+    def end_test(self, name, attributes):
+        self._library._end_test()
+
+    def start_keyword(self, name, attributes):
+        ROBOT_LOG_LEVEL.forget()
+
+    def close(self):
+        try:
+            self._library._statistics.write()
+        except Exception as e:
+            logger.warn("Could not write the database statistics : %s" % e)
+        self._library._discard_snapshots()
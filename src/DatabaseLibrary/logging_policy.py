@@ -0,0 +1,162 @@
+#  Copyright (c) 2010 Franz Allan Valencia See
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import hashlib
+import reprlib
+from robot.api import logger
+from robot.libraries.BuiltIn import BuiltIn, RobotNotRunningError
+
+DEFAULT_SQL_LOG_LEVEL = 'DEBUG'
+DEFAULT_MAX_LOGGED_LENGTH = 1000
+DEFAULT_MAX_LOGGED_ROWS = 10
+MAX_LOGGED_COLUMNS = 100
+
+_LEVELS = {'TRACE': 0, 'DEBUG': 1, 'INFO': 2, 'WARN': 3, 'ERROR': 4, 'NONE': 5}
+
+class LoggingPolicy(object):
+    """
+    LoggingPolicy bounds what the library writes about statements and
+    results to the log and to failure messages, so that its cost does not
+    grow with them:
+    - statements are logged at `sqlLogLevel` (`DEBUG` by default, `NONE` to
+      not log them), and only formatted if Robot Framework logs that level,
+    - statements longer than `maxLength` characters are cut, followed by
+      their length and MD5 hash to tell them apart,
+    - results show at most `maxRows` rows and the number of rows, or only
+      the number of rows with `maxRows=0`, and are cut to `maxLength`
+      characters as well.
+    """
+
+    def __init__(self, sqlLogLevel=DEFAULT_SQL_LOG_LEVEL, maxLength=DEFAULT_MAX_LOGGED_LENGTH, maxRows=DEFAULT_MAX_LOGGED_ROWS):
+        self.sqlLogLevel = _level_name(sqlLogLevel)
+        self.maxLength = int(maxLength)
+        self.maxRows = int(maxRows)
+        self._repr = _BoundedRepr(self.maxLength, self.maxRows)
+
+    def changed(self, sqlLogLevel=None, maxLength=None, maxRows=None):
+        """
+        Returns a copy of this policy with the given settings changed.
+        """
+        return LoggingPolicy(self.sqlLogLevel if sqlLogLevel is None else sqlLogLevel,
+                             self.maxLength if maxLength is None else maxLength,
+                             self.maxRows if maxRows is None else maxRows)
+
+    def is_logged(self, level=None):
+        level = _LEVELS[level or self.sqlLogLevel]
+        return level < _LEVELS['NONE'] and level >= ROBOT_LOG_LEVEL.threshold()
+
+    def log_sql(self, message, sqlStatement, parameters=None):
+        """
+        Logs `message` and `sqlStatement` (and its `parameters`) at the SQL
+        log level, formatting nothing if the level is not logged.
+        """
+        if not self.is_logged():
+            return
+        logger.write("%s : %s" % (message, self.sql(sqlStatement)), self.sqlLogLevel)
+        if parameters:
+            logger.write("With parameters : %s" % self.value(parameters), self.sqlLogLevel)
+
+    def sql(self, sqlStatement):
+        """
+        Returns `sqlStatement` as it should appear in the log or a message.
+        """
+        sqlStatement = str(sqlStatement)
+        if len(sqlStatement) <= self.maxLength:
+            return sqlStatement
+        digest = hashlib.md5(sqlStatement.encode('utf-8', 'replace')).hexdigest()
+        return '%s... [%s characters, md5 %s]' % (sqlStatement[:self.maxLength], len(sqlStatement), digest)
+
+    def value(self, value):
+        """
+        Returns a representation of `value` limited to the policy, without
+        building the whole representation of a large value first.
+        """
+        return _cut(self._repr.repr(value), self.maxLength)
+
+    def rows(self, rows, atLeast=False):
+        """
+        Returns a preview of the result `rows` for a message, with their
+        number (preceded by 'at least' if there may be more of them).
+        """
+        rowCount = '%s%s row%s' % ('at least ' if atLeast else '', len(rows), '' if len(rows) == 1 else 's')
+        if self.maxRows <= 0:
+            return rowCount
+        return '%s (%s)' % (self.value(list(rows[:self.maxRows])), rowCount)
+
+class _BoundedRepr(reprlib.Repr):
+    """
+    A `reprlib.Repr` cutting byte strings before representing them, as the
+    default one represents them whole first.
+    """
+
+    def __init__(self, maxLength, maxRows):
+        reprlib.Repr.__init__(self)
+        self.maxlevel = 3
+        self.maxlist = self.maxtuple = max(maxRows, 1)
+        self.maxdict = self.maxset = self.maxfrozenset = self.maxdeque = self.maxarray = max(maxRows, 1)
+        self.maxstring = self.maxother = self.maxlong = max(maxLength, 10)
+        self._maxColumns = MAX_LOGGED_COLUMNS
+
+    def repr_tuple(self, x, level):
+        # Rows are tuples: show their columns up to a larger limit than rows.
+        maxtuple, self.maxtuple = self.maxtuple, self._maxColumns
+        try:
+            return reprlib.Repr.repr_tuple(self, x, level)
+        finally:
+            self.maxtuple = maxtuple
+
+    def repr_bytes(self, x, level):
+        if len(x) <= self.maxstring:
+            return repr(x)
+        return '%s...[%s bytes]' % (repr(bytes(x[:self.maxstring])), len(x))
+
+    repr_bytearray = repr_memoryview = repr_bytes
+
+class _RobotLogLevel(object):
+    """
+    The log level of Robot Framework, read from `${LOG LEVEL}` at most once
+    per keyword, as reading a variable takes longer than running a small
+    statement. The library listener forgets it whenever a keyword starts,
+    which is also the only way `Set Log Level` can change it.
+    """
+
+    def __init__(self):
+        self._threshold = None
+
+    def forget(self):
+        self._threshold = None
+
+    def threshold(self):
+        if self._threshold is None:
+            try:
+                level = BuiltIn().get_variable_value('${LOG LEVEL}', 'TRACE')
+            except RobotNotRunningError:
+                level = 'TRACE'
+            self._threshold = _LEVELS.get(str(level).upper(), 0)
+        return self._threshold
+
+ROBOT_LOG_LEVEL = _RobotLogLevel()
+
+def _level_name(level):
+    name = str(level).upper()
+    if name == 'WARNING':
+        name = 'WARN'
+    if name not in _LEVELS:
+        raise ValueError("Invalid log level '%s', expected one of %s" % (level, ', '.join(sorted(_LEVELS, key=_LEVELS.get))))
+    return name
+
+def _cut(text, maxLength):
+    if len(text) <= maxLength:
+        return text
+    return '%s... [%s characters]' % (text[:maxLength], len(text))
@@ -0,0 +1,156 @@
+#  Copyright (c) 2010 Franz Allan Valencia See
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from robot.api import logger
+from DatabaseLibrary.query import check_exists
+
+DEFAULT_THREADS = 4
+
+class ParallelQuery(object):
+    """
+    ParallelQuery runs independent queries at the same time.
+
+    The queries are spread over a pool of `threads` worker threads, each using
+    its own connection opened with the parameters of the current connection
+    (or of `alias`). Up to `threads` of these worker connections are kept for
+    the next call, and checked like the pooled connections before being used
+    again (see the importing section of `DatabaseLibrary`), except with
+    sqlite3 whose connections cannot change threads. Note that
+    every sqlite3 connection to `:memory:` is a separate, empty database, so
+    the workers need a database file.
+    """
+
+    def execute_queries_in_parallel(self, selectStatements, threads=DEFAULT_THREADS, alias=None):
+        """
+        Runs every statement of the list `selectStatements` and returns the
+        list of their results (each a list of rows, as returned by `Query`),
+        in the same order as the statements.
+
+        All statements are run even if some fail; the failures are then
+        reported together.
+
+        For example:
+        | @{statements} | Create List | select count(*) from person | select count(*) from employee |
+        | ${results} | Execute Queries In Parallel | ${statements} | threads=8 |
+        | Log | ${results[1][0][0]} employees |
+        """
+        outcomes = self._run_in_parallel(selectStatements, _fetch_all, threads, alias)
+        loggingPolicy = self._get_logging_policy(alias)
+        failures = ["'%s' failed : %s" % (loggingPolicy.sql(statement), error) for statement, result, error in outcomes if error is not None]
+        if failures:
+            raise RuntimeError("%s of %s queries failed:\n%s" % (len(failures), len(outcomes), '\n'.join(failures)))
+        return [result for statement, result, error in outcomes]
+
+    def check_all_exist_in_database(self, selectStatements, threads=DEFAULT_THREADS, alias=None):
+        """
+        Checks, in parallel, that every statement of the list
+        `selectStatements` returns at least one row, like `Check If Exists In
+        Database` does for a single statement. All statements are checked,
+        and the ones returning no rows (or failing) are reported together in
+        the AssertionError.
+
+        For example:
+        | @{statements} | Create List | select id from person where first_name = 'Franz Allan' | select id from employee where person_id = 1 |
+        | Check All Exist In Database | ${statements} |
+        """
+        pooledConnection = self._get_pooled_connection(alias)
+        outcomes = self._run_in_parallel(selectStatements, lambda cur, statement: _exists(cur, statement, pooledConnection),
+                                         threads, alias)
+        loggingPolicy = self._get_logging_policy(alias)
+        failures = []
+        for statement, exists, error in outcomes:
+            if error is not None:
+                failures.append("'%s' failed : %s" % (loggingPolicy.sql(statement), error))
+            elif not exists:
+                failures.append("'%s' returned 0 rows" % loggingPolicy.sql(statement))
+        if failures:
+            raise AssertionError("Expected to have at least one row from each of the %s statements but:\n%s"
+                                 % (len(outcomes), '\n'.join(failures)))
+
+    def _run_in_parallel(self, statements, work, threads, alias):
+        """
+        Calls `work(cursor, statement)` for every statement on the worker
+        threads and returns a list of (statement, result, error) tuples in
+        the order of `statements`.
+        """
+        pooledConnection = self._get_pooled_connection(alias)
+        statements = list(statements)
+        threads = int(threads)
+        if not statements:
+            return []
+
+        def run(statement):
+            rawConnection = pooledConnection.borrow_connection()
+            reusable = False
+            try:
+                connection = self._statistics.instrument(rawConnection, pooledConnection.alias, pooledConnection.autocommit)
+                cur = connection.cursor()
+                try:
+                    startTime = time.time()
+                    result = work(cur, statement)
+                    return result, time.time() - startTime
+                finally:
+                    connection.rollback()
+                    reusable = True
+            finally:
+                pooledConnection.give_back_connection(rawConnection, reusable, threads)
+
+        startTime = time.time()
+        executor = ThreadPoolExecutor(max_workers=min(threads, len(statements)))
+        try:
+            futures = [executor.submit(run, statement) for statement in statements]
+        finally:
+            executor.shutdown(wait=True)
+        self._statistics.flush_warnings()
+        loggingPolicy = pooledConnection.loggingPolicy
+        outcomes = []
+        for statement, future in zip(statements, futures):
+            error = future.exception()
+            if error is None:
+                result, elapsed = future.result()
+                loggingPolicy.log_sql("Executed in %.3f s" % elapsed, statement)
+                outcomes.append((statement, result, None))
+            else:
+                loggingPolicy.log_sql("Failed with %s" % error, statement)
+                outcomes.append((statement, None, error))
+        logger.info("Executed %s statements on %s threads in %.3f s" % (len(statements), threads, time.time() - startTime))
+        return outcomes
+
+def _fetch_all(cur, selectStatement):
+    cur.execute(selectStatement)
+    return cur.fetchall()
+
+def _exists(cur, selectStatement, pooledConnection):
+    """
+    Checks existence as `Check If Exists In Database` does, on the cursor of
+    a worker, rolling back a refused EXISTS statement before falling back.
+    """
+    def query_scalar(sqlStatement):
+        cur.execute(sqlStatement)
+        return cur.fetchone()[0]
+
+    def fetch_first_rows(sqlStatement, maxRows):
+        cur.execute(sqlStatement)
+        return cur.fetchmany(maxRows)
+
+    def attempt_on_server(attempt):
+        try:
+            return attempt()
+        except Exception:
+            pooledConnection.rollback_borrowed_connection(cur.connection)
+            raise
+
+    return check_exists(selectStatement, pooledConnection.dialect, query_scalar, fetch_first_rows, attempt_on_server)
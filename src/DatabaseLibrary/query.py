@@ -12,14 +12,44 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 
+import os
+import time
 from robot.api import logger
+from robot.libraries.BuiltIn import BuiltIn
+from DatabaseLibrary.query_cache import QueryCache, cache_key
+from DatabaseLibrary.result_export import export_format, open_export
+from DatabaseLibrary.result_table import ResultTableBuilder
+from DatabaseLibrary.schema_catalog import SchemaCatalog, changes_schema
+from DatabaseLibrary.sql_script import SqlScriptReader, batch_statements
+from DatabaseLibrary.utils import to_boolean, to_seconds
+
+DEFAULT_FETCH_SIZE = 1000
+DEFAULT_SCRIPT_BATCH_SIZE = 100
+SCRIPT_PROGRESS_INTERVAL = 5000
+SERVER_ATTEMPT_SAVEPOINT = 'dblib_attempt'
 
 class Query(object):
     """
     Query handles all the querying done by the Database Library. 
+
+    Every keyword runs against the current connection (see `Switch Database`),
+    or against the connection registered under the optional `alias` argument.
+
+    Statements can also take bind `parameters`, given as a list for positional
+    placeholders (`?`, `:1` or `%s`) or as a dictionary for named ones
+    (`:name` or `%(name)s`). Placeholders are rewritten to the paramstyle of
+    the driver, so the same statement works with every driver, and the
+    prepared statements are cached per connection so that running the same
+    statement again with other values does not parse it again.
     """
 
-    def query(self, selectStatement):
+    def __init__(self):
+        """
+        Initializes the query cache as disabled, see `Enable Query Cache`.
+        """
+        self._queryCache = None
+
+    def query(self, selectStatement, alias=None, fetchSize=None, maxRows=None, parameters=None, columnar=False, serverSide=None):
         """
         Uses the input `selectStatement` to query for the values that 
         will be returned as a list of tuples.
@@ -48,18 +78,417 @@ class Query(object):
         
         And get the following
         See, Franz Allan
+
+        If `fetchSize` or `maxRows` is given, the rows are fetched in batches
+        of `fetchSize` rows (1000 by default) and at most `maxRows` rows are
+        returned; the rest of the result is never transferred. To look at
+        every row of a big result, use `For Each Row` or `For Each Batch`
+        instead.
+        | ${firstRows} | Query | select * from audit_log | maxRows=100 |
+
+        Values are best passed as bind `parameters` rather than formatted into
+        the statement:
+        | &{filter} | Create Dictionary | first_name=Franz Allan |
+        | ${queryResults} | Query | select id from person where first_name = :first_name | parameters=${filter} |
+
+        With `columnar=True`, the rows are returned as a result table that is
+        used like the list of tuples but stores the values column by column,
+        which takes much less memory for big results. It also carries the
+        column names (no need for `Description`), and gives the values of a
+        column without building the rows:
+        | ${result} | Query | select id, first_name from person | columnar=True |
+        | Log | ${result.columns} |
+        | Log | ${result.col['first_name']} |
+        | Log | ${result[0]} |
+        | ${firstTen} | Set Variable | ${result[:10]} |
+
+        A statement that returns no result (e.g. an `UPDATE`) gives an empty
+        result table without columns.
+
+        With `serverSide=True` (or if the connection was opened with
+        `serverSideCursors=True`), the result is kept on the database server
+        and transferred only as the rows are fetched, see `Connect To
+        Database`. This matters with `maxRows`, which then stops the
+        transfer after `maxRows` rows:
+        | ${firstRows} | Query | select * from audit_log | maxRows=100 | serverSide=True |
         """
+        if to_boolean(columnar):
+            return self._read_through_cache(lambda: self._compute_columnar_query(selectStatement, alias, fetchSize, maxRows, parameters, serverSide),
+                                            alias, 'columnar_query', selectStatement, parameters, maxRows)
+        return self._read_through_cache(lambda: self._compute_query(selectStatement, alias, fetchSize, maxRows, parameters, serverSide),
+                                        alias, 'query', selectStatement, parameters, maxRows)
+
+    def _compute_query(self, selectStatement, alias, fetchSize, maxRows, parameters, serverSide=None):
+        if fetchSize is not None or maxRows is not None:
+            return self._query_in_batches(selectStatement, alias, fetchSize, maxRows, parameters, serverSide)
         cur = None
+        onServer = False
         try:
-            cur = self._dbconnection.cursor()
-            self.__execute_sql(cur, selectStatement)
+            connection = self._get_connection(alias)
+            cur, onServer = self._open_cursor(connection, alias, serverSide)
+            self.__execute_sql(cur, selectStatement, parameters, alias, not onServer)
             allRows = cur.fetchall()
             return allRows
         finally :
             if cur :
-                self._dbconnection.rollback() 
+                self._end_query(connection, cur, onServer)
+
+    def _compute_columnar_query(self, selectStatement, alias, fetchSize, maxRows, parameters, serverSide=None):
+        fetchSize = int(fetchSize or DEFAULT_FETCH_SIZE)
+        maxRows = None if maxRows is None else int(maxRows)
+        cur = None
+        onServer = False
+        try:
+            connection = self._get_connection(alias)
+            cur, onServer = self._open_cursor(connection, alias, serverSide)
+            self.__execute_sql(cur, selectStatement, parameters, alias, not onServer)
+            if cur.description is None:
+                # The statement returns no result (e.g. an UPDATE), which many
+                # drivers refuse to fetch from.
+                return ResultTableBuilder(None).build()
+            builder = None
+            rowCount = 0
+            while maxRows is None or rowCount < maxRows:
+                batch = cur.fetchmany(fetchSize if maxRows is None else max(1, min(fetchSize, maxRows - rowCount)))
+                if builder is None:
+                    builder = ResultTableBuilder(cur.description)
+                if not batch:
+                    break
+                builder.add_rows(batch)
+                rowCount += len(batch)
+            return (builder or ResultTableBuilder(cur.description)).build()
+        finally :
+            if cur :
+                self._end_query(connection, cur, onServer)
+
+    def for_each_row(self, selectStatement, keywordName, fetchSize=DEFAULT_FETCH_SIZE, alias=None, parameters=None, serverSide=None):
+        """
+        Runs the keyword `keywordName` once for every row returned by
+        `selectStatement`, passing the row as its only argument, and returns
+        the number of rows processed.
+
+        Rows are fetched `fetchSize` at a time, so only one batch of the
+        result is held in memory no matter how many rows there are. With
+        `serverSide=True` the rest of the result also stays on the database
+        server until it is fetched (see `Connect To Database`).
+
+        As the keyword may run statements of its own, which end their
+        transaction (closing a PostgreSQL server-side cursor) or, on MySQL,
+        cannot run while a server-side cursor is being read, a server-side
+        result is read on an extra connection of the pool, which only sees
+        committed changes. Inside a transaction or an isolated test the
+        result is read on the connection itself, to see their changes: on
+        PostgreSQL from a server-side cursor, which lasts until the
+        transaction ends, and on MySQL from a plain cursor, holding the
+        whole result in memory.
+
+        For example:
+        | ${count} | For Each Row | select id, status from audit_log | Status Should Be Valid |
+        | ${count} | For Each Row | select id, status from audit_log | Status Should Be Valid | serverSide=True |
+        """
+        rowCount = 0
+        for batch in self._stream_batches(selectStatement, alias, fetchSize, parameters, serverSide):
+            for row in batch:
+                BuiltIn().run_keyword(keywordName, row)
+            rowCount += len(batch)
+        return rowCount
+
+    def for_each_batch(self, selectStatement, keywordName, fetchSize=DEFAULT_FETCH_SIZE, alias=None, parameters=None, serverSide=None):
+        """
+        Runs the keyword `keywordName` once for every batch of at most
+        `fetchSize` rows returned by `selectStatement`, passing the list of
+        rows as its only argument, and returns the number of rows processed.
+        Rows are fetched as for `For Each Row`, including `serverSide`.
+
+        For example:
+        | ${count} | For Each Batch | select id, status from audit_log | Statuses Should Be Valid | 5000 |
+        """
+        rowCount = 0
+        for batch in self._stream_batches(selectStatement, alias, fetchSize, parameters, serverSide):
+            BuiltIn().run_keyword(keywordName, batch)
+            rowCount += len(batch)
+        return rowCount
+
+    def export_query_to_file(self, selectStatement, fileName, format=None, alias=None, fetchSize=DEFAULT_FETCH_SIZE, parameters=None, delimiter=',', serverSide=None):
+        """
+        Writes the rows returned by `selectStatement` to the file `fileName`
+        and returns the number of rows written, without logging them.
+
+        The format is taken from the extension of `fileName` unless `format`
+        is given: `csv` (with a header line of the column names, separated
+        by `delimiter`), `jsonl` (one JSON object per row, keyed by column
+        name), or `csv.gz` and `jsonl.gz` for the gzip-compressed variants.
+
+        Rows are fetched `fetchSize` at a time and written as they come, so
+        only one batch of the result is held in memory no matter how many
+        rows there are; with `serverSide=True` the rest of the result also
+        stays on the database server (see `Connect To Database`). The file
+        is removed if the export fails.
+
+        For example:
+        | ${count} | Export Query To File | select * from audit_log | ${OUTPUT DIR}/audit_log.csv.gz |
+        | Export Query To File | select * from invoice where status = 'failed' | ${OUTPUT DIR}/failed.json | format=jsonl |
+        """
+        format = export_format(fileName, format)
+        fetchSize = int(fetchSize)
+        startTime = time.time()
+        rowCount = 0
+        export = None
+        cur = None
+        onServer = False
+        try:
+            connection = self._get_connection(alias)
+            cur, onServer = self._open_cursor(connection, alias, serverSide)
+            self.__execute_sql(cur, selectStatement, parameters, alias, not onServer)
+            while True:
+                batch = cur.fetchmany(fetchSize)
+                if export is None:
+                    export = open_export(fileName, format, [column[0] for column in cur.description], delimiter)
+                if not batch:
+                    break
+                export.write_rows(batch)
+                rowCount += len(batch)
+            export.close()
+        except:
+            if export is not None:
+                export.close()
+                os.remove(fileName)
+            raise
+        finally :
+            if cur :
+                self._end_query(connection, cur, onServer)
+        logger.info("Exported %s rows to '%s' in %.3f seconds" % (rowCount, fileName, time.time() - startTime))
+        return rowCount
+
+    def _count_rows(self, selectStatement, alias=None, maxRows=None, parameters=None):
+        """
+        Counts the rows of `selectStatement`, stopping at `maxRows` if given
+        (i.e. the result is `min(actual row count, maxRows)`).
+        """
+        return self._read_through_cache(lambda: self._compute_row_count(selectStatement, alias, maxRows, parameters),
+                                        alias, 'row_count', selectStatement, parameters, maxRows)
+
+    def _compute_row_count(self, selectStatement, alias, maxRows, parameters):
+        dialect = self._get_dialect(alias)
+        countStatement = dialect.wrap_count(selectStatement)
+        if countStatement is not None and maxRows is not None:
+            limitStatement = dialect.wrap_limit(selectStatement, maxRows, '1 AS one')
+            countStatement = limitStatement and dialect.wrap_count(limitStatement)
+        if countStatement is not None:
+            try:
+                return int(self._attempt_on_server(lambda: self._query_scalar(countStatement, alias, parameters), alias))
+            except Exception as e:
+                logger.debug("Counting on the server failed, counting fetched rows instead : %s" % e)
+        fetchSize = DEFAULT_FETCH_SIZE if maxRows is None else min(maxRows, DEFAULT_FETCH_SIZE)
+        rowCount = 0
+        batches = self._fetch_batches(selectStatement, alias, fetchSize, parameters)
+        try:
+            for batch in batches:
+                rowCount += len(batch)
+                if maxRows is not None and rowCount >= maxRows:
+                    return maxRows
+            return rowCount
+        finally:
+            batches.close()
+
+    def _exists(self, selectStatement, alias=None, parameters=None):
+        """
+        Returns whether `selectStatement` returns at least one row, letting
+        the database stop at the first match whenever the dialect allows it.
+        """
+        return self._read_through_cache(lambda: self._compute_exists(selectStatement, alias, parameters),
+                                        alias, 'exists', selectStatement, parameters)
+
+    def _compute_exists(self, selectStatement, alias, parameters):
+        return check_exists(selectStatement, self._get_dialect(alias),
+                            lambda sqlStatement: self._query_scalar(sqlStatement, alias, parameters),
+                            lambda sqlStatement, maxRows: self._fetch_first_rows(sqlStatement, alias, maxRows, parameters),
+                            lambda attempt: self._attempt_on_server(attempt, alias))
 
-    def row_count(self, selectStatement):
+    def _fetch_first_rows(self, selectStatement, alias=None, maxRows=1, parameters=None):
+        """
+        Returns at most `maxRows` rows of `selectStatement`, closing the
+        cursor as soon as they are fetched.
+        """
+        return self._read_through_cache(lambda: self._compute_first_rows(selectStatement, alias, maxRows, parameters),
+                                        alias, 'first_rows', selectStatement, parameters, maxRows)
+
+    def _compute_first_rows(self, selectStatement, alias, maxRows, parameters):
+        limitStatement = self._get_dialect(alias).wrap_limit(selectStatement, maxRows)
+        if limitStatement is not None:
+            try:
+                return self._attempt_on_server(lambda: self._fetch_first_rows_of(limitStatement, alias, maxRows, parameters),
+                                               alias)
+            except Exception as e:
+                logger.debug("Limiting rows on the server failed, fetching the first rows instead : %s" % e)
+        return self._fetch_first_rows_of(selectStatement, alias, maxRows, parameters)
+
+    def _fetch_first_rows_of(self, selectStatement, alias, maxRows, parameters):
+        cur = None
+        try:
+            connection = self._get_connection(alias)
+            cur = connection.cursor()
+            self.__execute_sql(cur, selectStatement, parameters, alias)
+            rows = cur.fetchmany(maxRows)
+            cur.close()
+            return rows
+        finally :
+            if cur :
+                connection.rollback()
+
+    def _query_scalar(self, selectStatement, alias=None, parameters=None):
+        """
+        Returns the first column of the first row of `selectStatement`.
+        """
+        cur = None
+        try:
+            connection = self._get_connection(alias)
+            cur = connection.cursor()
+            self.__execute_sql(cur, selectStatement, parameters, alias)
+            return cur.fetchone()[0]
+        finally :
+            if cur :
+                connection.rollback()
+
+    def _attempt_on_server(self, attempt, alias):
+        """
+        Returns the result of `attempt`, which runs a statement rewritten to
+        do the work on the server that the database may refuse, after which
+        the original statement is run instead.
+
+        The failed attempt is normally undone by the rollback ending it, but
+        while a transaction is held the keywords do not roll back, and on
+        PostgreSQL the failure would abort the held transaction. The attempt
+        is then wrapped in a savepoint, rolled back to if it fails.
+        """
+        pooledConnection = self._get_pooled_connection(alias)
+        if not pooledConnection.holdsTransaction:
+            return attempt()
+        dialect = pooledConnection.dialect
+        connection = self._get_connection(alias)
+        connection.cursor().execute(dialect.savepoint(SERVER_ATTEMPT_SAVEPOINT))
+        try:
+            return attempt()
+        except Exception:
+            connection.cursor().execute(dialect.rollback_to_savepoint(SERVER_ATTEMPT_SAVEPOINT))
+            raise
+        finally:
+            releaseStatement = dialect.release_savepoint(SERVER_ATTEMPT_SAVEPOINT)
+            if releaseStatement is not None:
+                connection.cursor().execute(releaseStatement)
+
+    def _query_in_batches(self, selectStatement, alias, fetchSize, maxRows, parameters=None, serverSide=None):
+        fetchSize = int(fetchSize or DEFAULT_FETCH_SIZE)
+        maxRows = None if maxRows is None else int(maxRows)
+        if maxRows is not None:
+            fetchSize = max(1, min(fetchSize, maxRows))
+        rows = []
+        batches = self._fetch_batches(selectStatement, alias, fetchSize, parameters, serverSide)
+        try:
+            for batch in batches:
+                rows.extend(batch)
+                if maxRows is not None and len(rows) >= maxRows:
+                    logger.debug("Stopped fetching after %s rows" % maxRows)
+                    return rows[:maxRows]
+            return rows
+        finally:
+            batches.close()
+
+    def _fetch_batches(self, selectStatement, alias, fetchSize, parameters=None, serverSide=None):
+        """
+        Generator that yields the result of `selectStatement` as lists of at
+        most `fetchSize` rows, pulled with `cursor.fetchmany`.
+        """
+        fetchSize = int(fetchSize)
+        cur = None
+        onServer = False
+        try:
+            connection = self._get_connection(alias)
+            cur, onServer = self._open_cursor(connection, alias, serverSide)
+            self.__execute_sql(cur, selectStatement, parameters, alias, not onServer)
+            while True:
+                batch = cur.fetchmany(fetchSize)
+                if not batch:
+                    break
+                yield batch
+        finally:
+            if cur :
+                self._end_query(connection, cur, onServer)
+
+    def _stream_batches(self, selectStatement, alias, fetchSize, parameters=None, serverSide=None):
+        """
+        Like `_fetch_batches`, for results read while keywords run between
+        the batches and may use the connection meanwhile (see `For Each
+        Row`).
+        """
+        pooledConnection = self._get_pooled_connection(alias)
+        if serverSide is None:
+            serverSide = pooledConnection.serverSideCursors
+        dialect = pooledConnection.dialect
+        if not to_boolean(serverSide) or dialect.server_side_cursor(pooledConnection.dbApiModule) is None:
+            return self._fetch_batches(selectStatement, alias, fetchSize, parameters, False)
+        if not pooledConnection.holdsTransaction:
+            return self._fetch_borrowed_batches(selectStatement, pooledConnection, fetchSize, parameters)
+        if dialect.serverSideCursorBlocksConnection:
+            logger.info("Reading the result with a plain cursor, as the server-side cursor would block '%s' "
+                        "for the keywords run inside the transaction" % pooledConnection.alias)
+            return self._fetch_batches(selectStatement, alias, fetchSize, parameters, False)
+        return self._fetch_batches(selectStatement, alias, fetchSize, parameters, True)
+
+    def _fetch_borrowed_batches(self, selectStatement, pooledConnection, fetchSize, parameters=None):
+        """
+        Generator that yields the result of `selectStatement` as lists of at
+        most `fetchSize` rows, read from a server-side cursor on a connection
+        borrowed from `pooledConnection` for the time of the result.
+        """
+        fetchSize = int(fetchSize)
+        rawConnection = pooledConnection.borrow_connection()
+        reusable = False
+        try:
+            connection = self._statistics.instrument(rawConnection, pooledConnection.alias, pooledConnection.autocommit)
+            args, kwargs = pooledConnection.dialect.server_side_cursor(pooledConnection.dbApiModule, pooledConnection.autocommit)
+            cur = connection.cursor(*args, **kwargs)
+            try:
+                self.__execute_sql(cur, selectStatement, parameters, pooledConnection.alias, False)
+                while True:
+                    batch = cur.fetchmany(fetchSize)
+                    if not batch:
+                        break
+                    yield batch
+            finally:
+                cur.close()
+                pooledConnection.rollback_borrowed_connection(connection)
+                reusable = True
+        finally:
+            pooledConnection.give_back_connection(rawConnection, reusable, 1)
+
+    def _open_cursor(self, connection, alias, serverSide=None):
+        """
+        Returns a cursor of `connection` and whether it keeps the result on
+        the server. A server-side cursor is opened if `serverSide` is true
+        (or, if None, if the connection was opened with `serverSideCursors`)
+        and the driver needs one to fetch lazily.
+        """
+        pooledConnection = self._get_pooled_connection(alias)
+        if serverSide is None:
+            serverSide = pooledConnection.serverSideCursors
+        if to_boolean(serverSide):
+            arguments = pooledConnection.dialect.server_side_cursor(pooledConnection.dbApiModule, pooledConnection.autocommit)
+            if arguments is not None:
+                args, kwargs = arguments
+                return connection.cursor(*args, **kwargs), True
+        return connection.cursor(), False
+
+    def _end_query(self, connection, cur, onServer):
+        """
+        Closes a server-side cursor, which would otherwise hold its result
+        on the server (or, with MySQL, the connection), then rolls back.
+        """
+        if onServer:
+            cur.close()
+        connection.rollback()
+
+    def row_count(self, selectStatement, alias=None, parameters=None):
         """
         Uses the input `selectStatement` to query the database and returns
         the number of rows from the query.
@@ -82,19 +511,15 @@ class Query(object):
         
         And get the following
         1
+
+        Whenever the statement is a plain select, the rows are counted by the
+        database itself with `SELECT COUNT(*) FROM (selectStatement)`, so only
+        the count is transferred. Other statements are executed as they are
+        and their rows are fetched in batches and counted.
         """
-        cur = None
-        try:
-            cur = self._dbconnection.cursor()
-            self.__execute_sql(cur, selectStatement)
-            cur.fetchall()
-            rowCount = cur.rowcount
-            return rowCount
-        finally :
-            if cur :
-                self._dbconnection.rollback() 
+        return self._count_rows(selectStatement, alias, parameters=parameters)
 
-    def description(self, selectStatement):
+    def description(self, selectStatement, alias=None, parameters=None):
         """
         Uses the input `selectStatement` to query a table in the db which
         will be used to determine the description.
@@ -112,17 +537,36 @@ class Query(object):
         [Column(name='first_name', type_code=1043, display_size=None, internal_size=255, precision=None, scale=None, null_ok=None)]
         [Column(name='last_name', type_code=1043, display_size=None, internal_size=255, precision=None, scale=None, null_ok=None)]
         """
+        return self._read_through_cache(lambda: self._compute_description(selectStatement, alias, parameters),
+                                        alias, 'description', selectStatement, parameters)
+
+    def _compute_description(self, selectStatement, alias, parameters):
         cur = None
         try:
-            cur = self._dbconnection.cursor()
-            self.__execute_sql(cur, selectStatement)
+            connection = self._get_connection(alias)
+            cur = connection.cursor()
+            self.__execute_sql(cur, selectStatement, parameters, alias)
             description = cur.description
             return description
         finally :
             if cur :
-                self._dbconnection.rollback() 
+                connection.rollback() 
 
-    def delete_all_rows_from_table(self, tableName):
+    def get_table_columns(self, tableName, alias=None):
+        """
+        Returns the names of the columns of the table (or view) `tableName`,
+        in their order, from the schema catalog (see `Table Must Exist`).
+
+        For example:
+        | ${columns} | Get Table Columns | person |
+        | Should Be Equal As Strings | ${columns} | ['id', 'first_name', 'last_name'] |
+        """
+        columns = self._get_schema_catalog(alias).table_columns(tableName)
+        if columns is None:
+            raise RuntimeError("Table '%s' does not exist in the db" % tableName)
+        return [column.name for column in columns]
+
+    def delete_all_rows_from_table(self, tableName, alias=None):
         """
         Delete all the rows within a given table.
         
@@ -137,19 +581,21 @@ class Query(object):
         will get:
         | Delete All Rows From Table | first_name | # FAIL |
         """
+        self._invalidate_query_cache(alias)
         cur = None
         selectStatement = ("delete from %s;" % tableName)
         try:
-            cur = self._dbconnection.cursor()
-            result = self.__execute_sql(cur, selectStatement)
+            connection = self._get_connection(alias)
+            cur = connection.cursor()
+            result = self.__execute_sql(cur, selectStatement, alias=alias)
             if result is not None:
                 return result.fetchall()
-            self._dbconnection.commit()
+            connection.commit()
         finally :
             if cur :
-                self._dbconnection.rollback() 
+                connection.rollback() 
 
-    def execute_sql_script(self, sqlScriptFileName):
+    def execute_sql_script(self, sqlScriptFileName, alias=None, delimiter=';', batchSize=DEFAULT_SCRIPT_BATCH_SIZE):
         """
         Executes the content of the `sqlScriptFileName` as SQL commands. 
         Useful for setting the database to a known state before running 
@@ -200,44 +646,55 @@ class Query(object):
           from person_table;
         delete 
           from employee_table
+
+        Semi-colons inside quoted strings and identifiers, dollar-quoted
+        bodies (`$$ ... $$`) and `/* */` comments do not end a statement, and
+        `--` comments are ignored as well. Another `delimiter` can be given
+        as an argument, or set from within the script with a `DELIMITER`
+        line:
+        | Execute Sql Script | ${EXECDIR}${/}resources${/}procedures.sql | delimiter=// |
+
+        The script is read as it is executed. With drivers that accept
+        several statements in one call (psycopg2), statements are sent in
+        batches of `batchSize` to save round-trips; other drivers get them
+        one at a time. Progress and timings are written to the log.
         """
+        self._invalidate_query_cache(alias)
+        dialect = self._get_dialect(alias)
+        batchSize = int(batchSize) if dialect.multiStatementExecute else 1
         sqlScriptFile = open(sqlScriptFileName)
 
         cur = None
+        schemaChanged = False
         try:
-            cur = self._dbconnection.cursor()        
-            sqlStatement = ''
-            for line in sqlScriptFile:
-                line = line.strip()
-                if line.startswith('#'):
-                    continue
-                elif line.startswith('--'):
-                    continue
+            connection = self._get_connection(alias)
+            cur = connection.cursor()        
+            statements = SqlScriptReader(sqlScriptFile, delimiter, dialect.backslashEscapes)
+            startTime = time.time()
+            statementCount = 0
+            roundTrips = 0
+            for batch in batch_statements(statements, batchSize):
+                batchStartTime = time.time()
+                sqlText = ';\n'.join(batch)
+                schemaChanged = schemaChanged or changes_schema(sqlText)
+                self.__execute_sql(cur, sqlText, alias=alias)
+                roundTrips += 1
+                statementCount += len(batch)
+                logger.debug("Executed %s statement(s) in %.3f s" % (len(batch), time.time() - batchStartTime))
+                if statementCount // SCRIPT_PROGRESS_INTERVAL > (statementCount - len(batch)) // SCRIPT_PROGRESS_INTERVAL:
+                    logger.info("Executed %s statements of '%s' so far" % (statementCount, sqlScriptFileName))
                 
-                sqlFragments = line.split(';')
-                if len(sqlFragments) == 1:
-                    sqlStatement += line + ' '
-                else:
-                    for sqlFragment in sqlFragments:
-                        sqlFragment = sqlFragment.strip()
-                        if len(sqlFragment) == 0:
-                            continue
-                    
-                        sqlStatement += sqlFragment + ' '
-                        
-                        self.__execute_sql(cur, sqlStatement)
-                        sqlStatement = ''
-
-            sqlStatement = sqlStatement.strip()    
-            if len(sqlStatement) != 0:
-                self.__execute_sql(cur, sqlStatement)
-                
-            self._dbconnection.commit()
+            connection.commit()
+            logger.info("Executed %s statements of '%s' in %s round-trips in %.3f s"
+                        % (statementCount, sqlScriptFileName, roundTrips, time.time() - startTime))
         finally:
+            sqlScriptFile.close()
+            if schemaChanged:
+                self._invalidate_schema_catalog(alias)
             if cur :
-                self._dbconnection.rollback()
+                connection.rollback()
                 
-    def execute_sql_string(self, sqlString):
+    def execute_sql_string(self, sqlString, alias=None, parameters=None):
         """
         Executes the sqlString as SQL commands.
         Useful to pass arguments to your sql.
@@ -249,15 +706,160 @@ class Query(object):
 
         For example with an argument:
         | Execute Sql String | select from person where first_name = ${FIRSTNAME} |
+
+        For example with bind parameters:
+        | @{values} | Create List | ${FIRSTNAME} | ${LASTNAME} |
+        | Execute Sql String | insert into person (first_name, last_name) values (?, ?) | parameters=${values} |
         """
+        self._invalidate_query_cache(alias)
+        cur = None
         try:
-            cur = self._dbconnection.cursor()
-            self.__execute_sql(cur, sqlString)
-            self._dbconnection.commit()
+            connection = self._get_connection(alias)
+            cur = connection.cursor()
+            self.__execute_sql(cur, sqlString, parameters, alias)
+            connection.commit()
         finally:
+            if changes_schema(sqlString):
+                self._invalidate_schema_catalog(alias)
             if cur:
-                self._dbconnection.rollback()
+                connection.rollback()
+
+    def enable_query_cache(self, timeToLive=60, maxEntries=256):
+        """
+        Caches the results of `Query`, `Row Count`, `Description` and the
+        `Check If *` and `Row Count Is *` assertions for `timeToLive` seconds, keeping at most `maxEntries`
+        results (the least recently used are dropped first).
+
+        Results are cached per connection, statement and parameters. The
+        cached results of a connection are dropped whenever `Execute Sql
+        String`, `Execute Sql Script`, `Delete All Rows From Table` or one of
+        the bulk insert keywords runs on it, or with `Clear Query Cache`.
+        Changes made by other means (e.g. the application under test) are not
+        seen until the results expire, so only cache queries on data that
+        the tests themselves change, such as reference data.
 
-    def __execute_sql(self, cur, sqlStatement):
-        logger.debug("Executing : %s" % sqlStatement)
-        return cur.execute(sqlStatement)
+        For example:
+        | Enable Query Cache | timeToLive=300 |
+        | ${countries} | Query | select code, name from country |
+        """
+        self._queryCache = QueryCache(to_seconds(timeToLive), int(maxEntries))
+
+    def disable_query_cache(self):
+        """
+        Stops caching query results and drops the cached ones.
+        """
+        self._queryCache = None
+
+    def clear_query_cache(self, alias=None):
+        """
+        Drops the cached query results of the connection registered under
+        `alias`, or of all connections if no alias is given.
+
+        For example:
+        | Clear Query Cache |
+        | Clear Query Cache | reporting |
+        """
+        if self._queryCache is not None:
+            self._queryCache.invalidate(alias)
+
+    def get_query_cache_statistics(self):
+        """
+        Returns a dictionary with the number of `entries` of the query cache
+        and its `hits`, `misses`, `evictions` and `invalidations` counters,
+        or None if the cache is disabled.
+
+        For example:
+        | ${statistics} | Get Query Cache Statistics |
+        | Log | ${statistics['hits']} hits, ${statistics['misses']} misses |
+        """
+        if self._queryCache is None:
+            return None
+        return self._queryCache.statistics()
+
+    def get_database_statistics(self):
+        """
+        Returns the statistics of the statements executed so far, as a list
+        with a dictionary per alias and normalised statement (literals
+        replaced by `?`), the slowest in total first.
+
+        Each dictionary holds the `alias`, the `statement`, the number of
+        `calls` and `errors`, the number of `rows` fetched (or changed) and
+        their approximate size in `bytes`, and the `totalTime`, `maxTime`
+        and `p50`, `p95` and `p99` latency percentiles in seconds. Commits
+        and rollbacks are listed as the `COMMIT` and `ROLLBACK` statements.
+
+        For example:
+        | ${statistics} | Get Database Statistics |
+        | Log | Slowest: ${statistics[0]['statement']} (p95 ${statistics[0]['p95']} s) |
+        """
+        return self._statistics.statistics()
+
+    def reset_database_statistics(self):
+        """
+        Forgets the statistics collected so far, e.g. to measure a single
+        test.
+        """
+        self._statistics.reset()
+
+    def _read_through_cache(self, compute, alias, kind, sqlStatement, parameters=None, *extra):
+        """
+        Returns the cached result of `compute`, or computes and caches it if
+        the query cache is enabled. Lists of rows are cached as tuples, and a
+        new list is returned on every hit.
+        """
+        if self._queryCache is None:
+            return compute()
+        key = cache_key(self._get_pooled_connection(alias), kind, sqlStatement, parameters, *extra)
+        found, cached = self._queryCache.get(key)
+        if found:
+            isList, value = cached
+            return list(value) if isList else value
+        value = compute()
+        if isinstance(value, list):
+            self._queryCache.put(key, (True, tuple(value)))
+        else:
+            self._queryCache.put(key, (False, value))
+        return value
+
+    def _invalidate_query_cache(self, alias=None):
+        if self._queryCache is not None:
+            self._queryCache.invalidate(alias or self._currentAlias)
+
+    def _get_schema_catalog(self, alias=None):
+        """
+        Returns the schema catalog of the connection of `alias`, which reads
+        the catalog of the database the first time it is used.
+        """
+        pooledConnection = self._get_pooled_connection(alias)
+        if pooledConnection.schemaCatalog is None:
+            catalogAlias = pooledConnection.alias
+            pooledConnection.schemaCatalog = SchemaCatalog(pooledConnection.dialect, lambda statement:
+                [row for batch in self._fetch_batches(statement, catalogAlias, DEFAULT_FETCH_SIZE) for row in batch])
+        return pooledConnection.schemaCatalog
+
+    def _invalidate_schema_catalog(self, alias=None):
+        pooledConnection = self._get_pooled_connection(alias)
+        if pooledConnection.schemaCatalog is not None:
+            pooledConnection.schemaCatalog.invalidate()
+
+    def __execute_sql(self, cur, sqlStatement, parameters=None, alias=None, prepare=True):
+        pooledConnection = self._get_pooled_connection(alias)
+        pooledConnection.loggingPolicy.log_sql("Executing", sqlStatement, parameters)
+        if not parameters:
+            return cur.execute(sqlStatement)
+        return pooledConnection.statementCache.execute(cur, sqlStatement, parameters, prepare)
+
+def check_exists(selectStatement, dialect, queryScalar, fetchFirstRows, attemptOnServer):
+    """
+    Returns whether `selectStatement` returns at least one row. The EXISTS
+    statement of `dialect`, if any, is run with `queryScalar` through
+    `attemptOnServer`; if there is none or the database refuses it, the
+    first row is fetched with `fetchFirstRows` instead.
+    """
+    existsStatement = dialect.wrap_exists(selectStatement)
+    if existsStatement is not None:
+        try:
+            return bool(attemptOnServer(lambda: queryScalar(existsStatement)))
+        except Exception as e:
+            logger.debug("Checking existence on the server failed, fetching the first row instead : %s" % e)
+    return len(fetchFirstRows(selectStatement, 1)) > 0
@@ -0,0 +1,90 @@
+#  Copyright (c) 2010 Franz Allan Valencia See
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import re
+import threading
+import time
+from collections import OrderedDict
+
+_WHITESPACE_PATTERN = re.compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*")|\s+""")
+
+class QueryCache(object):
+    """
+    QueryCache keeps the results of read-only queries for `timeToLive`
+    seconds, evicting the least recently used result once more than
+    `maxEntries` are kept.
+
+    Keys start with the pool entry of the connection the query ran on, so
+    that `invalidate` can drop every result of one alias.
+    """
+
+    def __init__(self, timeToLive=60, maxEntries=256):
+        self.timeToLive = timeToLive
+        self.maxEntries = maxEntries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+
+    def get(self, key):
+        """
+        Returns a tuple of whether `key` is cached and its cached value.
+        """
+        with self._lock:
+            cached = self._entries.pop(key, None)
+            if cached is not None and (self.timeToLive is None or time.time() - cached[0] <= self.timeToLive):
+                self._entries[key] = cached
+                self.hits += 1
+                return True, cached[1]
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.time(), value)
+            while len(self._entries) > self.maxEntries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, alias=None):
+        """
+        Drops the cached results of `alias`, or all of them if no alias is given.
+        """
+        with self._lock:
+            for key in list(self._entries.keys()):
+                if alias is None or key[0].alias == alias:
+                    del self._entries[key]
+                    self.invalidations += 1
+
+    def statistics(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses,
+                    'evictions': self.evictions, 'invalidations': self.invalidations}
+
+def cache_key(pooledConnection, kind, sqlStatement, parameters=None, *extra):
+    """
+    Builds the cache key of running `sqlStatement` with `parameters` on
+    `pooledConnection`. Whitespace is normalised so that reformatting a
+    statement does not defeat the cache.
+    """
+    sqlStatement = _WHITESPACE_PATTERN.sub(lambda match: match.group(1) or ' ', sqlStatement)
+    sqlStatement = sqlStatement.strip().rstrip(';').rstrip()
+    if isinstance(parameters, dict):
+        parameters = tuple(sorted(parameters.items()))
+    elif parameters is not None:
+        parameters = tuple(parameters)
+    return (pooledConnection, kind, sqlStatement, repr(parameters)) + extra
@@ -0,0 +1,230 @@
+#  Copyright (c) 2010 Franz Allan Valencia See
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import json
+import re
+from robot.api import logger
+
+FULL_SCAN = 'full scan'
+INDEX_SCAN = 'index scan'
+JOIN = 'join'
+SORT = 'sort'
+AGGREGATE = 'aggregate'
+
+_POSTGRESQL_KINDS = {
+    'Seq Scan': FULL_SCAN, 'Parallel Seq Scan': FULL_SCAN,
+    'Index Scan': INDEX_SCAN, 'Index Only Scan': INDEX_SCAN,
+    'Bitmap Index Scan': INDEX_SCAN, 'Bitmap Heap Scan': INDEX_SCAN,
+    'Nested Loop': JOIN, 'Hash Join': JOIN, 'Merge Join': JOIN,
+    'Sort': SORT, 'Incremental Sort': SORT,
+    'Aggregate': AGGREGATE, 'HashAggregate': AGGREGATE, 'GroupAggregate': AGGREGATE,
+}
+_MYSQL_FULL_SCAN_TYPES = ('ALL',)
+_SQLITE_STEP_PATTERN = re.compile(r'^(?P<operation>SCAN|SEARCH)\s+(?:TABLE\s+)?(?!CONSTANT ROW|SUBQUERY\b)'
+                                  r'(?P<table>\S+)(?:\s+AS\s+\S+)?'
+                                  r'(?:\s+USING\s+(?:(?:AUTOMATIC\s+)?(?:PARTIAL\s+)?COVERING\s+)?INDEX\s+(?P<index>\S+)'
+                                  r'|\s+USING\s+(?P<primaryKey>(?:INTEGER\s+)?PRIMARY\s+KEY))?', re.IGNORECASE)
+
+class QueryPlan(object):
+    """
+    QueryPlan checks how the database plans to run a query, to catch e.g.
+    a full table scan introduced by a change before it reaches production.
+
+    The plan is read with the EXPLAIN statement of the database, without
+    running the query: `EXPLAIN (FORMAT JSON)` on PostgreSQL, `EXPLAIN QUERY
+    PLAN` on SQLite and `EXPLAIN` on MySQL. It is turned into a tree of
+    steps, each with an operation, a kind (`full scan`, `index scan`,
+    `join`, `sort`, `aggregate` or the operation itself), the table and the
+    index it uses, and the estimated cost and rows when the database gives
+    them. On failure the whole plan is written to the log.
+    """
+
+    def query_plan_should_not_contain(self, selectStatement, operation, tableName=None, alias=None, parameters=None):
+        """
+        Fails if the plan of `selectStatement` has a step of the kind
+        `operation` (e.g. `full scan`), or whose operation as named by the
+        database contains `operation` (e.g. `Seq Scan`), optionally only on
+        the table `tableName`.
+
+        For example:
+        | Query Plan Should Not Contain | select * from person where last_name = 'See' | full scan |
+        | Query Plan Should Not Contain | select * from person p join address a on a.person_id = p.id | full scan | address |
+        | Query Plan Should Not Contain | select * from invoice order by created | Sort |
+        """
+        plan = self._get_query_plan(selectStatement, alias, parameters)
+        for step in plan.walk():
+            if step.matches(operation) and (tableName is None or step.on_table(tableName)):
+                _fail_with_plan(plan, "The plan of the query has a step '%s'" % step.summary())
+
+    def query_plan_should_use_index(self, selectStatement, indexName=None, tableName=None, alias=None, parameters=None):
+        """
+        Fails unless the plan of `selectStatement` reads through the index
+        `indexName`, or through any index if no name is given, optionally on
+        the table `tableName`.
+
+        For example:
+        | Query Plan Should Use Index | select * from person where last_name = 'See' | person_last_name_idx |
+        | Query Plan Should Use Index | select * from person p join address a on a.person_id = p.id | tableName=address |
+        """
+        plan = self._get_query_plan(selectStatement, alias, parameters)
+        for step in plan.walk():
+            if step.kind == INDEX_SCAN and (tableName is None or step.on_table(tableName)) and \
+                    (indexName is None or (step.index or '').lower() == indexName.lower()):
+                return
+        _fail_with_plan(plan, "The plan of the query does not use %s%s" % (
+            "the index '%s'" % indexName if indexName else 'an index', " on '%s'" % tableName if tableName else ''))
+
+    def query_cost_should_be_below(self, selectStatement, maxCost=None, maxRows=None, alias=None, parameters=None):
+        """
+        Fails if the cost of `selectStatement` estimated by the database
+        is `maxCost` or more, or if a step of its plan is estimated to
+        produce `maxRows` rows or more.
+
+        Costs are in the units of the database and only comparable on the
+        same database with similar data; PostgreSQL estimates costs and
+        rows, MySQL only rows, and SQLite neither.
+
+        For example:
+        | Query Cost Should Be Below | select * from person where last_name = 'See' | 100 |
+        | Query Cost Should Be Below | select * from person where last_name = 'See' | maxRows=1000 |
+        """
+        if maxCost is None and maxRows is None:
+            raise ValueError("Give the maximum cost or rows of the query")
+        plan = self._get_query_plan(selectStatement, alias, parameters)
+        if maxCost is not None:
+            if plan.cost is None:
+                raise RuntimeError("%s databases do not estimate the cost of queries" % self._get_dialect(alias).name)
+            if plan.cost >= float(maxCost):
+                _fail_with_plan(plan, "The estimated cost of the query is %s, expected below %s" % (plan.cost, maxCost))
+        if maxRows is not None:
+            steps = [step for step in plan.walk() if step.rows is not None]
+            if not steps:
+                raise RuntimeError("%s databases do not estimate the rows of queries" % self._get_dialect(alias).name)
+            largest = max(steps, key=lambda step: step.rows)
+            if largest.rows >= float(maxRows):
+                _fail_with_plan(plan, "The step '%s' of the query is estimated to produce %s rows, expected below %s"
+                                % (largest.summary(), largest.rows, maxRows))
+
+    def _get_query_plan(self, selectStatement, alias, parameters):
+        dialect = self._get_dialect(alias)
+        explainStatement = dialect.explain(selectStatement)
+        if explainStatement is None:
+            raise RuntimeError("Reading query plans is not supported for %s databases" % dialect.name)
+        # EXPLAIN cannot be declared as a server-side cursor, whatever the connection uses.
+        result = self._compute_columnar_query(explainStatement, alias, None, None, parameters, serverSide=False)
+        plan = _PARSERS[dialect.name](result)
+        logger.debug("Query plan :\n%s" % plan.format())
+        return plan
+
+class PlanStep(object):
+    """
+    A step of a query plan and the steps it reads from.
+    """
+
+    def __init__(self, operation, kind=None, table=None, index=None, cost=None, rows=None):
+        self.operation = operation
+        self.kind = kind or operation.lower()
+        self.table = table
+        self.index = index
+        self.cost = cost
+        self.rows = rows
+        self.children = []
+
+    def walk(self):
+        yield self
+        for child in self.children:
+            for step in child.walk():
+                yield step
+
+    def matches(self, operation):
+        operation = operation.lower()
+        return self.kind == operation or operation in self.operation.lower()
+
+    def on_table(self, tableName):
+        return self.table is not None and self.table.lower() == tableName.lower()
+
+    def summary(self):
+        text = self.operation
+        if self.table:
+            text += ' on %s' % self.table
+        if self.index:
+            text += ' using %s' % self.index
+        return text
+
+    def format(self, depth=0):
+        estimates = ', '.join(['%s=%s' % (name, value) for name, value in (('cost', self.cost), ('rows', self.rows))
+                               if value is not None])
+        lines = ['%s%s%s' % ('  ' * depth, self.summary(), ' (%s)' % estimates if estimates else '')]
+        for child in self.children:
+            lines.append(child.format(depth + 1))
+        return '\n'.join(lines)
+
+def _fail_with_plan(plan, message):
+    logger.info("Query plan :\n%s" % plan.format())
+    raise AssertionError(message)
+
+def _parse_postgresql_plan(result):
+    document = result[0][0]
+    if isinstance(document, (str, bytes)):
+        document = json.loads(document)
+    return _postgresql_step(document[0]['Plan'])
+
+def _postgresql_step(node):
+    nodeType = node['Node Type']
+    step = PlanStep(nodeType, _POSTGRESQL_KINDS.get(nodeType), node.get('Relation Name'), node.get('Index Name'),
+                    node.get('Total Cost'), node.get('Plan Rows'))
+    step.children = [_postgresql_step(child) for child in node.get('Plans', [])]
+    return step
+
+def _parse_sqlite_plan(result):
+    """
+    Builds the tree from the `id` and `parent` columns of `EXPLAIN QUERY
+    PLAN`, under a root step standing for the query.
+    """
+    root = PlanStep('QUERY')
+    steps = {0: root}
+    for stepId, parentId, unused, detail in result:
+        match = _SQLITE_STEP_PATTERN.match(detail)
+        if match is None:
+            step = PlanStep(detail, SORT if 'B-TREE FOR' in detail.upper() else None)
+        else:
+            usesIndex = match.group('index') or match.group('primaryKey')
+            kind = INDEX_SCAN if usesIndex else FULL_SCAN
+            step = PlanStep(match.group('operation').upper(), kind, match.group('table'),
+                            match.group('index') or (match.group('primaryKey') and 'PRIMARY KEY'))
+        steps.get(parentId, root).children.append(step)
+        steps[stepId] = step
+    return root
+
+def _parse_mysql_plan(result):
+    """
+    MySQL lists one row per table read, in join order, under a root step
+    standing for the query.
+    """
+    root = PlanStep('QUERY')
+    columns = [column.lower() for column in result.columns]
+    for row in result:
+        values = dict(zip(columns, row))
+        accessType = values.get('type') or ''
+        kind = FULL_SCAN if accessType.upper() in _MYSQL_FULL_SCAN_TYPES else (INDEX_SCAN if values.get('key') else None)
+        rows = values.get('rows')
+        root.children.append(PlanStep(accessType or 'NONE', kind, values.get('table'), values.get('key'),
+                                      rows=None if rows is None else float(rows)))
+    return root
+
+_PARSERS = {
+    'postgresql': _parse_postgresql_plan,
+    'sqlite': _parse_sqlite_plan,
+    'mysql': _parse_mysql_plan,
+}
@@ -0,0 +1,346 @@
+#  Copyright (c) 2010 Franz Allan Valencia See
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import csv
+import json
+import random
+import re
+import threading
+import time
+from robot.api import logger
+try:
+    # The threads Robot Framework logs from, an internal of it that may move.
+    from robot.output.librarylogger import LOGGING_THREADS
+except ImportError:
+    LOGGING_THREADS = None
+
+MAX_STATEMENTS = 1000
+SAMPLE_SIZE = 1000
+OTHER_STATEMENTS = '<other statements>'
+
+_NORMALISED_LENGTH = 2000
+_LITERAL_PATTERN = re.compile(r"""'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|\s+""")
+_VALUE_LIST_PATTERN = re.compile(r'\(\?(?:, \?)+\)')
+_FIELDS = ['alias', 'statement', 'calls', 'errors', 'rows', 'bytes', 'totalTime', 'maxTime', 'p50', 'p95', 'p99']
+
+class QueryStatistics(object):
+    """
+    QueryStatistics aggregates the executions of statements, grouped by
+    alias and normalised statement (literals replaced by `?`).
+
+    An execution lasts from `execute` until the next `execute` on the same
+    cursor or the end of the transaction, so the time spent fetching rows is
+    included. Latency percentiles are computed from a random sample of at
+    most `SAMPLE_SIZE` executions per statement, so memory stays bounded
+    however long the run.
+
+    Robot Framework drops messages logged by threads of its own, so the
+    slow query warnings of worker threads are queued and logged by the
+    next thread that can (see `flush_warnings`).
+    """
+
+    def __init__(self, slowQueryThreshold=1.0, statisticsFile=None, loggingPolicyFor=None):
+        self.slowQueryThreshold = slowQueryThreshold
+        self.statisticsFile = statisticsFile
+        self.loggingPolicyFor = loggingPolicyFor
+        self._statements = {}
+        self._normalised = {}
+        self._lock = threading.Lock()
+        self._pendingWarnings = []
+
+    def instrument(self, connection, alias, keepTransaction=False):
+        return InstrumentedConnection(connection, self, alias, keepTransaction)
+
+    def record(self, alias, sqlStatement, elapsed, rows=0, size=0, failed=False):
+        statement = self._normalised.get(sqlStatement)
+        if statement is None:
+            statement = normalise_statement(sqlStatement)
+            if len(self._normalised) < MAX_STATEMENTS:
+                self._normalised[sqlStatement] = statement
+        with self._lock:
+            entry = self._statements.get((alias, statement))
+            if entry is None:
+                if len(self._statements) >= MAX_STATEMENTS:
+                    statement = OTHER_STATEMENTS
+                entry = self._statements.setdefault((alias, statement), _StatementStatistics(alias, statement))
+            entry.add(elapsed, rows, size, failed)
+        if self.slowQueryThreshold is not None and elapsed >= self.slowQueryThreshold:
+            if self.loggingPolicyFor is not None:
+                sqlStatement = self.loggingPolicyFor(alias).sql(sqlStatement)
+            warning = "Slow query on '%s' took %.3f s for %s rows : %s" % (alias, elapsed, rows, sqlStatement)
+            if not _is_logging_thread():
+                with self._lock:
+                    self._pendingWarnings.append(warning)
+                return
+            self.flush_warnings()
+            logger.warn(warning)
+
+    def flush_warnings(self):
+        """
+        Logs the slow query warnings queued by worker threads. Does nothing
+        when called from a worker thread.
+        """
+        if not _is_logging_thread():
+            return
+        with self._lock:
+            warnings, self._pendingWarnings = self._pendingWarnings, []
+        for warning in warnings:
+            logger.warn(warning)
+
+    def statistics(self):
+        """
+        Returns a list with a dictionary per statement, the slowest in total
+        first.
+        """
+        with self._lock:
+            entries = [entry.as_dict() for entry in self._statements.values()]
+        return sorted(entries, key=lambda entry: entry['totalTime'], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._statements = {}
+
+    def write(self, fileName=None):
+        """
+        Writes the statistics to `fileName`, or to `statisticsFile` if not
+        given, as CSV if the file name ends with `.csv` and as JSON otherwise.
+        """
+        fileName = fileName or self.statisticsFile
+        if not fileName:
+            return
+        entries = self.statistics()
+        statisticsFile = open(fileName, 'w')
+        try:
+            if fileName.lower().endswith('.csv'):
+                writer = csv.DictWriter(statisticsFile, _FIELDS)
+                writer.writeheader()
+                writer.writerows(entries)
+            else:
+                json.dump(entries, statisticsFile, indent=2)
+        finally:
+            statisticsFile.close()
+        logger.info("Wrote the statistics of %s statements to %s" % (len(entries), fileName))
+
+class InstrumentedConnection(object):
+    """
+    Wraps a DB API 2.0 connection to time its commits and rollbacks and hand
+    out instrumented cursors. Everything else is passed to the connection.
+
+    With `keepTransaction`, commits and rollbacks are skipped, leaving the
+    transaction open for whoever holds it (e.g. an isolated test).
+    """
+
+    def __init__(self, connection, statistics, alias, keepTransaction=False):
+        self._connection = connection
+        self._statistics = statistics
+        self._alias = alias
+        self._keepTransaction = keepTransaction
+        self._cursors = []
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    @property
+    def autocommit(self):
+        return self._connection.autocommit
+
+    @autocommit.setter
+    def autocommit(self, value):
+        self._connection.autocommit = value
+
+    def cursor(self, *args, **kwargs):
+        cursor = InstrumentedCursor(self._connection.cursor(*args, **kwargs), self._statistics, self._alias)
+        self._cursors.append(cursor)
+        return cursor
+
+    def commit(self):
+        return self._end_transaction('COMMIT', self._connection.commit)
+
+    def rollback(self):
+        return self._end_transaction('ROLLBACK', self._connection.rollback)
+
+    def _end_transaction(self, sqlStatement, end):
+        for cursor in self._cursors:
+            cursor._finish()
+        if self._keepTransaction:
+            return None
+        failed = True
+        startTime = time.time()
+        try:
+            result = end()
+            failed = False
+            return result
+        finally:
+            self._statistics.record(self._alias, sqlStatement, time.time() - startTime, failed=failed)
+
+class InstrumentedCursor(object):
+    """
+    Wraps a DB API 2.0 cursor to time its executions and count the rows and
+    (approximate) bytes they fetch.
+
+    Drivers whose `execute` returns the cursor itself (e.g. sqlite3) get the
+    wrapper back instead, so chained fetches are counted too.
+    """
+
+    def __init__(self, cursor, statistics, alias):
+        self._cursor = cursor
+        self._statistics = statistics
+        self._alias = alias
+        self._statement = None
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    @property
+    def arraysize(self):
+        return self._cursor.arraysize
+
+    @arraysize.setter
+    def arraysize(self, value):
+        self._cursor.arraysize = value
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def execute(self, operation, *args):
+        return self._execute(self._cursor.execute, operation, *args)
+
+    def executemany(self, operation, *args):
+        return self._execute(self._cursor.executemany, operation, *args)
+
+    def copy_expert(self, operation, *args):
+        return self._execute(self._cursor.copy_expert, operation, *args)
+
+    def fetchone(self):
+        row = self._timed(self._cursor.fetchone)
+        if row is not None:
+            self._add_rows([row])
+        return row
+
+    def fetchmany(self, *args):
+        rows = self._timed(self._cursor.fetchmany, *args)
+        self._add_rows(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(self._cursor.fetchall)
+        self._add_rows(rows)
+        return rows
+
+    def close(self):
+        self._finish()
+        return self._cursor.close()
+
+    def _execute(self, execute, operation, *args):
+        self._finish()
+        self._statement = operation
+        self._elapsed = 0.0
+        self._rows = 0
+        self._size = 0
+        self._failed = True
+        result = self._timed(execute, operation, *args)
+        self._failed = False
+        if self._cursor.description is None and self._cursor.rowcount > 0:
+            self._rows = self._cursor.rowcount
+        return self if result is self._cursor else result
+
+    def _timed(self, function, *args):
+        startTime = time.time()
+        try:
+            return function(*args)
+        finally:
+            if self._statement is not None:
+                self._elapsed += time.time() - startTime
+
+    def _add_rows(self, rows):
+        if self._statement is not None and rows:
+            self._rows += len(rows)
+            self._size += len(rows) * _approximate_size(rows[0])
+
+    def _finish(self):
+        if self._statement is not None:
+            self._statistics.record(self._alias, self._statement, self._elapsed, self._rows, self._size, self._failed)
+            self._statement = None
+
+class _StatementStatistics(object):
+
+    def __init__(self, alias, statement):
+        self.alias = alias
+        self.statement = statement
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.bytes = 0
+        self.totalTime = 0.0
+        self.maxTime = 0.0
+        self._samples = []
+
+    def add(self, elapsed, rows, size, failed):
+        self.calls += 1
+        self.errors += failed
+        self.rows += rows
+        self.bytes += size
+        self.totalTime += elapsed
+        self.maxTime = max(self.maxTime, elapsed)
+        if len(self._samples) < SAMPLE_SIZE:
+            self._samples.append(elapsed)
+        else:
+            index = random.randrange(self.calls)
+            if index < SAMPLE_SIZE:
+                self._samples[index] = elapsed
+
+    def as_dict(self):
+        samples = sorted(self._samples)
+        return {'alias': self.alias, 'statement': self.statement, 'calls': self.calls,
+                'errors': self.errors, 'rows': self.rows, 'bytes': self.bytes,
+                'totalTime': self.totalTime, 'maxTime': self.maxTime,
+                'p50': _percentile(samples, 50), 'p95': _percentile(samples, 95),
+                'p99': _percentile(samples, 99)}
+
+def normalise_statement(sqlStatement):
+    """
+    Replaces the literals of `sqlStatement` with `?` and collapses its
+    whitespace, so that executions differing only in their values are
+    grouped together. Only the start of very long statements is kept.
+    """
+    if isinstance(sqlStatement, bytes):
+        sqlStatement = sqlStatement[:_NORMALISED_LENGTH].decode('utf-8', 'replace')
+    elif len(sqlStatement) > _NORMALISED_LENGTH:
+        sqlStatement = sqlStatement[:_NORMALISED_LENGTH]
+    sqlStatement = _LITERAL_PATTERN.sub(lambda match: ' ' if match.group().isspace() else '?', sqlStatement)
+    return _VALUE_LIST_PATTERN.sub('(?, ...)', sqlStatement.strip())
+
+def _approximate_size(row):
+    size = 0
+    for value in row:
+        if isinstance(value, (str, bytes, bytearray)):
+            size += len(value)
+        else:
+            size += 8
+    return size
+
+def _percentile(samples, percent):
+    if not samples:
+        return None
+    return samples[min(len(samples) - 1, int(len(samples) * percent / 100.0))]
+
+def _is_logging_thread():
+    """
+    Returns whether Robot Framework keeps the log messages of the current
+    thread: those of its logging threads, or only the main thread if they
+    are not known.
+    """
+    if LOGGING_THREADS is None:
+        return threading.current_thread() is threading.main_thread()
+    return threading.current_thread().name in LOGGING_THREADS
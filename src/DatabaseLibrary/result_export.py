@@ -0,0 +1,100 @@
+#  Copyright (c) 2010 Franz Allan Valencia See
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import csv
+import datetime
+import gzip
+import json
+
+EXPORT_FORMATS = ('csv', 'jsonl', 'csv.gz', 'jsonl.gz')
+GZIP_COMPRESS_LEVEL = 6
+
+def export_format(fileName, format=None):
+    """
+    Returns the export format named `format`, or else the one matching the
+    extension of `fileName`.
+    """
+    if format:
+        format = format.lower().lstrip('.')
+        if format not in EXPORT_FORMATS:
+            raise ValueError("Unknown export format '%s', expected one of %s" % (format, ', '.join(EXPORT_FORMATS)))
+        return format
+    for format in sorted(EXPORT_FORMATS, key=len, reverse=True):
+        if fileName.lower().endswith('.' + format):
+            return format
+    raise ValueError("Cannot tell the export format of '%s', name it with one of the extensions %s or give the format"
+                     % (fileName, ', '.join(['.' + format for format in EXPORT_FORMATS])))
+
+def open_export(fileName, format, columns, delimiter=','):
+    """
+    Opens `fileName` for writing rows in `format`, and writes the header
+    made of the names in `columns` (CSV only: JSONL rows are objects keyed
+    by column name).
+    """
+    if format.endswith('.gz'):
+        exportFile = gzip.open(fileName, 'wt', compresslevel=GZIP_COMPRESS_LEVEL, encoding='utf-8', newline='')
+    else:
+        exportFile = open(fileName, 'w', encoding='utf-8', newline='')
+    try:
+        if format.startswith('csv'):
+            return CsvExport(exportFile, columns, delimiter)
+        return JsonLinesExport(exportFile, columns)
+    except:
+        exportFile.close()
+        raise
+
+class CsvExport(object):
+
+    def __init__(self, exportFile, columns, delimiter=','):
+        self.file = exportFile
+        self.writer = csv.writer(exportFile, delimiter=str(delimiter))
+        self.writer.writerow(columns)
+
+    def write_rows(self, rows):
+        self.writer.writerows([[_csv_value(value) for value in row] for row in rows])
+
+    def close(self):
+        self.file.close()
+
+class JsonLinesExport(object):
+
+    def __init__(self, exportFile, columns):
+        self.file = exportFile
+        self.columns = columns
+        self.encoder = json.JSONEncoder(ensure_ascii=False, default=_json_value)
+
+    def write_rows(self, rows):
+        encode = self.encoder.encode
+        columns = self.columns
+        self.file.write(''.join([encode(dict(zip(columns, row))) + '\n' for row in rows]))
+
+    def close(self):
+        self.file.close()
+
+def _csv_value(value):
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value).hex()
+    return value
+
+def _json_value(value):
+    """
+    Converts the values JSON has no type for: dates and times to ISO 8601,
+    binary values to hexadecimal, and anything else (e.g. decimals, which
+    keep their precision that way) to its string form.
+    """
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value).hex()
+    return str(value)
@@ -0,0 +1,179 @@
+#  Copyright (c) 2010 Franz Allan Valencia See
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+from array import array
+
+_INTEGER_RANGE = (-(1 << 63), (1 << 63) - 1)
+
+class ResultTable(object):
+    """
+    The rows of a query stored column by column: a list per column, or an
+    `array` for columns holding only integers or only floats, which keeps
+    8 bytes per value instead of a Python object plus a tuple slot per row.
+
+    A ResultTable behaves as the list of row tuples `Query` otherwise
+    returns (length, indexing, iteration, comparison with a list), with the
+    row tuples built only when asked for. In addition:
+    | ${result.columns} | the column names, from the description of the query |
+    | ${result.description} | the description of the query, as `Description` returns it (None for statements returning no result) |
+    | ${result.col['first_name']} | the values of a column, as a list |
+    | ${result.col.first_name} | the same |
+    | ${result[100:200]} | rows 100 to 199, as a ResultTable sharing the storage of this one |
+    """
+
+    __slots__ = ('description', 'columns', 'col', '_data', '_start', '_stop', '_indexes')
+
+    def __init__(self, description, data, start=0, stop=None, indexes=None):
+        self.description = description
+        self.columns = tuple([column[0] for column in description or ()])
+        self.col = _Columns(self)
+        self._data = data
+        self._start = start
+        self._stop = len(data[0]) if stop is None and data else (stop or 0)
+        self._indexes = indexes if indexes is not None else _column_indexes(self.columns)
+
+    def column(self, name):
+        """
+        Returns the values of the column `name` (or of the column at the
+        index `name`), as a list.
+        """
+        if isinstance(name, int):
+            index = name
+        else:
+            index = self._indexes.get(name)
+            if index is None:
+                index = self._indexes.get(str(name).lower())
+            if index is None:
+                raise KeyError("No column '%s' in the result, which has %s" % (name, ', '.join(self.columns)))
+        return list(self._data[index][self._start:self._stop]) if self._data else []
+
+    def row(self, index):
+        return tuple([column[self._start + index] for column in self._data])
+
+    def __len__(self):
+        return self._stop - self._start
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            rows = range(self._start, self._stop)[key]
+            if rows.step == 1:
+                return ResultTable(self.description, self._data, rows.start, max(rows.start, rows.stop), self._indexes)
+            stop = None if rows.stop < 0 else rows.stop
+            return ResultTable(self.description, [column[rows.start:stop:rows.step] for column in self._data],
+                               indexes=self._indexes)
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError('result row index out of range')
+        return self.row(key)
+
+    def __iter__(self):
+        if not self._data:
+            return iter([])
+        return zip(*[column[self._start:self._stop] for column in self._data])
+
+    def __eq__(self, other):
+        if isinstance(other, (ResultTable, list, tuple)):
+            return len(self) == len(other) and all(row == tuple(otherRow) for row, otherRow in zip(self, other))
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '<ResultTable of %s rows: %s>' % (len(self), ', '.join(self.columns))
+
+class _Columns(object):
+    """
+    Gives the columns of a ResultTable by name, as `col['name']` or
+    `col.name`.
+    """
+
+    __slots__ = ('_table',)
+
+    def __init__(self, table):
+        self._table = table
+
+    def __getitem__(self, name):
+        return self._table.column(name)
+
+    def __getattr__(self, name):
+        try:
+            return self._table.column(name)
+        except KeyError as e:
+            raise AttributeError(str(e))
+
+    def __iter__(self):
+        return iter(self._table.columns)
+
+    def __len__(self):
+        return len(self._table.columns)
+
+class ResultTableBuilder(object):
+    """
+    Collects batches of rows into columns. A column is packed into an array
+    as long as it holds only integers or only floats, and turned into a list
+    from the first batch that does not fit.
+    """
+
+    def __init__(self, description):
+        self.description = description
+        self.data = [[] for column in description or ()]
+
+    def add_rows(self, rows):
+        if not rows:
+            return
+        for index, values in enumerate(zip(*rows)):
+            column = self.data[index]
+            typecode = getattr(column, 'typecode', None)
+            if typecode is not None or not column:
+                valuesTypecode = _typecode(values)
+                if valuesTypecode is not None and typecode in (None, valuesTypecode):
+                    if typecode is None:
+                        column = self.data[index] = array(valuesTypecode)
+                    column.extend(values)
+                    continue
+                if typecode is not None:
+                    column = self.data[index] = column.tolist()
+            column.extend(values)
+
+    def build(self):
+        return ResultTable(self.description, self.data)
+
+def _typecode(values):
+    """
+    Returns the array type code that can hold all of `values`, if any.
+    """
+    kinds = set(map(type, values))
+    if kinds == set([int]) and _INTEGER_RANGE[0] <= min(values) and max(values) <= _INTEGER_RANGE[1]:
+        return 'q'
+    if kinds == set([float]):
+        return 'd'
+    return None
+
+def _column_indexes(columns):
+    """
+    Maps the column names, then their lower case form (for the drivers that
+    change the case of unquoted names), to the column indexes; the first
+    column wins when names repeat.
+    """
+    indexes = {}
+    for index, name in reversed(list(enumerate(columns))):
+        indexes[str(name).lower()] = index
+    for index, name in reversed(list(enumerate(columns))):
+        indexes[name] = index
+    return indexes
@@ -0,0 +1,133 @@
+#  Copyright (c) 2010 Franz Allan Valencia See
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import re
+from collections import OrderedDict, namedtuple
+
+_DDL_PATTERN = re.compile(r'^\s*(create|alter|drop|rename|comment)\b', re.IGNORECASE | re.MULTILINE)
+
+CatalogColumn = namedtuple('CatalogColumn', 'name type nullable')
+CatalogIndex = namedtuple('CatalogIndex', 'name columns')
+CatalogKey = namedtuple('CatalogKey', 'name kind columns referencedTable referencedColumns')
+
+class SchemaCatalog(object):
+    """
+    SchemaCatalog keeps the tables, columns, indexes and keys of one
+    connection, read from the catalog of the database with the statements
+    of its dialect. The columns are read the first time they are needed,
+    and the indexes and keys the first time they are looked up, each with
+    one query.
+
+    Names are matched case-insensitively, as databases differ in how they
+    store unquoted names.
+    """
+
+    def __init__(self, dialect, fetch):
+        self.dialect = dialect
+        self._fetch = fetch
+        self._tables = None
+        self._indexes = None
+        self._keys = None
+
+    def invalidate(self):
+        self._tables = None
+        self._indexes = None
+        self._keys = None
+
+    def table_columns(self, tableName, reload=True):
+        """
+        Returns the columns of `tableName` as a list of CatalogColumn, or None
+        if there is no such table. A table that is not found is looked up
+        again in a freshly read catalog (unless `reload` is false), in case
+        it was created by someone else since the catalog was read.
+        """
+        if self._tables is None:
+            self._tables = self._load_tables()
+        elif reload and tableName.lower() not in self._tables:
+            self.invalidate()
+            return self.table_columns(tableName, False)
+        return self._tables.get(tableName.lower())
+
+    def column(self, tableName, columnName, reload=True):
+        columns = self.table_columns(tableName, reload)
+        for column in columns or []:
+            if column.name.lower() == columnName.lower():
+                return column
+        if reload and columns is not None:
+            self.invalidate()
+            return self.column(tableName, columnName, False)
+        return None
+
+    def table_indexes(self, tableName, reload=False):
+        """
+        Returns the indexes of `tableName` as a list of CatalogIndex, or None
+        if the dialect cannot list indexes.
+        """
+        if self._indexes is None or reload:
+            statement = self.dialect.catalog_indexes()
+            if statement is None:
+                return None
+            self._indexes = self._load_indexes(statement)
+        return self._indexes.get(tableName.lower(), [])
+
+    def table_keys(self, tableName, reload=False):
+        """
+        Returns the primary, unique and foreign keys of `tableName` as a list
+        of CatalogKey, or None if the dialect cannot list keys.
+        """
+        if self._keys is None or reload:
+            statement = self.dialect.catalog_keys()
+            if statement is None:
+                return None
+            self._keys = self._load_keys(statement)
+        return self._keys.get(tableName.lower(), [])
+
+    def _load_tables(self):
+        tables = OrderedDict()
+        for tableName, columnName, dataType, nullable in self._fetch(self.dialect.catalog_columns()):
+            tables.setdefault(tableName.lower(), []).append(CatalogColumn(columnName, dataType, _is_true(nullable)))
+        return tables
+
+    def _load_indexes(self, statement):
+        indexes = {}
+        for tableName, indexName, columnName in self._fetch(statement):
+            tableIndexes = indexes.setdefault(tableName.lower(), [])
+            if not tableIndexes or tableIndexes[-1].name != indexName:
+                tableIndexes.append(CatalogIndex(indexName, []))
+            tableIndexes[-1].columns.append(columnName)
+        return indexes
+
+    def _load_keys(self, statement):
+        keys = {}
+        for tableName, keyName, kind, columnName, referencedTable, referencedColumn in self._fetch(statement):
+            tableKeys = keys.setdefault(tableName.lower(), [])
+            if not tableKeys or tableKeys[-1].name != keyName:
+                tableKeys.append(CatalogKey(keyName, kind.upper(), [], referencedTable, []))
+            key = tableKeys[-1]
+            # The referenced columns of a key over several columns come as a
+            # cross product on some databases.
+            if columnName not in key.columns:
+                key.columns.append(columnName)
+            if referencedColumn is not None and referencedColumn not in key.referencedColumns:
+                key.referencedColumns.append(referencedColumn)
+        return keys
+
+def changes_schema(sqlText):
+    """
+    Returns whether `sqlText` holds a statement that may change the schema.
+    """
+    return _DDL_PATTERN.search(sqlText) is not None
+
+def _is_true(value):
+    return str(value).upper() in ('YES', 'Y', 'TRUE', '1')
@@ -0,0 +1,307 @@
+#  Copyright (c) 2010 Franz Allan Valencia See
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import hashlib
+import os
+import pickle
+import re
+from robot.api import logger
+from DatabaseLibrary.dialect import positional_placeholders
+
+DUMP_CHUNK_SIZE = 1000
+MAINTENANCE_DATABASE = 'postgres'
+MAX_DATABASE_NAME_LENGTH = 63
+
+def snapshot_for(pooledConnection, snapshotName, directory, tables=None):
+    """
+    Returns the fastest kind of snapshot for the connection: a backup file
+    for SQLite, a template database for PostgreSQL, or else (or if only
+    some `tables` are wanted, or the connection goes through the connection
+    broker) a dump of the tables.
+    """
+    fileName = os.path.join(directory, '%s_%s' % (_safe_name(pooledConnection.alias), _safe_name(snapshotName)))
+    if tables is None and pooledConnection.dialect.name == 'sqlite' and hasattr(pooledConnection.connection, 'backup'):
+        return SqliteSnapshot(fileName + '.db')
+    # The sessions the broker keeps open would make the server refuse to copy or drop the database.
+    brokered = getattr(pooledConnection.connection, 'brokered', False)
+    if tables is None and pooledConnection.dialect.name == 'postgresql' and not brokered:
+        return PostgresqlSnapshot(snapshotName)
+    return TableDumpSnapshot(fileName + '.dump', tables)
+
+class SqliteSnapshot(object):
+    """
+    A copy of a SQLite database made with the online backup API, which
+    copies the database page by page.
+    """
+
+    def __init__(self, fileName):
+        self.fileName = fileName
+
+    def take(self, pooledConnection):
+        self.discard()
+        target = pooledConnection.dbApiModule.connect(self.fileName)
+        try:
+            pooledConnection.connection.backup(target)
+        finally:
+            target.close()
+
+    def restore(self, pooledConnection):
+        source = pooledConnection.dbApiModule.connect(self.fileName)
+        try:
+            source.backup(pooledConnection.connection)
+        finally:
+            source.close()
+
+    def rows(self, pooledConnection, tableName):
+        """
+        Yields the rows of `tableName` as they were in the snapshot.
+        """
+        return _select_rows(pooledConnection.dbApiModule.connect(self.fileName), tableName)
+
+    def discard(self):
+        if os.path.exists(self.fileName):
+            os.remove(self.fileName)
+
+class PostgresqlSnapshot(object):
+    """
+    A copy of a PostgreSQL database made by the server with `CREATE
+    DATABASE ... TEMPLATE`, which copies the database files.
+
+    The server refuses to copy a database other sessions are connected to,
+    so the application under test must be disconnected meanwhile. Restoring
+    drops the database and creates it again from the copy, and discarding
+    the snapshot drops the copy, from a connection to the `postgres`
+    database.
+    """
+
+    def __init__(self, snapshotName):
+        self.snapshotName = snapshotName
+        self.databaseName = None
+        self.snapshotDatabaseName = None
+        self._pooledConnection = None
+
+    def take(self, pooledConnection):
+        connection = pooledConnection.connection
+        cur = connection.cursor()
+        cur.execute('SELECT current_database()')
+        self.databaseName = cur.fetchone()[0]
+        self.snapshotDatabaseName = _database_name('%s_snapshot_%s' % (self.databaseName, _safe_name(self.snapshotName)))
+        self._pooledConnection = pooledConnection
+        connection.rollback()
+        pooledConnection.close_spare_connections()
+        _execute_outside_transaction(pooledConnection, connection, [
+            'DROP DATABASE IF EXISTS %s' % _quote(self.snapshotDatabaseName),
+            'CREATE DATABASE %s TEMPLATE %s' % (_quote(self.snapshotDatabaseName), _quote(self.databaseName))])
+
+    def restore(self, pooledConnection):
+        pooledConnection.close()
+        connection = pooledConnection.connect_to(MAINTENANCE_DATABASE)
+        try:
+            _execute_outside_transaction(pooledConnection, connection, [
+                'DROP DATABASE %s' % _quote(self.databaseName),
+                'CREATE DATABASE %s TEMPLATE %s' % (_quote(self.databaseName), _quote(self.snapshotDatabaseName))])
+        finally:
+            connection.close()
+        # Reopened only once the database exists again: if it could not be
+        # created, the connection is reopened by the next keyword, and
+        # fails there, rather than hiding the error of CREATE DATABASE.
+        pooledConnection.open()
+
+    def rows(self, pooledConnection, tableName):
+        return _select_rows(pooledConnection.connect_to(self.snapshotDatabaseName), tableName)
+
+    def discard(self):
+        if self._pooledConnection is None:
+            return
+        connection = self._pooledConnection.connect_to(MAINTENANCE_DATABASE)
+        try:
+            _execute_outside_transaction(self._pooledConnection, connection,
+                                         ['DROP DATABASE IF EXISTS %s' % _quote(self.snapshotDatabaseName)])
+        finally:
+            connection.close()
+        self._pooledConnection = None
+
+class TableDumpSnapshot(object):
+    """
+    A dump of the rows of some tables, pickled in chunks into a single file.
+
+    The tables are dumped parents first, ordered by the foreign keys of the
+    catalog when the database lists them. Restoring deletes the rows of the
+    tables, in the reverse order, then inserts the dumped rows, in the order
+    of the dump, all in one transaction.
+    """
+
+    def __init__(self, fileName, tables=None):
+        self.fileName = fileName
+        self.tables = tables
+
+    def take(self, pooledConnection):
+        connection = pooledConnection.connection
+        cur = connection.cursor()
+        try:
+            if self.tables is None:
+                cur.execute(pooledConnection.dialect.list_tables())
+                self.tables = [row[0] for row in cur.fetchall()]
+            self.tables = _parents_first(connection, pooledConnection.dialect, self.tables)
+            dumpFile = open(self.fileName, 'wb')
+            try:
+                for table in self.tables:
+                    cur.execute('SELECT * FROM %s' % table)
+                    pickle.dump([column[0] for column in cur.description], dumpFile, pickle.HIGHEST_PROTOCOL)
+                    while True:
+                        rows = cur.fetchmany(DUMP_CHUNK_SIZE)
+                        pickle.dump([tuple(row) for row in rows], dumpFile, pickle.HIGHEST_PROTOCOL)
+                        if not rows:
+                            break
+            finally:
+                dumpFile.close()
+        finally:
+            connection.rollback()
+
+    def restore(self, pooledConnection):
+        connection = pooledConnection.connection
+        pooledConnection.suspend_autocommit()
+        try:
+            cur = connection.cursor()
+            for table in reversed(self.tables):
+                cur.execute('DELETE FROM %s' % table)
+            dumpFile = open(self.fileName, 'rb')
+            try:
+                for table in self.tables:
+                    columns = pickle.load(dumpFile)
+                    insertStatement = 'INSERT INTO %s (%s) VALUES (%s)' % (table, ', '.join(columns),
+                        ', '.join(positional_placeholders(pooledConnection.paramstyle, len(columns))))
+                    while True:
+                        rows = pickle.load(dumpFile)
+                        if not rows:
+                            break
+                        cur.executemany(insertStatement, rows)
+            finally:
+                dumpFile.close()
+            connection.commit()
+        except:
+            connection.rollback()
+            raise
+        finally:
+            pooledConnection.restore_autocommit()
+
+    def rows(self, pooledConnection, tableName):
+        tables = [table.lower() for table in self.tables]
+        if tableName.lower() not in tables:
+            raise RuntimeError("Table '%s' is not in the snapshot, which has %s" % (tableName, ', '.join(self.tables)))
+        dumpFile = open(self.fileName, 'rb')
+        try:
+            for table in tables:
+                pickle.load(dumpFile)
+                while True:
+                    rows = pickle.load(dumpFile)
+                    if not rows:
+                        break
+                    if table == tableName.lower():
+                        for row in rows:
+                            yield row
+                if table == tableName.lower():
+                    return
+        finally:
+            dumpFile.close()
+
+    def discard(self):
+        if os.path.exists(self.fileName):
+            os.remove(self.fileName)
+
+def _parents_first(connection, dialect, tables):
+    """
+    Returns `tables` ordered so that every table comes after the tables its
+    foreign keys refer to, keeping the given order otherwise. The order is
+    kept as it is if the catalog cannot be read, and the tables of a cycle
+    of foreign keys are kept in the given order.
+    """
+    keysStatement = dialect.catalog_keys()
+    if keysStatement is None:
+        return list(tables)
+    try:
+        cur = connection.cursor()
+        cur.execute(keysStatement)
+        keyRows = cur.fetchall()
+    except Exception as e:
+        connection.rollback()
+        logger.debug("Could not read the foreign keys, keeping the order of the tables : %s" % e)
+        return list(tables)
+    parents = {}
+    for tableName, keyName, kind, columnName, referencedTable, referencedColumn in keyRows:
+        if kind == 'FOREIGN KEY' and referencedTable is not None:
+            parents.setdefault(tableName.lower(), set()).add(referencedTable.lower())
+    positions = dict((table.lower(), position) for position, table in enumerate(tables))
+    ordered = []
+    visited = set()
+
+    def visit(table):
+        if table.lower() in visited:
+            return
+        visited.add(table.lower())
+        for parent in sorted([parent for parent in parents.get(table.lower(), ()) if parent in positions], key=positions.get):
+            visit(tables[positions[parent]])
+        ordered.append(table)
+
+    for table in tables:
+        visit(table)
+    return ordered
+
+def _select_rows(connection, tableName):
+    """
+    Yields the rows of `tableName` read through `connection`, and closes the
+    connection once done.
+    """
+    try:
+        cur = connection.cursor()
+        cur.execute('SELECT * FROM %s' % tableName)
+        while True:
+            rows = cur.fetchmany(DUMP_CHUNK_SIZE)
+            if not rows:
+                break
+            for row in rows:
+                yield row
+    finally:
+        connection.close()
+
+def _execute_outside_transaction(pooledConnection, connection, sqlStatements):
+    """
+    Runs `sqlStatements` in autocommit mode, as `CREATE DATABASE` and `DROP
+    DATABASE` cannot run inside a transaction.
+    """
+    pooledConnection.dialect.set_autocommit(connection, True)
+    try:
+        cur = connection.cursor()
+        for sqlStatement in sqlStatements:
+            pooledConnection.loggingPolicy.log_sql("Executing", sqlStatement)
+            cur.execute(sqlStatement)
+    finally:
+        pooledConnection.dialect.set_autocommit(connection, pooledConnection.autocommit)
+
+def _database_name(name):
+    """
+    Returns `name` if the server accepts it as a database name, or else its
+    start followed by a hash of the whole, so that long names do not
+    collide once cut.
+    """
+    if len(name) <= MAX_DATABASE_NAME_LENGTH:
+        return name
+    digest = hashlib.md5(name.encode('utf-8')).hexdigest()[:8]
+    return '%s_%s' % (name[:MAX_DATABASE_NAME_LENGTH - len(digest) - 1], digest)
+
+def _safe_name(name):
+    return re.sub(r'\W', '_', str(name)).lower()
+
+def _quote(identifier):
+    return '"%s"' % identifier.replace('"', '""')
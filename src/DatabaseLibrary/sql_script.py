@@ -0,0 +1,162 @@
+#  Copyright (c) 2010 Franz Allan Valencia See
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import re
+
+_DOLLAR_QUOTE_PATTERN = re.compile(r'\$([A-Za-z_][A-Za-z0-9_]*)?\$')
+_DELIMITER_DIRECTIVE_PATTERN = re.compile(r'^\s*DELIMITER\s+(\S+)\s*$', re.IGNORECASE)
+_IDENTIFIER_CHARACTERS = re.compile(r'[A-Za-z0-9_]')
+
+class SqlScriptReader(object):
+    """
+    SqlScriptReader splits a SQL script into statements while reading it line
+    by line, so the script is never held in memory as a whole.
+
+    Delimiters are ignored inside single-quoted strings, double-quoted and
+    back-quoted identifiers, PostgreSQL dollar-quoted strings (`$$ ... $$` or
+    `$tag$ ... $tag$`) and `/* */` block comments. `--` comments and lines
+    starting with `#` are dropped. The delimiter can be changed with the
+    `delimiter` argument or, inside the script, with a `DELIMITER //` line; a
+    delimiter made of letters (e.g. `GO`) must stand on a line of its own.
+    """
+
+    def __init__(self, scriptFile, delimiter=';', backslashEscapes=False):
+        self._scriptFile = scriptFile
+        self._backslashEscapes = backslashEscapes
+        self._set_delimiter(delimiter)
+
+    def __iter__(self):
+        self._fragments = []
+        self._hasCode = False
+        self._closingToken = None
+        for line in self._scriptFile:
+            for statement in self._read_line(line):
+                yield statement
+        if self._hasCode:
+            yield ''.join(self._fragments).strip()
+
+    def _set_delimiter(self, delimiter):
+        self._delimiter = delimiter
+        self._lineDelimiter = _IDENTIFIER_CHARACTERS.match(delimiter[0]) is not None
+        tokens = ["'", '"', '`', '$', '/*', '--']
+        self._tokenPattern = re.compile('|'.join(
+            [re.escape(token) for token in ([] if self._lineDelimiter else [delimiter]) + tokens]))
+
+    def _read_line(self, line):
+        if self._closingToken is None:
+            stripped = line.strip()
+            if stripped.startswith('#'):
+                return
+            if not self._hasCode:
+                directive = _DELIMITER_DIRECTIVE_PATTERN.match(line)
+                if directive:
+                    self._set_delimiter(directive.group(1))
+                    return
+            if self._lineDelimiter and stripped.upper() == self._delimiter.upper():
+                for statement in self._end_statement():
+                    yield statement
+                return
+        position = 0
+        while position < len(line):
+            if self._closingToken is not None:
+                position = self._skip_quoted(line, position)
+                continue
+            match = self._tokenPattern.search(line, position)
+            if match is None:
+                self._append_code(line[position:])
+                break
+            self._append_code(line[position:match.start()])
+            token = match.group()
+            position = match.end()
+            if token == self._delimiter and not self._lineDelimiter:
+                for statement in self._end_statement():
+                    yield statement
+            elif token == '--':
+                self._fragments.append('\n')
+                break
+            elif token == '/*':
+                self._fragments.append(token)
+                self._closingToken = '*/'
+            elif token == '$':
+                dollarQuote = _DOLLAR_QUOTE_PATTERN.match(line, match.start())
+                previous = line[match.start() - 1] if match.start() > 0 else ''
+                self._append_code(token)
+                if dollarQuote and not _IDENTIFIER_CHARACTERS.match(previous):
+                    self._fragments.append(dollarQuote.group()[1:])
+                    self._closingToken = dollarQuote.group()
+                    position = dollarQuote.end()
+            else:
+                self._append_code(token)
+                self._closingToken = token
+
+    def _skip_quoted(self, line, position):
+        """
+        Appends the quoted text from `position` up to and including its
+        closing token (or up to the end of the line) and returns the position
+        right after it.
+        """
+        closingToken = self._closingToken
+        while True:
+            end = line.find(closingToken, position)
+            if end == -1:
+                self._fragments.append(line[position:])
+                return len(line)
+            end += len(closingToken)
+            if closingToken in ("'", '"', '`'):
+                if line.startswith(closingToken, end):
+                    self._fragments.append(line[position:end + 1])
+                    position = end + 1
+                    continue
+                if self._backslashEscapes and closingToken == "'" and _is_escaped(line, end - 1):
+                    self._fragments.append(line[position:end])
+                    position = end
+                    continue
+            self._fragments.append(line[position:end])
+            self._closingToken = None
+            return end
+
+    def _append_code(self, text):
+        if text:
+            self._fragments.append(text)
+            if not self._hasCode and text.strip():
+                self._hasCode = True
+
+    def _end_statement(self):
+        statement = ''.join(self._fragments).strip()
+        hasCode = self._hasCode
+        self._fragments = []
+        self._hasCode = False
+        if hasCode:
+            yield statement
+
+def batch_statements(statements, batchSize):
+    """
+    Groups `statements` into lists of at most `batchSize` statements.
+    """
+    batch = []
+    for statement in statements:
+        batch.append(statement)
+        if len(batch) >= batchSize:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _is_escaped(line, quotePosition):
+    backslashes = 0
+    position = quotePosition - 1
+    while position >= 0 and line[position] == '\\':
+        backslashes += 1
+        position -= 1
+    return backslashes % 2 == 1
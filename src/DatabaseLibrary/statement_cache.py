@@ -0,0 +1,217 @@
+#  Copyright (c) 2010 Franz Allan Valencia See
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import itertools
+import re
+from collections import OrderedDict
+from robot.api import logger
+
+_PLACEHOLDER_PATTERN = re.compile(r"""
+    (?P<quoted>'(?:[^']|'')*'|"(?:[^"]|"")*"|--[^\n]*|/\*.*?\*/|(?P<tag>\$[A-Za-z_]*\$).*?(?P=tag))
+  | (?P<cast>::)
+  | (?P<percent>%%)
+  | (?P<pyformat>%\((?P<pyformatName>[^)]+)\)s)
+  | (?P<format>%s)
+  | (?P<numeric>(?<![\w:]):(?P<number>\d+))
+  | (?P<named>(?<![\w:]):(?P<name>[A-Za-z_]\w*))
+  | (?P<qmark>\?)
+""", re.DOTALL | re.VERBOSE)
+
+_NATIVE_STYLES = {
+    'qmark': ('qmark',),
+    'numeric': ('numeric',),
+    'named': ('named', 'numeric'),
+    'format': ('format',),
+    'pyformat': ('pyformat', 'format'),
+}
+
+_PREPARABLE_PATTERN = re.compile(r'^\s*(select|insert|update|delete|values|with)\b', re.IGNORECASE)
+
+_statementNumbers = itertools.count(1)
+
+class PreparedStatement(object):
+    """
+    A statement whose placeholders have been rewritten for the driver's
+    paramstyle, and that knows how to bind the parameters given by the user.
+    """
+
+    def __init__(self, sqlStatement, paramstyle, serverSide=False):
+        self.operation, self.names, self.namedParameters = convert_placeholders(sqlStatement, paramstyle)
+        self.serverName = None
+        self.serverPrepared = False
+        if serverSide and _PREPARABLE_PATTERN.match(sqlStatement) and _find_placeholders(sqlStatement):
+            self.serverName = 'dblib_statement_%d' % next(_statementNumbers)
+            self.serverOperation = convert_placeholders(sqlStatement, 'dollar')[0]
+
+    def bind(self, parameters):
+        """
+        Returns `parameters` (a sequence or a mapping) arranged the way the
+        driver expects them for `operation`.
+        """
+        if self.namedParameters:
+            if isinstance(parameters, dict):
+                return parameters
+            names = ['p%d' % (index + 1) for index in range(len(parameters))]
+            if self.names is not None:
+                names = [name for index, name in enumerate(self.names) if name not in self.names[:index]]
+            return dict(zip(names, parameters))
+        return self.positional(parameters)
+
+    def positional(self, parameters):
+        if isinstance(parameters, dict):
+            if self.names is None:
+                raise ValueError("Statement uses positional placeholders but got named parameters %s" % parameters)
+            return [parameters[name] for name in self.names]
+        return list(parameters)
+
+    def execute(self, cur, parameters, prepare=True):
+        if prepare and self.serverName is not None:
+            if not self.serverPrepared:
+                self._prepare(cur)
+            if self.serverPrepared:
+                values = self.positional(parameters)
+                return cur.execute('EXECUTE %s (%s)' % (self.serverName, ', '.join(['%s'] * len(values))), values)
+        return cur.execute(self.operation, self.bind(parameters))
+
+    def _prepare(self, cur):
+        """
+        Prepares the statement on the server (PostgreSQL). A statement the
+        server refuses to prepare is executed normally from then on; outside
+        of autocommit mode the attempt is wrapped in a savepoint so that the
+        refusal does not abort the current transaction.
+        """
+        autocommit = getattr(cur.connection, 'autocommit', False)
+        prepareStatement = 'PREPARE %s AS %s' % (self.serverName, self.serverOperation)
+        try:
+            if autocommit:
+                cur.execute(prepareStatement)
+            else:
+                cur.execute('SAVEPOINT dblib_prepare')
+                try:
+                    cur.execute(prepareStatement)
+                except Exception:
+                    cur.execute('ROLLBACK TO SAVEPOINT dblib_prepare')
+                    raise
+                cur.execute('RELEASE SAVEPOINT dblib_prepare')
+            self.serverPrepared = True
+        except Exception as e:
+            logger.debug("Could not prepare statement on the server, executing it directly : %s" % e)
+            self.serverName = None
+
+class StatementCache(object):
+    """
+    StatementCache keeps the most recently used `maxSize` prepared
+    statements of one connection, keyed by their SQL text.
+
+    Drivers that cache parsed statements by SQL text (sqlite3, cx_Oracle)
+    reuse their plan as long as the text stays the same, which is the case
+    for parameterized statements run in a loop. For psycopg2 the statements
+    are also prepared on the server, and deallocated when evicted.
+    """
+
+    def __init__(self, paramstyle, serverSide=False, maxSize=32):
+        self.paramstyle = paramstyle
+        self.serverSide = serverSide
+        self.maxSize = maxSize
+        self._statements = OrderedDict()
+        self._deallocations = []
+
+    def execute(self, cur, sqlStatement, parameters, prepare=True):
+        """
+        Executes `sqlStatement` with `parameters` on `cur`. With `prepare`
+        false the statement is not prepared on the server, e.g. because `cur`
+        is a named cursor, which can only declare a plain statement.
+        """
+        statement = self._statements.pop(sqlStatement, None)
+        if statement is None:
+            statement = PreparedStatement(sqlStatement, self.paramstyle, self.serverSide)
+        self._statements[sqlStatement] = statement
+        while len(self._statements) > self.maxSize:
+            evicted = self._statements.popitem(last=False)[1]
+            if evicted.serverPrepared:
+                self._deallocations.append(evicted.serverName)
+        # A named cursor can run only one statement, so evicted statements
+        # are deallocated on the next plain cursor.
+        while prepare and self._deallocations:
+            cur.execute('DEALLOCATE %s' % self._deallocations.pop())
+        return statement.execute(cur, parameters, prepare)
+
+def convert_placeholders(sqlStatement, paramstyle):
+    """
+    Rewrites the placeholders of `sqlStatement` for `paramstyle`.
+
+    `sqlStatement` may use any of the DB API 2.0 paramstyles (`?`, `:1`,
+    `:name`, `%s` or `%(name)s`); placeholders inside quotes and comments are
+    left alone. Statements that already use a style the driver understands
+    are returned unchanged. `paramstyle` can also be `dollar`, PostgreSQL's
+    `$1` style used by `PREPARE`.
+
+    Returns a tuple of the rewritten statement, the parameter names in the
+    order of the placeholders (None if the placeholders are positional), and
+    whether the driver must be given a mapping rather than a sequence.
+    """
+    placeholders = _find_placeholders(sqlStatement)
+    if not placeholders:
+        return sqlStatement, None, False
+
+    sourceStyle = placeholders[0][1]
+    names = None
+    if sourceStyle in ('named', 'pyformat'):
+        names = [match.group('name') or match.group('pyformatName') for match, kind in placeholders]
+    if sourceStyle in _NATIVE_STYLES.get(paramstyle, ()):
+        return sqlStatement, names, sourceStyle in ('named', 'pyformat')
+
+    namedParameters = paramstyle == 'named' or (paramstyle == 'pyformat' and names is not None)
+    fragments = []
+    position = 0
+    for index, (match, kind) in enumerate(placeholders):
+        fragments.append(_escape_percent(sqlStatement[position:match.start()], sourceStyle, paramstyle))
+        fragments.append(_placeholder(paramstyle, index, names and names[index]))
+        position = match.end()
+    fragments.append(_escape_percent(sqlStatement[position:], sourceStyle, paramstyle))
+    return ''.join(fragments), names, namedParameters
+
+def _find_placeholders(sqlStatement):
+    """
+    Returns the placeholders of `sqlStatement` as (match, paramstyle) pairs.
+    """
+    return [(match, match.lastgroup) for match in _PLACEHOLDER_PATTERN.finditer(sqlStatement)
+            if match.lastgroup in ('qmark', 'numeric', 'named', 'format', 'pyformat')]
+
+def _placeholder(paramstyle, index, name):
+    if paramstyle == 'qmark':
+        return '?'
+    if paramstyle == 'numeric':
+        return ':%d' % (index + 1)
+    if paramstyle == 'named':
+        return ':%s' % (name or 'p%d' % (index + 1))
+    if paramstyle == 'pyformat' and name:
+        return '%%(%s)s' % name
+    if paramstyle == 'dollar':
+        return '$%d' % (index + 1)
+    return '%s'
+
+def _escape_percent(text, sourceStyle, paramstyle):
+    """
+    Percent signs are special in the `format` and `pyformat` styles, so they
+    are doubled when converting to these styles and undoubled when
+    converting from them.
+    """
+    sourceEscapes = sourceStyle in ('format', 'pyformat')
+    targetEscapes = paramstyle in ('format', 'pyformat')
+    if sourceEscapes and not targetEscapes:
+        return text.replace('%%', '%')
+    if targetEscapes and not sourceEscapes:
+        return text.replace('%', '%%')
+    return text
@@ -0,0 +1,212 @@
+#  Copyright (c) 2010 Franz Allan Valencia See
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+from robot.api import logger
+from DatabaseLibrary.utils import to_boolean
+
+TRANSACTION_SAVEPOINT = 'dblib_transaction'
+
+class Transaction(object):
+    """
+    Transaction controls the transactions of the library's connections.
+
+    By default every keyword ends its own transaction: the keywords that
+    change data commit, and the others roll back. While a transaction is
+    held, by `Begin Transaction` or `Begin Isolated Test`, the keywords
+    neither commit nor roll back, so all their work stays in one transaction
+    that is ended explicitly.
+
+    Transactions and isolated tests can be nested in each other, as long as
+    the inner one is ended first: ending the outer one while the inner one
+    is still open fails.
+    """
+
+    def __init__(self, isolateTests=False):
+        self._isolateTests = to_boolean(isolateTests)
+        self._isolatedByListener = []
+
+    def begin_transaction(self, alias=None):
+        """
+        Starts a transaction on the connection of `alias` (or the current
+        connection) that lasts until `Commit Transaction` or `Rollback
+        Transaction`.
+
+        Until then, keywords such as `Execute Sql String` do not commit
+        their changes, and no keyword rolls back, which saves a round-trip
+        (and on many databases a disk sync) per keyword. On PostgreSQL, a
+        failed statement makes the database refuse further statements until
+        the transaction is rolled back.
+
+        For example:
+        | Begin Transaction |
+        | :FOR | ${id} | IN RANGE | 500 |
+        | | Execute Sql String | insert into person (id) values (${id}) |
+        | Commit Transaction |
+        """
+        pooledConnection = self._get_pooled_connection(alias)
+        if pooledConnection.inTransaction:
+            raise RuntimeError("A transaction is already open on '%s'" % pooledConnection.alias)
+        connection = self._get_connection(alias, ownTransaction=True)
+        if not pooledConnection.holdsTransaction:
+            connection.rollback()
+            pooledConnection.suspend_autocommit()
+        cur = connection.cursor()
+        cur.execute(pooledConnection.dialect.savepoint(TRANSACTION_SAVEPOINT))
+        pooledConnection.inTransaction = True
+        pooledConnection.transactionIsolationDepth = pooledConnection.isolationDepth
+        logger.info("Began transaction on '%s'" % pooledConnection.alias)
+
+    def commit_transaction(self, alias=None):
+        """
+        Commits the transaction started by `Begin Transaction` on the
+        connection of `alias` (or the current connection). Inside an isolated
+        test, the changes are kept until the test is rolled back.
+        """
+        pooledConnection = self._get_transaction(alias)
+        pooledConnection.inTransaction = False
+        pooledConnection.transactionIsolationDepth = None
+        connection = self._get_connection(alias, ownTransaction=True)
+        if pooledConnection.holdsTransaction:
+            self._release_savepoint(connection, pooledConnection.dialect, TRANSACTION_SAVEPOINT)
+        else:
+            connection.commit()
+            pooledConnection.restore_autocommit()
+        logger.info("Committed transaction on '%s'" % pooledConnection.alias)
+
+    def rollback_transaction(self, alias=None):
+        """
+        Undoes the changes made since `Begin Transaction` on the connection
+        of `alias` (or the current connection), and ends the transaction.
+        """
+        pooledConnection = self._get_transaction(alias)
+        self._invalidate_query_cache(pooledConnection.alias)
+        self._invalidate_schema_catalog(pooledConnection.alias)
+        pooledConnection.inTransaction = False
+        pooledConnection.transactionIsolationDepth = None
+        connection = self._get_connection(alias, ownTransaction=True)
+        if pooledConnection.holdsTransaction:
+            self._rollback_to_savepoint(connection, pooledConnection.dialect, TRANSACTION_SAVEPOINT)
+        else:
+            connection.rollback()
+            pooledConnection.restore_autocommit()
+        logger.info("Rolled back transaction on '%s'" % pooledConnection.alias)
+
+    def begin_isolated_test(self, alias=None):
+        """
+        Starts recording the changes made on the connection of `alias` (or
+        the current connection) so that `Rollback Isolated Test` can undo all
+        of them at once, instead of deleting and reinserting fixture data.
+
+        Until then, as in a `Begin Transaction` block, `Execute Sql String`
+        and the other keywords do not commit their changes, so they are only
+        visible on that connection: not to the application under test nor to
+        the connections of `Execute Queries In Parallel`. Isolated tests can
+        be nested, each level being a savepoint.
+
+        Statements that commit implicitly (e.g. DDL on MySQL or Oracle)
+        cannot be undone. On PostgreSQL, a failed statement makes the
+        database refuse further statements until the test is rolled back;
+        the statements the library rewrites to run on the server (counts,
+        existence checks and probes) are run in a savepoint of their own, so
+        that if the database refuses one the test goes on.
+
+        Tests are isolated automatically when the library is imported with
+        `isolateTests=True`.
+
+        For example:
+        | Begin Isolated Test |
+        | Execute Sql String | delete from person |
+        | Row Count Is 0 | select * from person |
+        | Rollback Isolated Test |
+        """
+        pooledConnection = self._get_pooled_connection(alias)
+        connection = self._get_connection(alias, ownTransaction=True)
+        if not pooledConnection.holdsTransaction:
+            connection.rollback()
+            pooledConnection.suspend_autocommit()
+        cur = connection.cursor()
+        cur.execute(pooledConnection.dialect.savepoint(_savepoint_name(pooledConnection.isolationDepth + 1)))
+        pooledConnection.isolationDepth += 1
+        logger.info("Began isolated test on '%s' (level %d)" % (pooledConnection.alias, pooledConnection.isolationDepth))
+
+    def rollback_isolated_test(self, alias=None):
+        """
+        Undoes every change made on the connection of `alias` (or the current
+        connection) since the matching `Begin Isolated Test`.
+
+        For example:
+        | Rollback Isolated Test |
+        | Rollback Isolated Test | reporting |
+        """
+        pooledConnection = self._get_pooled_connection(alias)
+        if pooledConnection.isolationDepth == 0:
+            raise RuntimeError("No isolated test to roll back on '%s'" % pooledConnection.alias)
+        if pooledConnection.inTransaction and pooledConnection.transactionIsolationDepth == pooledConnection.isolationDepth:
+            raise RuntimeError("A transaction begun inside isolated test level %d is still open on '%s', "
+                               "commit or roll it back first" % (pooledConnection.isolationDepth, pooledConnection.alias))
+        self._invalidate_query_cache(pooledConnection.alias)
+        self._invalidate_schema_catalog(pooledConnection.alias)
+        dialect = pooledConnection.dialect
+        savepoint = _savepoint_name(pooledConnection.isolationDepth)
+        pooledConnection.isolationDepth -= 1
+        connection = self._get_connection(alias, ownTransaction=True)
+        if pooledConnection.holdsTransaction:
+            self._rollback_to_savepoint(connection, dialect, savepoint)
+        else:
+            connection.rollback()
+            pooledConnection.restore_autocommit()
+        logger.info("Rolled back isolated test on '%s'" % pooledConnection.alias)
+
+    def _get_transaction(self, alias):
+        pooledConnection = self._get_pooled_connection(alias)
+        if not pooledConnection.inTransaction:
+            raise RuntimeError("No transaction is open on '%s', use 'Begin Transaction' first" % pooledConnection.alias)
+        if pooledConnection.isolationDepth > pooledConnection.transactionIsolationDepth:
+            raise RuntimeError("Isolated test level %d begun inside the transaction is still open on '%s', "
+                               "roll it back first" % (pooledConnection.isolationDepth, pooledConnection.alias))
+        return pooledConnection
+
+    def _rollback_to_savepoint(self, connection, dialect, savepoint):
+        cur = connection.cursor()
+        cur.execute(dialect.rollback_to_savepoint(savepoint))
+        self._release_savepoint(connection, dialect, savepoint)
+
+    def _release_savepoint(self, connection, dialect, savepoint):
+        releaseStatement = dialect.release_savepoint(savepoint)
+        if releaseStatement is not None:
+            connection.cursor().execute(releaseStatement)
+
+    def _start_test(self):
+        """
+        Isolates the test about to start on the current connection, if the
+        library was imported with `isolateTests`.
+        """
+        if self._isolateTests and self._currentAlias is not None:
+            self.begin_isolated_test(self._currentAlias)
+            self._isolatedByListener.append(self._currentAlias)
+
+    def _end_test(self):
+        while self._isolatedByListener:
+            alias = self._isolatedByListener.pop()
+            try:
+                pooledConnection = self._get_pooled_connection(alias)
+                if pooledConnection.inTransaction and pooledConnection.transactionIsolationDepth >= pooledConnection.isolationDepth:
+                    logger.warn("Rolling back the transaction left open by the test on '%s'" % alias)
+                    self.rollback_transaction(alias)
+                self.rollback_isolated_test(alias)
+            except Exception as e:
+                logger.warn("Could not roll back the isolated test on '%s' : %s" % (alias, e))
+
+def _savepoint_name(depth):
+    return 'dblib_isolation_%d' % depth
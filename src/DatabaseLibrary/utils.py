@@ -0,0 +1,31 @@
+#  Copyright (c) 2010 Franz Allan Valencia See
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+def to_seconds(value):
+    """
+    Converts a keyword or import argument to a number of seconds, where None
+    (or the string 'None') means no limit.
+    """
+    if value is None or str(value).upper() == 'NONE':
+        return None
+    return float(value)
+
+def to_boolean(value):
+    """
+    Converts a keyword or import argument to a boolean, where the strings
+    'False', 'No', 'None', '0' and '' (in any case) are false.
+    """
+    if isinstance(value, str):
+        return value.strip().upper() not in ('FALSE', 'NO', '0', '', 'NONE')
+    return bool(value)
@@ -0,0 +1,198 @@
+#  Copyright (c) 2010 Franz Allan Valencia See
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import random
+import time
+from robot.api import logger
+from robot.utils import secs_to_timestr, timestr_to_secs
+
+DEFAULT_TIMEOUT = '10 seconds'
+INITIAL_POLL_INTERVAL = 0.05
+MAX_POLL_INTERVAL = 1.0
+BACKOFF_FACTOR = 2
+JITTER = 0.2
+
+class Wait(object):
+    """
+    Wait polls the database until it reaches an expected state, e.g. after
+    handing work over to an asynchronous worker.
+
+    The keywords poll with a cheap probe (`SELECT EXISTS (...)` or `SELECT
+    COUNT(*) FROM (...)` when the dialect allows it) through one cursor,
+    ending the transaction between probes so that each one sees the latest
+    committed data. They wait between probes starting at 50 milliseconds
+    and doubling up to one second, with some random jitter so that parallel
+    runs do not poll in step, and only log the outcome.
+
+    A probe that fails (e.g. because the table is not created yet) counts
+    as the state not being reached yet; the keywords fail with the last
+    error if the state is still not reached after the timeout.
+
+    On PostgreSQL with psycopg2, a `channel` can be given: the keywords
+    `LISTEN` to it and probe again as soon as a notification arrives (e.g.
+    sent with `NOTIFY` by a trigger or the worker), instead of sleeping.
+    Inside a transaction or an isolated test, where notifications are only
+    delivered once the transaction ends, the channel is ignored.
+    """
+
+    def wait_until_exists_in_database(self, selectStatement, timeout=DEFAULT_TIMEOUT, alias=None, parameters=None, channel=None):
+        """
+        Waits until `selectStatement` returns at least one row, and fails if
+        it still returns none after `timeout` (a number of seconds or a
+        Robot Framework time string such as `1 minute`).
+
+        For example:
+        | Click Button | Submit order |
+        | Wait Until Exists In Database | select id from orders where status = 'processed' | 30 s |
+        | Wait Until Exists In Database | select id from orders where status = 'processed' | 30 s | channel=order_events |
+        """
+        dialect = self._get_dialect(alias)
+        probe = _Probe(selectStatement, lambda cur: cur.fetchone() is not None,
+                       dialect.wrap_exists(selectStatement), lambda cur: bool(cur.fetchone()[0]))
+        found, probes, elapsed = self._wait_until(probe, lambda exists: exists, timeout, alias, parameters, channel)
+        if not found:
+            raise AssertionError("Expected at least one row from '%s' but got 0 rows after %s%s"
+                                 % (self._get_logging_policy(alias).sql(selectStatement), secs_to_timestr(elapsed),
+                                    _last_error(probe)))
+        logger.info("Found rows after %s probes in %.3f s" % (probes, elapsed))
+
+    def wait_until_row_count_is(self, selectStatement, numRows, timeout=DEFAULT_TIMEOUT, alias=None, parameters=None, channel=None):
+        """
+        Waits until `selectStatement` returns exactly `numRows` rows, and
+        fails if it does not after `timeout`.
+
+        For example:
+        | Wait Until Row Count Is | select id from orders where status = 'processed' | 100 | 2 minutes |
+        """
+        numRows = int(numRows)
+        dialect = self._get_dialect(alias)
+        probe = _Probe(selectStatement, _count_fetched_rows,
+                       dialect.wrap_count(selectStatement), lambda cur: int(cur.fetchone()[0]))
+        found, probes, elapsed = self._wait_until(probe, lambda rowCount: rowCount == numRows, timeout, alias, parameters, channel)
+        if not found:
+            raise AssertionError("Expected %s rows to be returned from '%s' but got %s after %s%s"
+                                 % (numRows, self._get_logging_policy(alias).sql(selectStatement), probe.lastValue,
+                                    secs_to_timestr(elapsed), _last_error(probe)))
+        logger.info("Row count reached %s after %s probes in %.3f s" % (numRows, probes, elapsed))
+
+    def _wait_until(self, probe, accept, timeout, alias, parameters, channel):
+        """
+        Runs `probe` until `accept` returns true for its value or `timeout`
+        expires, and returns whether it was accepted, the number of probes
+        and the elapsed seconds.
+        """
+        timeout = timestr_to_secs(timeout)
+        pooledConnection = self._get_pooled_connection(alias)
+        dialect = pooledConnection.dialect
+        if pooledConnection.loggingPolicy.is_logged('INFO'):
+            logger.info("Waiting up to %s for : %s" % (secs_to_timestr(timeout), pooledConnection.loggingPolicy.sql(probe.selectStatement)))
+        startTime = time.time()
+        deadline = startTime + timeout
+        interval = INITIAL_POLL_INTERVAL
+        probes = 0
+        connection = self._get_connection(alias)
+        listening = channel is not None and dialect.listen(channel) is not None
+        if listening and pooledConnection.holdsTransaction:
+            logger.info("Polling instead of listening to '%s', as notifications are only delivered once the "
+                        "transaction held on '%s' ends" % (channel, pooledConnection.alias))
+            listening = False
+        try:
+            cur = connection.cursor()
+            if listening:
+                cur.execute(dialect.listen(channel))
+                connection.commit()
+            while True:
+                accepted = False
+                try:
+                    accepted = accept(probe.run(cur, connection, pooledConnection, parameters,
+                                                lambda attempt: self._attempt_on_server(attempt, alias)))
+                    probe.lastError = None
+                except Exception as e:
+                    logger.debug("Probe failed, probing again until the timeout : %s" % e)
+                    probe.lastError = e
+                finally:
+                    connection.rollback()
+                probes += 1
+                if accepted:
+                    return True, probes, time.time() - startTime
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False, probes, time.time() - startTime
+                delay = min(interval * random.uniform(1 - JITTER, 1 + JITTER), remaining)
+                if listening:
+                    dialect.wait_for_notification(connection, delay)
+                else:
+                    time.sleep(delay)
+                interval = min(interval * BACKOFF_FACTOR, MAX_POLL_INTERVAL)
+        finally:
+            if listening:
+                connection.cursor().execute(dialect.unlisten(channel))
+                connection.commit()
+
+class _Probe(object):
+    """
+    Runs `probeStatement` and reads its value with `readProbe`, or, if there
+    is no probe statement or the database refuses it, runs `selectStatement`
+    and reads it with `read` instead. The probe statement is dropped for
+    the next runs only if `selectStatement` succeeds where it failed, as
+    both fail alike while e.g. the table does not exist yet. Both are run
+    through `attemptOnServer`, which keeps a failure from aborting a
+    transaction held by `Begin Transaction` or an isolated test.
+    """
+
+    def __init__(self, selectStatement, read, probeStatement=None, readProbe=None):
+        self.selectStatement = selectStatement
+        self.read = read
+        self.probeStatement = probeStatement
+        self.readProbe = readProbe
+        self.lastValue = None
+        self.lastError = None
+
+    def run(self, cur, connection, pooledConnection, parameters, attemptOnServer):
+        probeError = None
+        if self.probeStatement is not None:
+            try:
+                self.lastValue = attemptOnServer(
+                    lambda: self.readProbe(_execute(cur, pooledConnection, self.probeStatement, parameters)))
+                return self.lastValue
+            except Exception as e:
+                probeError = e
+                connection.rollback()
+        self.lastValue = attemptOnServer(lambda: self.read(_execute(cur, pooledConnection, self.selectStatement, parameters)))
+        if probeError is not None:
+            logger.debug("Probing on the server failed where fetching rows did not, fetching rows from now on : %s" % probeError)
+            self.probeStatement = None
+        return self.lastValue
+
+def _execute(cur, pooledConnection, sqlStatement, parameters):
+    """
+    Executes `sqlStatement` through the statement cache of the connection,
+    so that it is prepared once for all the probes.
+    """
+    if parameters:
+        pooledConnection.statementCache.execute(cur, sqlStatement, parameters)
+    else:
+        cur.execute(sqlStatement)
+    return cur
+
+def _last_error(probe):
+    return '' if probe.lastError is None else ', the last probe failed : %s' % probe.lastError
+
+def _count_fetched_rows(cur):
+    rowCount = 0
+    while True:
+        batch = cur.fetchmany(1000)
+        if not batch:
+            return rowCount
+        rowCount += len(batch)
@@ -0,0 +1,96 @@
+#  Copyright (c) 2010 Franz Allan Valencia See
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""
+Fixtures of the DatabaseLibrary tests, which run the library against
+sqlite3 databases created in a temporary directory.
+
+Run them from the root of the repository with `python -m pytest tests`.
+"""
+
+import os
+import sqlite3
+import sys
+
+import pytest
+import robot
+from robot.api import ExecutionResult
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from DatabaseLibrary import DatabaseLibrary
+
+PERSON_TABLE = 'CREATE TABLE person (id INTEGER PRIMARY KEY, first_name VARCHAR(30), last_name VARCHAR(30))'
+PERSON_ROWS = [(1, 'Franz Allan', 'See'), (2, 'Jerry', 'Schneider')]
+
+@pytest.fixture
+def database(tmp_path):
+    """
+    The path of a sqlite3 database file holding the `person` table.
+    """
+    databasePath = str(tmp_path / 'test.db')
+    connection = sqlite3.connect(databasePath)
+    try:
+        connection.execute(PERSON_TABLE)
+        connection.executemany('INSERT INTO person VALUES (?, ?, ?)', PERSON_ROWS)
+        connection.commit()
+    finally:
+        connection.close()
+    return databasePath
+
+@pytest.fixture
+def library(database):
+    """
+    A DatabaseLibrary connected to `database` under the `default` alias,
+    disconnected after the test.
+    """
+    library = DatabaseLibrary(slowQueryThreshold=None)
+    connect(library, database)
+    yield library
+    library.disconnect_from_all_databases()
+
+def connect(library, databasePath, alias='default', **options):
+    library.connect_to_database_using_custom_params('sqlite3', 'database=%r' % databasePath, alias=alias, **options)
+
+def executed_statements(library):
+    """
+    Returns the normalised statements run so far, from the statistics.
+    """
+    return [entry['statement'] for entry in library.get_database_statistics()]
+
+def run_suite(directory, suiteText, **variables):
+    """
+    Runs the Robot Framework test suite `suiteText` (without its settings
+    section, which imports DatabaseLibrary from the sources) in `directory`
+    and returns its test results by name.
+    """
+    suitePath = os.path.join(str(directory), 'suite.robot')
+    with open(suitePath, 'w') as suiteFile:
+        suiteFile.write('*** Settings ***\nLibrary    DatabaseLibrary\n\n' + suiteText)
+    outputPath = os.path.join(str(directory), 'output.xml')
+    robot.run(suitePath, output=outputPath, log=None, report=None, stdout=open(os.devnull, 'w'),
+              pythonpath=[os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')],
+              variable=['%s:%s' % item for item in variables.items()])
+    result = ExecutionResult(outputPath)
+    tests = {}
+    result.suite.visit(_TestCollector(tests))
+    return tests
+
+class _TestCollector(robot.api.SuiteVisitor):
+
+    def __init__(self, tests):
+        self.tests = tests
+
+    def visit_test(self, test):
+        self.tests[test.name] = test
@@ -0,0 +1,53 @@
+#  Copyright (c) 2010 Franz Allan Valencia See
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import json
+import os
+import subprocess
+import sys
+
+BENCHMARK = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'benchmarks', 'benchmark.py')
+
+sys.path.insert(0, os.path.dirname(BENCHMARK))
+
+import benchmark
+
+def run_benchmark(*arguments):
+    return subprocess.run([sys.executable, BENCHMARK, '--scales', '200', '--duration', '0', '--min-calls', '2',
+                           '--script-statements', '10'] + list(arguments), stdout=subprocess.PIPE, universal_newlines=True)
+
+def test_every_benchmark_runs_and_is_compared_with_the_baseline(tmp_path):
+    resultsPath = str(tmp_path / 'results.json')
+    process = run_benchmark('--output', resultsPath)
+    assert process.returncode == 0, process.stdout
+    report = json.load(open(resultsPath))
+    names = [name for name, call in benchmark.benchmark_calls(None, 200, None, None, 1)]
+    assert [result['benchmark'] for result in report['results']] == names
+    assert all(result['calls'] >= 2 and result['scale'] == 200 for result in report['results'])
+    process = run_benchmark('--baseline', resultsPath, '--threshold', '1000')
+    assert process.returncode == 0, process.stdout
+    assert 'REGRESSION' not in process.stdout
+
+def test_throughput_losses_beyond_the_threshold_are_regressions():
+    baseline = [{'scale': 10, 'benchmark': 'query', 'throughput': 100.0},
+                {'scale': 10, 'benchmark': 'row_count', 'throughput': 100.0}]
+    assert not benchmark.compare(baseline, [{'scale': 10, 'benchmark': 'query', 'throughput': 85.0}], 0.2)
+    assert benchmark.compare(baseline, [{'scale': 10, 'benchmark': 'row_count', 'throughput': 75.0}], 0.2)
+    assert not benchmark.compare(baseline, [{'scale': 20, 'benchmark': 'query', 'throughput': 1.0}], 0.2)
+
+def test_percentiles_of_sorted_latencies():
+    latencies = [0.001 * value for value in range(1, 101)]
+    assert benchmark.percentile(latencies, 50) == latencies[50]
+    assert benchmark.percentile(latencies, 99) == latencies[99]
+    assert benchmark.percentile([0.5], 95) == 0.5
@@ -0,0 +1,135 @@
+#  Copyright (c) 2010 Franz Allan Valencia See
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import datetime
+import decimal
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import time
+
+import pytest
+
+from DatabaseLibrary import broker
+from DatabaseLibrary.broker import BrokerClient, BrokerError, decode, encode
+
+SOURCE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+pytestmark = pytest.mark.skipif(not broker.unix_sockets_available(), reason="The broker needs Unix domain sockets")
+
+# Each process inserts its rows in one transaction through the broker, and
+# prints the number of rows it then reads.
+WORKER = """
+import sqlite3, sys
+from DatabaseLibrary.broker import BrokerClient
+socketPath, databasePath, worker = sys.argv[1], sys.argv[2], int(sys.argv[3])
+connection = BrokerClient(socketPath, 2, 1).connector(sqlite3)(databasePath, timeout=30)
+cur = connection.cursor()
+cur.executemany('INSERT INTO item VALUES (?, ?)', [(worker * 100 + index, 'worker %d' % worker) for index in range(20)])
+connection.commit()
+cur.execute('SELECT COUNT(*) FROM item WHERE name = ?', ('worker %d' % worker,))
+print(cur.fetchone()[0])
+connection.close()
+"""
+
+@pytest.mark.parametrize('value', [
+    None, True, False, 0, -1, (1 << 63) - 1, -(1 << 63), 1 << 70, -(1 << 70), 1.5, float('inf'),
+    '', u'caf\u00e9 \u20ac', b'', b'\x00\xff', decimal.Decimal('1.10'),
+    datetime.datetime(2010, 1, 2, 3, 4, 5, 6), datetime.date(2010, 1, 2), datetime.time(3, 4, 5),
+    [], [1, 'a', None], (), (1, (2, [3])), {}, {'key': [1, 2], 3: None},
+])
+def test_values_survive_an_encode_decode_round_trip(value):
+    decoded = decode(encode(value))
+    assert decoded == value
+    assert type(decoded) is type(value)
+
+def test_byte_like_values_are_decoded_as_bytes():
+    assert decode(encode(bytearray(b'ab'))) == b'ab'
+    assert decode(encode(memoryview(b'ab'))) == b'ab'
+
+def test_rows_are_decoded_as_a_list_of_tuples():
+    rows = [(1, 'a', None), (2, 'b', decimal.Decimal('3.5'))]
+    assert decode(encode(broker._Rows(rows))) == rows
+    assert decode(encode(broker._Rows([]))) == []
+    assert decode(encode(broker._Rows([(), ()]))) == [(), ()]
+
+def test_messages_are_sent_whole_over_a_socket():
+    left, right = socket.socketpair()
+    try:
+        message = ('execute', 1, 'SELECT ?', ['x' * 100000], False, 500)
+        broker._send(left, message)
+        assert broker._receive(right) == message
+        left.close()
+        assert broker._receive(right) is None
+    finally:
+        left.close()
+        right.close()
+
+def test_a_failing_broker_is_reported_with_the_end_of_its_log(tmp_path):
+    # The broker cannot replace a directory with its socket, and exits with an error.
+    socketPath = str(tmp_path / 'broker.sock')
+    os.mkdir(socketPath)
+    start = time.time()
+    with pytest.raises(BrokerError) as error:
+        BrokerClient(socketPath, 2, 1).connector(sqlite3)(str(tmp_path / 'test.db'))
+    assert time.time() - start < broker.STARTUP_TIMEOUT
+    assert 'exited with status 1' in str(error.value)
+    assert 'Traceback' in str(error.value)
+
+def test_importing_the_library_does_not_need_unix_sockets():
+    # Without fcntl, as on Windows, the broker is only needed once asked for.
+    script = ("import sys\n"
+              "sys.modules['fcntl'] = None\n"
+              "from DatabaseLibrary import DatabaseLibrary\n"
+              "DatabaseLibrary()\n"
+              "assert 'DatabaseLibrary.broker' not in sys.modules\n"
+              "try:\n"
+              "    DatabaseLibrary(brokerSocket='broker.sock')\n"
+              "except RuntimeError as e:\n"
+              "    print(e)\n")
+    output = subprocess.check_output([sys.executable, '-c', script], env=_environment(), universal_newlines=True)
+    assert 'not available on this platform' in output
+
+def test_six_processes_share_the_database_connections_of_one_broker(tmp_path):
+    socketPath = str(tmp_path / 'broker.sock')
+    databasePath = str(tmp_path / 'test.db')
+    connection = sqlite3.connect(databasePath)
+    connection.execute('CREATE TABLE item (id INTEGER PRIMARY KEY, name VARCHAR(30))')
+    connection.close()
+    workers = [subprocess.Popen([sys.executable, '-c', WORKER, socketPath, databasePath, str(worker)],
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=_environment(),
+                                universal_newlines=True)
+               for worker in range(6)]
+    for worker in workers:
+        output, errors = worker.communicate(timeout=60)
+        assert worker.returncode == 0, errors
+        assert output.strip() == '20'
+    connection = sqlite3.connect(databasePath)
+    try:
+        assert connection.execute('SELECT COUNT(*) FROM item').fetchone()[0] == 120
+    finally:
+        connection.close()
+    # The broker stops once idle, and removes its socket.
+    deadline = time.time() + 10
+    while os.path.exists(socketPath) and time.time() < deadline:
+        time.sleep(0.1)
+    assert not os.path.exists(socketPath)
+
+def _environment():
+    environment = dict(os.environ)
+    environment['PYTHONPATH'] = os.pathsep.join([SOURCE_DIRECTORY] + [path for path in
+                                                 [environment.get('PYTHONPATH')] if path])
+    return environment
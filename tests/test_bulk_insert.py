@@ -0,0 +1,94 @@
+#  Copyright (c) 2010 Franz Allan Valencia See
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import json
+import sqlite3
+
+import pytest
+
+from DatabaseLibrary.bulk_insert import _copy_statement
+
+def people(library):
+    return library.query('select id, first_name, last_name from person where id > 2 order by id')
+
+def test_insert_rows_of_lists(library):
+    assert library.insert_rows('person', [[3, 'Ann', 'Lee'], (4, 'Bob', 'Ray')], 'id, first_name, last_name') == 2
+    assert people(library) == [(3, 'Ann', 'Lee'), (4, 'Bob', 'Ray')]
+
+def test_insert_rows_of_dictionaries_takes_the_columns_of_the_first_one(library):
+    library.insert_rows('person', [{'id': 3, 'last_name': 'Lee'}, {'id': 4, 'first_name': 'Bob', 'last_name': 'Ray'}])
+    assert people(library) == [(3, None, 'Lee'), (4, None, 'Ray')]
+
+def test_insert_rows_in_chunks(library):
+    assert library.insert_rows('person', [(id, 'x', 'y') for id in range(3, 103)], chunkSize=7) == 100
+    assert library.row_count('select * from person') == 102
+
+def test_insert_nothing(library):
+    assert library.insert_rows('person', []) == 0
+
+def test_failed_insert_loads_no_rows(library):
+    with pytest.raises(sqlite3.IntegrityError):
+        library.insert_rows('person', [(3, 'a', 'b'), (4, 'c', 'd'), (1, 'duplicate', 'id')], chunkSize=2)
+    assert people(library) == []
+
+def test_load_csv_with_header(library, tmp_path):
+    csvPath = tmp_path / 'person.csv'
+    csvPath.write_text('id,last_name,first_name\n3,Lee,Ann\n\n4,"Ray, Jr",Bob\n')
+    assert library.load_csv_into_table('person', str(csvPath)) == 2
+    assert people(library) == [(3, 'Ann', 'Lee'), (4, 'Bob', 'Ray, Jr')]
+
+def test_load_csv_with_columns_and_delimiter(library, tmp_path):
+    csvPath = tmp_path / 'person.txt'
+    csvPath.write_text('3;Ann;Lee\n4;Bob;Ray\n')
+    assert library.load_csv_into_table('person', str(csvPath), 'id,first_name,last_name', delimiter=';') == 2
+    assert people(library) == [(3, 'Ann', 'Lee'), (4, 'Bob', 'Ray')]
+
+def test_load_csv_loads_quoted_and_unquoted_empty_values_as_null(library, tmp_path):
+    csvPath = tmp_path / 'person.csv'
+    csvPath.write_text('id,first_name,last_name\n3,,Lee\n4,"",Ray\n')
+    library.load_csv_into_table('person', str(csvPath))
+    assert people(library) == [(3, None, 'Lee'), (4, None, 'Ray')]
+
+def test_copy_forces_quoted_empty_values_to_null():
+    assert _copy_statement('person', ['id', 'first_name'], ';') == \
+        "COPY person (id, first_name) FROM STDIN WITH (FORMAT csv, DELIMITER ';', FORCE_NULL (id, first_name))"
+
+def test_copy_skips_the_header_and_escapes_the_delimiter():
+    assert _copy_statement('person', ['id'], "'", True) == \
+        "COPY person (id) FROM STDIN WITH (FORMAT csv, DELIMITER '''', HEADER true, FORCE_NULL (id))"
+
+def test_load_csv_keeps_the_line_breaks_of_quoted_values(library, tmp_path):
+    csvPath = tmp_path / 'person.csv'
+    csvPath.write_bytes(b'id,first_name,last_name\r\n3,"Ann\r\nMarie",Lee\r\n4,Bob,"Ray\nJr"\r\n')
+    assert library.load_csv_into_table('person', str(csvPath)) == 2
+    assert people(library) == [(3, 'Ann\r\nMarie', 'Lee'), (4, 'Bob', 'Ray\nJr')]
+
+def test_load_csv_of_an_empty_file_without_columns_fails(library, tmp_path):
+    csvPath = tmp_path / 'person.csv'
+    csvPath.write_text('')
+    with pytest.raises(ValueError, match="has no header line"):
+        library.load_csv_into_table('person', str(csvPath))
+
+def test_load_csv_rejects_delimiters_of_several_characters(library, tmp_path):
+    csvPath = tmp_path / 'person.csv'
+    csvPath.write_text('3;;Ann;;Lee\n')
+    with pytest.raises(ValueError, match="The delimiter must be a single character, got ';;'"):
+        library.load_csv_into_table('person', str(csvPath), 'id,first_name,last_name', delimiter=';;')
+
+def test_load_jsonl(library, tmp_path):
+    jsonlPath = tmp_path / 'person.jsonl'
+    jsonlPath.write_text('\n'.join([json.dumps({'id': 3, 'first_name': 'Ann', 'last_name': 'Lee'}), '',
+                                    json.dumps({'id': 4, 'last_name': 'Ray', 'first_name': 'Bob'})]))
+    assert library.load_jsonl_into_table('person', str(jsonlPath)) == 2
+    assert people(library) == [(3, 'Ann', 'Lee'), (4, 'Bob', 'Ray')]
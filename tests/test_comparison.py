@@ -0,0 +1,69 @@
+#  Copyright (c) 2010 Franz Allan Valencia See
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+from decimal import Decimal
+
+import pytest
+
+from conftest import connect
+from DatabaseLibrary import comparison
+from DatabaseLibrary.comparison import _compare_row_streams, _canonical_value
+
+def test_result_sets_are_equal_in_any_order(library):
+    library.execute_sql_string('create table person_copy as select * from person order by id desc')
+    library.result_sets_should_be_equal('select * from person', 'select * from person_copy')
+
+def test_duplicates_count(library):
+    with pytest.raises(AssertionError, match=r"(?s)Only in the second result set \(1 rows\):\n  \(1,\)"):
+        library.result_sets_should_be_equal('select 1', 'select 1 union all select 1')
+
+def test_differing_rows_are_reported(library):
+    with pytest.raises(AssertionError) as error:
+        library.result_sets_should_be_equal('select * from person', "select 1, 'Franz Allan', 'See' union all select 3, 'John', 'Doe'")
+    assert str(error.value).splitlines()[1:] == [
+        "Only in the first result set (1 rows):", "  (2, 'Jerry', 'Schneider')",
+        "Only in the second result set (1 rows):", "  (3, 'John', 'Doe')"]
+
+def test_result_sets_of_two_connections_are_compared(library, database, tmp_path):
+    otherPath = str(tmp_path / 'other.db')
+    connect(library, otherPath, alias='other')
+    library.execute_sql_string('create table person (id integer, first_name varchar(30), last_name varchar(30))', alias='other')
+    library.execute_sql_string("insert into person values (2, 'Jerry', 'Schneider'), (1.0, 'Franz Allan', 'See')", alias='other')
+    library.result_sets_should_be_equal('select * from person', 'select * from person', alias='default', secondAlias='other')
+
+def test_numbers_are_compared_by_value():
+    assert _canonical_value(1) == _canonical_value(1.0) == _canonical_value(Decimal('1.00')) == _canonical_value(True)
+    assert _canonical_value(0.5) == _canonical_value(Decimal('0.50'))
+    assert _canonical_value(bytearray(b'ab')) == b'ab'
+
+def test_large_differences_are_diffed_in_bounded_groups(monkeypatch):
+    monkeypatch.setattr(comparison, 'MAX_DIFFED_ROWS', 50)
+    first = [(value,) for value in range(5000)]
+    second = [(value,) for value in range(5000) if value not in (17, 4242)] + [(-1,)]
+    differences = _compare_row_streams(lambda: iter(first), lambda: iter(second))
+    assert differences.differingBuckets == 3
+    assert sorted(differences.onlyInFirst) == [(17,), (4242,)]
+    assert differences.onlyInSecond == [(-1,)]
+    assert differences.complete
+
+def test_table_should_match_snapshot(library):
+    library.snapshot_database('before')
+    library.snapshot_database('dump', tables='person')
+    library.table_should_match_snapshot('person', 'before')
+    library.table_should_match_snapshot('person', 'dump')
+    library.execute_sql_string("update person set last_name = 'Changed' where id = 2")
+    for snapshotName in ('before', 'dump'):
+        with pytest.raises(AssertionError, match=r"(?s)Only in table 'person' \(1 rows\):\n  \(2, 'Jerry', 'Changed'\)"
+                                                 r".*Only in snapshot '%s' \(1 rows\):\n  \(2, 'Jerry', 'Schneider'\)" % snapshotName):
+            library.table_should_match_snapshot('person', snapshotName)
@@ -0,0 +1,121 @@
+#  Copyright (c) 2010 Franz Allan Valencia See
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import sqlite3
+
+import pytest
+
+from conftest import connect
+from DatabaseLibrary.connection_pool import ConnectionPool
+
+class CountingConnect(object):
+    """
+    A `connect` function opening sqlite3 connections to `databasePath` and
+    keeping the connections it opened.
+    """
+
+    def __init__(self, databasePath):
+        self.databasePath = databasePath
+        self.opened = []
+
+    def __call__(self):
+        connection = sqlite3.connect(self.databasePath)
+        self.opened.append(connection)
+        return connection
+
+def test_register_opens_the_connection(database):
+    pool = ConnectionPool()
+    connect = CountingConnect(database)
+    pool.register('first', sqlite3, connect)
+    assert len(connect.opened) == 1
+    assert pool.acquire('first') is connect.opened[0]
+    assert len(connect.opened) == 1
+
+def test_least_recently_used_connection_is_evicted_and_reopened(database):
+    pool = ConnectionPool(maxSize=2)
+    connects = dict((alias, CountingConnect(database)) for alias in ('a', 'b', 'c'))
+    pool.register('a', sqlite3, connects['a'])
+    pool.register('b', sqlite3, connects['b'])
+    pool.acquire('a')
+    pool.register('c', sqlite3, connects['c'])
+    assert pool.get_entry('a').is_open()
+    assert not pool.get_entry('b').is_open()
+    assert pool.get_entry('c').is_open()
+    connection = pool.acquire('b')
+    assert connection is connects['b'].opened[1]
+    assert not pool.get_entry('a').is_open()
+
+def test_connection_holding_a_transaction_is_not_evicted(database):
+    pool = ConnectionPool(maxSize=1)
+    pool.register('a', sqlite3, CountingConnect(database))
+    pool.get_entry('a').inTransaction = True
+    pool.register('b', sqlite3, CountingConnect(database))
+    assert pool.get_entry('a').is_open()
+    assert pool.get_entry('b').is_open()
+
+def test_connection_older_than_max_age_is_recycled(database):
+    pool = ConnectionPool(maxAge=60)
+    connect = CountingConnect(database)
+    pool.register('a', sqlite3, connect)
+    pool.get_entry('a').createdAt -= 61
+    assert pool.acquire('a') is connect.opened[1]
+
+def test_connection_holding_a_transaction_is_not_recycled(database):
+    pool = ConnectionPool(maxAge=60)
+    connect = CountingConnect(database)
+    pool.register('a', sqlite3, connect)
+    entry = pool.get_entry('a')
+    entry.createdAt -= 61
+    entry.isolationDepth = 1
+    assert pool.acquire('a') is connect.opened[0]
+
+def test_idle_connection_failing_validation_is_reopened(database):
+    pool = ConnectionPool(validationInterval=30)
+    connect = CountingConnect(database)
+    pool.register('a', sqlite3, connect)
+    entry = pool.get_entry('a')
+    entry.lastUsed -= 31
+    connect.opened[0].close()
+    assert pool.acquire('a') is connect.opened[1]
+
+def test_idle_valid_connection_is_kept(database):
+    pool = ConnectionPool(validationInterval=30)
+    connect = CountingConnect(database)
+    pool.register('a', sqlite3, connect)
+    pool.get_entry('a').lastUsed -= 31
+    assert pool.acquire('a') is connect.opened[0]
+
+def test_validation_query_comes_from_the_dialect(database):
+    pool = ConnectionPool(validationInterval=0)
+    connect = CountingConnect(database)
+    pool.register('a', sqlite3, connect)
+    entry = pool.get_entry('a')
+    entry.dialect.validationQuery = 'SELECT no_such_column'
+    entry.lastUsed -= 1
+    assert pool.acquire('a') is connect.opened[1]
+
+def test_unknown_alias_fails(database):
+    with pytest.raises(RuntimeError, match="No database connection registered with alias 'missing'"):
+        ConnectionPool().acquire('missing')
+
+def test_switch_database_returns_the_previous_alias(library, database):
+    connect(library, database, alias='other')
+    assert library.switch_database('default') == 'other'
+    assert library.query('select count(*) from person') == [(2,)]
+    assert library.query('select count(*) from person', alias='other') == [(2,)]
+
+def test_disconnect_from_current_database_leaves_no_current_connection(library):
+    library.disconnect_from_database()
+    with pytest.raises(RuntimeError, match='No database connection is open'):
+        library.query('select * from person')
@@ -0,0 +1,55 @@
+#  Copyright (c) 2010 Franz Allan Valencia See
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import pytest
+
+from DatabaseLibrary.data_generator import _ColumnGenerator
+from DatabaseLibrary.schema_catalog import CatalogColumn
+
+def test_unique_text_fits_the_length_of_the_column(library):
+    library.execute_sql_string('CREATE TABLE code (code VARCHAR(8) PRIMARY KEY, name VARCHAR(3))')
+    assert library.generate_rows_for_table('code', 150) == 150
+    rows = library.query('SELECT code, name FROM code')
+    assert len(set(code for code, name in rows)) == 150
+    assert max(len(code) for code, name in rows) <= 8
+    assert max(len(name) for code, name in rows if name is not None) <= 3
+
+def test_unique_text_takes_all_the_length_of_the_column(library):
+    library.execute_sql_string('CREATE TABLE code (code VARCHAR(4) PRIMARY KEY)')
+    assert library.generate_rows_for_table('code', 10000) == 10000
+    assert library.query('SELECT COUNT(DISTINCT code), MAX(LENGTH(code)) FROM code') == [(10000, 4)]
+
+def test_unique_text_too_long_for_the_column_fails_before_inserting(library):
+    library.execute_sql_string('CREATE TABLE code (code VARCHAR(4) PRIMARY KEY)')
+    library.generate_rows_for_table('code', 9000)
+    with pytest.raises(RuntimeError, match="Column 'code' of type VARCHAR\\(4\\) is too short for 1001 distinct "
+                                           "values after 9000 rows, which take up to 5 characters"):
+        library.generate_rows_for_table('code', 1001)
+    assert library.query('SELECT COUNT(*) FROM code') == [(9000,)]
+
+def test_unique_binary_values_fit_the_length_of_the_column(library):
+    library.execute_sql_string('CREATE TABLE blob_key (data BINARY(1) PRIMARY KEY)')
+    library.generate_rows_for_table('blob_key', 256)
+    assert library.query('SELECT COUNT(DISTINCT data), MAX(LENGTH(data)) FROM blob_key') == [(256, 1)]
+    with pytest.raises(RuntimeError, match="Column 'data' of type BINARY\\(1\\) is too short"):
+        library.generate_rows_for_table('blob_key', 1)
+
+def test_unique_dates_beyond_the_last_date_fail_before_generating():
+    generator = _ColumnGenerator(CatalogColumn('d', 'DATE', False), 'seed', True)
+    generator.prepare(2914635)
+    assert generator.values(2914634, 1) == ['9999-12-31']
+    generator.start = 1
+    with pytest.raises(RuntimeError, match="Column 'd' of type DATE holds at most 2914635 distinct dates, "
+                                           "2914635 needed after 1 rows"):
+        generator.prepare(2914635)
@@ -0,0 +1,96 @@
+#  Copyright (c) 2010 Franz Allan Valencia See
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import asyncio
+import sqlite3
+
+import pytest
+
+from DatabaseLibrary.database_checks import _Check, _fetch_check
+from DatabaseLibrary.dialect import Dialect, SqliteDialect
+
+class RecordingRunner(object):
+    """
+    Runs the statements of the checks on a sqlite3 connection, and keeps
+    them with the number of rows they fetched.
+    """
+
+    def __init__(self, databasePath):
+        self.connection = sqlite3.connect(databasePath)
+        self.fetched = []
+
+    async def fetch(self, selectStatement, maxRows):
+        cur = self.connection.execute(selectStatement)
+        rows = cur.fetchall() if maxRows is None else cur.fetchmany(maxRows)
+        self.fetched.append((selectStatement, len(rows)))
+        return rows
+
+def fetch_check(runner, dialect, *check):
+    return asyncio.run(_fetch_check(runner, _Check.parse(list(check)), dialect))
+
+def test_row_count_checks_fetch_a_single_count(database):
+    runner = RecordingRunner(database)
+    assert fetch_check(runner, SqliteDialect(), 'Row Count Is Equal To X', 'select id from person', '1') == 2
+    assert fetch_check(runner, SqliteDialect(), 'Row Count Is Less Than X', 'select id from person', '1') == 1
+    assert runner.fetched == [
+        ('SELECT COUNT(*) FROM (SELECT 1 AS one FROM (select id from person) limited_query LIMIT 2) row_count_query', 1),
+        ('SELECT COUNT(*) FROM (SELECT 1 AS one FROM (select id from person) limited_query LIMIT 1) row_count_query', 1),
+    ]
+
+def test_row_count_checks_count_fetched_rows_without_a_row_limit(database):
+    runner = RecordingRunner(database)
+    assert fetch_check(runner, Dialect(), 'Row Count Is Greater Than X', 'select id from person', '0') == 1
+    assert runner.fetched == [('select id from person', 1)]
+
+def test_row_count_checks_count_fetched_rows_of_statements_that_are_not_queries(database):
+    runner = RecordingRunner(database)
+    assert fetch_check(runner, SqliteDialect(), 'Row Count Is 0', 'pragma table_info(person)') == 1
+    assert runner.fetched == [('pragma table_info(person)', 1)]
+
+def test_checks_return_the_rows_of_queries_only(library):
+    results = library.run_database_checks([['Query', 'select id from person order by id'],
+                                           ['Row Count Is Equal To X', 'select id from person', '2'],
+                                           ['Row Count Is Greater Than X', 'select id from person', '1'],
+                                           ['Row Count Is Less Than X', 'select id from person', '3'],
+                                           ['Row Count Is 0', 'select id from person where id = 3'],
+                                           ['Check If Exists In Database', 'select id from person']],
+                                          engine='threads')
+    assert results == [[(1,), (2,)], None, None, None, None, None]
+
+@pytest.mark.parametrize('keyword, arguments', [
+    ('Row Count Is 0', []),
+    ('Row Count Is Equal To X', ['1']),
+    ('Row Count Is Equal To X', ['3']),
+    ('Row Count Is Greater Than X', ['2']),
+    ('Row Count Is Less Than X', ['2']),
+    ('Check If Not Exists In Database', []),
+])
+def test_checks_fail_with_the_message_of_the_keyword(library, keyword, arguments):
+    statement = 'select id from person'
+    with pytest.raises(AssertionError) as keywordError:
+        getattr(library, keyword.lower().replace(' ', '_'))(statement, *arguments)
+    with pytest.raises(AssertionError) as checkError:
+        library.run_database_checks([[keyword, statement] + arguments], engine='threads')
+    assert str(checkError.value) == '1 of 1 database checks failed:\n%s : %s' % (keyword, keywordError.value)
+
+def test_failing_statements_are_reported_with_the_other_failures(library):
+    with pytest.raises(AssertionError) as error:
+        library.run_database_checks([['Row Count Is 0', 'select id from missing'],
+                                     ['Check If Exists In Database', 'select id from person where id = 3']],
+                                    engine='threads')
+    lines = str(error.value).splitlines()
+    assert lines[0] == '2 of 2 database checks failed:'
+    assert lines[1].startswith("Row Count Is 0 : 'select id from missing' failed : ")
+    assert lines[2] == ("Check If Exists In Database : Expected to have have at least one row from "
+                        "'select id from person where id = 3' but got 0 rows.")
@@ -0,0 +1,46 @@
+#  Copyright (c) 2010 Franz Allan Valencia See
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import pytest
+
+from conftest import executed_statements
+from DatabaseLibrary.dialect import MssqlDialect, OracleDialect, SqliteDialect
+
+def test_check_if_exists_asks_the_server(library):
+    library.check_if_exists_in_database("select id from person where first_name = 'Jerry'")
+    assert "SELECT EXISTS (select id from person where first_name = ?)" in executed_statements(library)
+    with pytest.raises(AssertionError, match='but got 0 rows'):
+        library.check_if_exists_in_database("select id from person where first_name = 'John'")
+
+def test_check_if_not_exists_shows_the_first_rows(library):
+    library.check_if_not_exists_in_database("select id from person where first_name = 'John'")
+    with pytest.raises(AssertionError, match=r"but got some rows : \[\(1,\), \(2,\)\] \(2 rows\)"):
+        library.check_if_not_exists_in_database('select id from person order by id')
+
+def test_existence_falls_back_to_the_first_row_when_the_server_refuses(library):
+    library._get_dialect().wrap_exists = lambda selectStatement: 'SELECT EXISTS (select * from no_such_table)'
+    library.check_if_exists_in_database('select id from person')
+    with pytest.raises(AssertionError):
+        library.check_if_exists_in_database('select id from person where id = 3')
+
+def test_statements_that_are_not_selects_are_not_wrapped():
+    for dialect in (SqliteDialect(), OracleDialect(), MssqlDialect()):
+        assert dialect.wrap_exists('pragma table_info(person)') is None
+        assert dialect.wrap_limit('exec list_people', 1) is None
+
+def test_dialects_stop_at_the_first_row():
+    assert SqliteDialect().wrap_exists('select 1;') == 'SELECT EXISTS (select 1)'
+    assert OracleDialect().wrap_limit('select 1 from dual', 1) == \
+        'SELECT * FROM (select 1 from dual) limited_query FETCH FIRST 1 ROWS ONLY'
+    assert MssqlDialect().wrap_limit('select 1', 5, '1 AS one') == 'SELECT TOP 5 1 AS one FROM (select 1) limited_query'
@@ -0,0 +1,92 @@
+#  Copyright (c) 2010 Franz Allan Valencia See
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import hashlib
+
+import pytest
+
+from conftest import connect, run_suite
+from DatabaseLibrary import logging_policy
+from DatabaseLibrary.logging_policy import LoggingPolicy
+
+def test_long_statements_are_cut_with_their_length_and_hash():
+    statement = 'select * from person where id in (%s)' % ', '.join([str(id) for id in range(100)])
+    assert LoggingPolicy(maxLength=20).sql(statement) == 'select * from person... [%s characters, md5 %s]' % (
+        len(statement), hashlib.md5(statement.encode('utf-8')).hexdigest())
+    assert LoggingPolicy().sql(statement) == statement
+
+def test_results_show_some_rows_and_their_number():
+    rows = [(id, 'name %d' % id) for id in range(50)]
+    assert LoggingPolicy(maxRows=2).rows(rows) == "[(0, 'name 0'), (1, 'name 1')] (50 rows)"
+    assert LoggingPolicy(maxRows=0).rows(rows, atLeast=True) == 'at least 50 rows'
+    assert LoggingPolicy().rows(rows[:1]) == "[(0, 'name 0')] (1 row)"
+
+def test_large_values_are_cut_without_being_represented_whole():
+    for value in (b'x' * 1000000, 'y' * 1000000, [(id,) for id in range(100000)]):
+        represented = LoggingPolicy(maxLength=20, maxRows=3).value(value)
+        assert len(represented) < 50
+
+def test_changed_policy_keeps_the_other_settings():
+    policy = LoggingPolicy('INFO', 200, 5).changed(maxRows=0)
+    assert (policy.sqlLogLevel, policy.maxLength, policy.maxRows) == ('INFO', 200, 0)
+    assert LoggingPolicy('warning').sqlLogLevel == 'WARN'
+    with pytest.raises(ValueError, match="Invalid log level 'LOUD'"):
+        LoggingPolicy('LOUD')
+
+def test_statements_are_not_formatted_when_their_level_is_not_logged(monkeypatch):
+    formatted = []
+    monkeypatch.setattr(LoggingPolicy, 'sql', lambda self, sqlStatement: formatted.append(sqlStatement) or sqlStatement)
+    monkeypatch.setattr(logging_policy.logger, 'write', lambda message, level: None)
+    LoggingPolicy('NONE').log_sql('Executing', 'select 1')
+    assert formatted == []
+    LoggingPolicy('DEBUG').log_sql('Executing', 'select 1')
+    assert formatted == ['select 1']
+
+def test_failure_messages_follow_the_policy(library):
+    library.set_logging_policy(maxLoggedRows=1)
+    with pytest.raises(AssertionError, match=r"but got some rows : \[\(1,\)\] \(2 rows\)"):
+        library.check_if_not_exists_in_database('select id from person order by id')
+
+def test_sql_is_logged_at_the_policy_level(tmp_path, database):
+    tests = run_suite(tmp_path, '''
+*** Test Cases ***
+Log Level Follows The Policy
+    Connect To Database Using Custom Params    sqlite3    database='${DATABASE}'
+    Set Logging Policy    INFO
+    Query    select id from person
+    Set Logging Policy    NONE
+    Query    select first_name from person
+''', DATABASE=database)
+    test = tests['Log Level Follows The Policy']
+    assert test.status == 'PASS', test.message
+    messages = [(message.level, message.message) for keyword in test.body for message in keyword.body
+                if getattr(message, 'level', None)]
+    assert ('INFO', 'Executing : select id from person') in messages
+    assert not [message for level, message in messages if 'select first_name' in message]
+
+def test_keywords_log_with_the_policy_of_the_connection_they_run_on(library, database, tmp_path, monkeypatch):
+    logged = []
+    monkeypatch.setattr(logging_policy.logger, 'write', lambda message, level, *args:
+                        message.startswith('Executing') and logged.append(message))
+    connect(library, database, alias='quiet')
+    library.set_logging_policy('NONE', alias='quiet')
+    library.switch_database('default')
+    scriptPath = tmp_path / 'script.sql'
+    scriptPath.write_text("insert into person values (3, 'Quiet', 'Script');\n")
+    library.execute_sql_script(str(scriptPath), alias='quiet')
+    library.execute_sql_string("insert into person values (4, 'Quiet', 'String')", alias='quiet')
+    library.delete_all_rows_from_table('person', alias='quiet')
+    assert logged == []
+    library.delete_all_rows_from_table('person')
+    assert logged == ['Executing : delete from person;']
@@ -0,0 +1,104 @@
+#  Copyright (c) 2010 Franz Allan Valencia See
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import sqlite3
+
+import pytest
+
+from DatabaseLibrary.connection_pool import ConnectionPool
+
+class SharedConnect(object):
+    """
+    Opens sqlite3 connections that may move between threads, as the
+    connections of most drivers can, and keeps them.
+    """
+
+    def __init__(self, databasePath):
+        self.databasePath = databasePath
+        self.opened = []
+
+    def __call__(self):
+        connection = sqlite3.connect(self.databasePath, check_same_thread=False)
+        self.opened.append(connection)
+        return connection
+
+def shared_entry(database, **poolOptions):
+    connect = SharedConnect(database)
+    pool = ConnectionPool(**poolOptions)
+    entry = pool.register('shared', sqlite3, connect)
+    entry.dialect.threadBoundConnections = False
+    return entry, connect
+
+def test_spare_connections_are_reused(database):
+    entry, connect = shared_entry(database)
+    connection = entry.borrow_connection()
+    entry.give_back_connection(connection, True, 2)
+    assert entry.borrow_connection() is connection
+
+def test_spare_connections_are_capped(database):
+    entry, connect = shared_entry(database)
+    connections = [entry.borrow_connection() for index in range(3)]
+    for connection in connections:
+        entry.give_back_connection(connection, True, 2)
+    assert len(entry._spareConnections) == 2
+    with pytest.raises(sqlite3.ProgrammingError):
+        connections[2].execute('select 1')
+
+def test_connections_that_are_not_reusable_are_closed(database):
+    entry, connect = shared_entry(database)
+    connection = entry.borrow_connection()
+    entry.give_back_connection(connection, False, 2)
+    assert entry._spareConnections == []
+    assert entry.borrow_connection() is not connection
+
+def test_spare_connection_older_than_max_age_is_replaced(database):
+    entry, connect = shared_entry(database, maxAge=60)
+    connection = entry.borrow_connection()
+    entry.give_back_connection(connection, True, 2)
+    spare, createdAt, lastUsed = entry._spareConnections[0]
+    entry._spareConnections[0] = (spare, createdAt - 61, lastUsed)
+    assert entry.borrow_connection() is connect.opened[-1]
+    assert connect.opened[-1] is not connection
+
+def test_idle_spare_connection_failing_validation_is_replaced(database):
+    entry, connect = shared_entry(database, validationInterval=30)
+    connection = entry.borrow_connection()
+    entry.give_back_connection(connection, True, 2)
+    spare, createdAt, lastUsed = entry._spareConnections[0]
+    entry._spareConnections[0] = (spare, createdAt, lastUsed - 31)
+    connection.close()
+    borrowed = entry.borrow_connection()
+    assert borrowed is not connection
+    assert borrowed.execute('select count(*) from person').fetchone() == (2,)
+
+def test_execute_queries_in_parallel_keeps_the_order_of_the_statements(library):
+    statements = ['select id from person where id = %d' % id for id in (2, 1, 2, 1)]
+    assert library.execute_queries_in_parallel(statements, threads=3) == [[(2,)], [(1,)], [(2,)], [(1,)]]
+
+def test_execute_queries_in_parallel_reports_all_failures(library):
+    with pytest.raises(RuntimeError, match=r"(?s)2 of 3 queries failed:.*no_such_table.*no_such_column"):
+        library.execute_queries_in_parallel(['select * from no_such_table', 'select 1', 'select no_such_column'])
+
+def test_check_all_exist_in_database(library):
+    library.check_all_exist_in_database(['select id from person where id = 1', 'select id from person where id = 2'])
+    with pytest.raises(AssertionError, match=r"(?s)each of the 3 statements but:\n'select id from person where id = 3' "
+                                             r"returned 0 rows\n'select \* from no_such_table' failed"):
+        library.check_all_exist_in_database(['select id from person where id = 1', 'select id from person where id = 3',
+                                             'select * from no_such_table'])
+
+def test_check_all_exist_falls_back_to_the_first_row_when_the_server_refuses(library):
+    library._get_dialect().wrap_exists = lambda selectStatement: 'SELECT EXISTS (select * from no_such_table)'
+    library.check_all_exist_in_database(['select id from person where id = 1'])
+    with pytest.raises(AssertionError, match='returned 0 rows'):
+        library.check_all_exist_in_database(['select id from person where id = 3'])
@@ -0,0 +1,60 @@
+#  Copyright (c) 2010 Franz Allan Valencia See
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+from conftest import run_suite
+
+def insert_people(library, count):
+    for id in range(3, count + 1):
+        library.execute_sql_string("insert into person values (%d, 'First %d', 'Last %d')" % (id, id, id))
+
+def test_query_in_batches_returns_every_row(library):
+    insert_people(library, 25)
+    rows = library.query('select id from person order by id', fetchSize=4)
+    assert rows == [(id,) for id in range(1, 26)]
+
+def test_query_stops_at_max_rows(library):
+    insert_people(library, 25)
+    assert library.query('select id from person order by id', maxRows=3) == [(1,), (2,), (3,)]
+    assert library.query('select id from person order by id', fetchSize=2, maxRows=5) == [(id,) for id in range(1, 6)]
+
+def test_fetch_batches_yields_batches_of_fetch_size(library):
+    insert_people(library, 10)
+    batches = list(library._fetch_batches('select id from person order by id', None, 4))
+    assert [len(batch) for batch in batches] == [4, 4, 2]
+
+def test_for_each_row_and_for_each_batch(tmp_path, database):
+    tests = run_suite(tmp_path, '''
+*** Test Cases ***
+For Each Row
+    Connect To Database Using Custom Params    sqlite3    database='${DATABASE}'
+    ${count}    For Each Row    select id, first_name from person order by id    Log Many    fetchSize=1
+    Should Be Equal As Integers    ${count}    2
+
+For Each Batch
+    Connect To Database Using Custom Params    sqlite3    database='${DATABASE}'
+    ${count}    For Each Batch    select id from person    Batch Should Have One Row    fetchSize=1
+    Should Be Equal As Integers    ${count}    2
+
+For Each Row Fails With The Keyword
+    Connect To Database Using Custom Params    sqlite3    database='${DATABASE}'
+    For Each Row    select id from person    Fail
+
+*** Keywords ***
+Batch Should Have One Row
+    [Arguments]    ${batch}
+    Length Should Be    ${batch}    1
+''', DATABASE=database)
+    assert tests['For Each Row'].status == 'PASS', tests['For Each Row'].message
+    assert tests['For Each Batch'].status == 'PASS', tests['For Each Batch'].message
+    assert tests['For Each Row Fails With The Keyword'].status == 'FAIL'
@@ -0,0 +1,78 @@
+#  Copyright (c) 2010 Franz Allan Valencia See
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import sqlite3
+
+from conftest import connect
+from DatabaseLibrary.query_cache import QueryCache
+
+def insert_behind_the_library(database):
+    connection = sqlite3.connect(database)
+    connection.execute("insert into person values (3, 'Ann', 'Lee')")
+    connection.commit()
+    connection.close()
+
+def test_cache_is_disabled_by_default(library, database):
+    assert library.get_query_cache_statistics() is None
+    assert library.row_count('select * from person') == 2
+    insert_behind_the_library(database)
+    assert library.row_count('select * from person') == 3
+
+def test_cached_results_are_returned_until_they_expire(library, database):
+    library.enable_query_cache(timeToLive=60)
+    rows = library.query('select id from person order by id')
+    insert_behind_the_library(database)
+    cached = library.query('select  id  from person order by id;')
+    assert cached == rows == [(1,), (2,)]
+    assert cached is not rows
+    statistics = library.get_query_cache_statistics()
+    assert (statistics['hits'], statistics['misses']) == (1, 1)
+    library._queryCache.timeToLive = 0
+    assert library.query('select id from person order by id') == [(1,), (2,), (3,)]
+
+def test_results_are_cached_per_statement_parameters_and_alias(library, database):
+    connect(library, database, alias='other')
+    library.enable_query_cache()
+    assert library.query('select id from person where id = ?', parameters=[1]) == [(1,)]
+    assert library.query('select id from person where id = ?', parameters=[2]) == [(2,)]
+    assert library.row_count('select * from person', alias='default') == 2
+    insert_behind_the_library(database)
+    assert library.row_count('select * from person', alias='other') == 3
+
+def test_writes_drop_the_cached_results_of_their_connection(library, database):
+    connect(library, database, alias='other')
+    library.enable_query_cache()
+    assert library.row_count('select * from person', alias='default') == 2
+    assert library.row_count('select * from person', alias='other') == 2
+    library.execute_sql_string("insert into person values (3, 'Ann', 'Lee')", alias='default')
+    assert library.row_count('select * from person', alias='default') == 3
+    assert library.row_count('select * from person', alias='other') == 2
+    library.clear_query_cache()
+    assert library.row_count('select * from person', alias='other') == 3
+
+def test_bulk_inserts_drop_the_cached_results(library):
+    library.enable_query_cache()
+    assert library.row_count('select * from person') == 2
+    library.insert_rows('person', [(3, 'Ann', 'Lee')])
+    assert library.row_count('select * from person') == 3
+
+def test_least_recently_used_results_are_evicted():
+    cache = QueryCache(maxEntries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == (True, 1)
+    cache.put('c', 3)
+    assert cache.get('b') == (False, None)
+    assert cache.get('a') == (True, 1)
+    assert cache.statistics()['evictions'] == 1
@@ -0,0 +1,63 @@
+#  Copyright (c) 2010 Franz Allan Valencia See
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import json
+
+import pytest
+
+from DatabaseLibrary.query_plan import (FULL_SCAN, INDEX_SCAN, JOIN, SORT, _parse_mysql_plan, _parse_postgresql_plan,
+                                        _parse_sqlite_plan)
+from DatabaseLibrary.result_table import ResultTableBuilder
+
+def test_full_scans_are_caught(library):
+    library.query_plan_should_not_contain('select * from person where id = 1', 'full scan')
+    with pytest.raises(AssertionError, match="The plan of the query has a step 'SCAN on person'"):
+        library.query_plan_should_not_contain("select * from person where last_name = 'See'", 'full scan')
+    library.query_plan_should_not_contain("select * from person where last_name = 'See'", 'full scan', tableName='city')
+
+def test_index_use_is_checked(library):
+    library.execute_sql_string('create index person_last_name_idx on person (last_name)')
+    library.query_plan_should_use_index("select * from person where last_name = 'See'", 'person_last_name_idx')
+    library.query_plan_should_use_index("select * from person where last_name = ?", tableName='person', parameters=['See'])
+    library.query_plan_should_use_index('select * from person where id = 1', 'primary key')
+    with pytest.raises(AssertionError, match="does not use an index on 'person'"):
+        library.query_plan_should_use_index("select * from person where first_name = 'Jerry'", tableName='person')
+
+def test_sqlite_has_no_cost_estimates(library):
+    with pytest.raises(RuntimeError, match='sqlite databases do not estimate the cost of queries'):
+        library.query_cost_should_be_below('select * from person', 100)
+    with pytest.raises(ValueError):
+        library.query_cost_should_be_below('select * from person')
+
+def test_sqlite_plan_tree():
+    plan = _parse_sqlite_plan([(2, 0, 0, 'SCAN p'), (5, 0, 0, 'SEARCH a USING INDEX address_person_idx (person_id=?)'),
+                               (9, 0, 0, 'USE TEMP B-TREE FOR ORDER BY')])
+    assert [(step.kind, step.table, step.index) for step in plan.children] == [
+        (FULL_SCAN, 'p', None), (INDEX_SCAN, 'a', 'address_person_idx'), (SORT, None, None)]
+
+def test_postgresql_plan_tree():
+    document = [{'Plan': {'Node Type': 'Hash Join', 'Total Cost': 42.5, 'Plan Rows': 10, 'Plans': [
+        {'Node Type': 'Seq Scan', 'Relation Name': 'person', 'Total Cost': 20.0, 'Plan Rows': 1000},
+        {'Node Type': 'Index Scan', 'Relation Name': 'address', 'Index Name': 'address_pkey', 'Plan Rows': 10}]}}]
+    plan = _parse_postgresql_plan([(json.dumps(document),)])
+    assert (plan.kind, plan.cost, plan.rows) == (JOIN, 42.5, 10)
+    assert [step.summary() for step in plan.walk()] == ['Hash Join', 'Seq Scan on person', 'Index Scan on address using address_pkey']
+    assert plan.children[0].matches('full scan') and plan.children[0].matches('seq scan')
+
+def test_mysql_plan_rows():
+    builder = ResultTableBuilder((('id',), ('table',), ('type',), ('key',), ('rows',)))
+    builder.add_rows([(1, 'person', 'ALL', None, 1000), (1, 'address', 'ref', 'person_id', 2)])
+    plan = _parse_mysql_plan(builder.build())
+    assert [(step.kind, step.table, step.rows) for step in plan.children] == [
+        (FULL_SCAN, 'person', 1000.0), (INDEX_SCAN, 'address', 2.0)]
@@ -0,0 +1,101 @@
+#  Copyright (c) 2010 Franz Allan Valencia See
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import json
+import re
+import sqlite3
+import threading
+
+import robot
+
+from conftest import run_suite
+from DatabaseLibrary import query_statistics
+from DatabaseLibrary.query_statistics import OTHER_STATEMENTS, QueryStatistics, normalise_statement
+
+class _MessageCollector(robot.api.SuiteVisitor):
+
+    def __init__(self):
+        self.messages = []
+
+    def visit_message(self, message):
+        self.messages.append((message.level, message.message))
+
+def test_literals_are_normalised():
+    assert normalise_statement("select *  from person\n where id = 12 and name = 'it''s'") == \
+        'select * from person where id = ? and name = ?'
+    assert normalise_statement("insert into t values (1, 'a'), (2, 'b')") == 'insert into t values (?, ...), (?, ...)'
+
+def test_executions_are_grouped_by_normalised_statement():
+    statistics = QueryStatistics(slowQueryThreshold=None)
+    statistics.record('default', 'select * from person where id = 1', 0.5, rows=1, size=10)
+    statistics.record('default', 'select * from person where id = 2', 1.5, rows=1, size=10, failed=True)
+    entry, = statistics.statistics()
+    assert (entry['statement'], entry['calls'], entry['errors'], entry['rows'], entry['bytes']) == \
+        ('select * from person where id = ?', 2, 1, 2, 20)
+    assert (entry['totalTime'], entry['maxTime'], entry['p50'], entry['p99']) == (2.0, 1.5, 1.5, 1.5)
+
+def test_statements_beyond_the_maximum_are_grouped_together(monkeypatch):
+    monkeypatch.setattr(query_statistics, 'MAX_STATEMENTS', 2)
+    statistics = QueryStatistics(slowQueryThreshold=None)
+    for table in ('a', 'b', 'c', 'd'):
+        statistics.record('default', 'select * from %s' % table, 0.1)
+    assert sorted(entry['statement'] for entry in statistics.statistics()) == [OTHER_STATEMENTS, 'select * from a', 'select * from b']
+
+def test_statistics_are_written_as_json_and_csv(tmp_path):
+    statistics = QueryStatistics(slowQueryThreshold=None)
+    statistics.record('default', 'select 1', 0.25, rows=1)
+    jsonPath = str(tmp_path / 'statistics.json')
+    statistics.write(jsonPath)
+    assert json.load(open(jsonPath))[0]['statement'] == 'select ?'
+    csvPath = str(tmp_path / 'statistics.csv')
+    statistics.write(csvPath)
+    assert open(csvPath).readline().strip() == 'alias,statement,calls,errors,rows,bytes,totalTime,maxTime,p50,p95,p99'
+
+def test_instrumented_cursor_counts_rows_fetched_through_execute(database):
+    statistics = QueryStatistics(slowQueryThreshold=None)
+    connection = statistics.instrument(sqlite3.connect(database), 'default')
+    cur = connection.cursor()
+    assert cur.execute('select * from person').fetchall() == [(1, 'Franz Allan', 'See'), (2, 'Jerry', 'Schneider')]
+    cur.close()
+    entry, = statistics.statistics()
+    assert (entry['calls'], entry['rows']) == (1, 2)
+
+def test_slow_queries_of_worker_threads_are_logged_by_the_main_thread(monkeypatch):
+    warnings = []
+    monkeypatch.setattr(query_statistics.logger, 'warn', lambda message: warnings.append((threading.current_thread().name, message)))
+    statistics = QueryStatistics(slowQueryThreshold=0.1)
+    worker = threading.Thread(target=statistics.record, args=('default', 'select 1', 0.2), name='worker')
+    worker.start()
+    worker.join()
+    assert warnings == []
+    statistics.flush_warnings()
+    assert warnings == [('MainThread', "Slow query on 'default' took 0.200 s for 0 rows : select 1")]
+
+def test_worker_threads_are_told_apart_without_the_logging_threads_of_robot(monkeypatch):
+    monkeypatch.setattr(query_statistics, 'LOGGING_THREADS', None)
+    test_slow_queries_of_worker_threads_are_logged_by_the_main_thread(monkeypatch)
+
+def test_slow_parallel_queries_are_warned_about(tmp_path, database):
+    run_suite(tmp_path, '''
+*** Test Cases ***
+Slow Parallel Queries
+    Import Library    DatabaseLibrary    slowQueryThreshold=0    AS    Slow
+    Slow.Connect To Database Using Custom Params    sqlite3    database='${DATABASE}'
+    Slow.Execute Queries In Parallel    ${{['select id from person where id = 1', 'select id from person where id = 2']}}
+''', DATABASE=database)
+    collector = _MessageCollector()
+    robot.api.ExecutionResult(str(tmp_path / 'output.xml')).suite.visit(collector)
+    warnings = [re.sub(r'took [\d.]+ s', 'took 0 s', message) for level, message in collector.messages if level == 'WARN']
+    assert "Slow query on 'default' took 0 s for 1 rows : select id from person where id = 1" in warnings
+    assert "Slow query on 'default' took 0 s for 1 rows : select id from person where id = 2" in warnings
@@ -0,0 +1,64 @@
+#  Copyright (c) 2010 Franz Allan Valencia See
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import datetime
+import gzip
+import json
+import os
+from decimal import Decimal
+
+import pytest
+
+from DatabaseLibrary.result_export import _json_value, export_format
+
+def test_rows_are_exported_to_csv(library, tmp_path):
+    fileName = str(tmp_path / 'person.csv')
+    assert library.export_query_to_file('select * from person order by id', fileName, fetchSize=1) == 2
+    assert open(fileName).read().splitlines() == ['id,first_name,last_name', '1,Franz Allan,See', '2,Jerry,Schneider']
+
+def test_rows_are_exported_to_compressed_json_lines(library, tmp_path):
+    fileName = str(tmp_path / 'person.jsonl.gz')
+    library.export_query_to_file('select id, first_name from person order by id', fileName)
+    lines = gzip.open(fileName, 'rt', encoding='utf-8').read().splitlines()
+    assert [json.loads(line) for line in lines] == [{'id': 1, 'first_name': 'Franz Allan'}, {'id': 2, 'first_name': 'Jerry'}]
+
+def test_format_and_delimiter_can_be_given(library, tmp_path):
+    fileName = str(tmp_path / 'person.txt')
+    library.export_query_to_file('select id, last_name from person where id = 1', fileName, format='CSV', delimiter=';')
+    assert open(fileName).read().splitlines() == ['id;last_name', '1;See']
+
+def test_empty_result_writes_the_header_only(library, tmp_path):
+    fileName = str(tmp_path / 'nobody.csv')
+    assert library.export_query_to_file('select * from person where id = 3', fileName) == 0
+    assert open(fileName).read().splitlines() == ['id,first_name,last_name']
+
+def test_file_is_removed_when_the_export_fails(library, tmp_path, monkeypatch):
+    fileName = str(tmp_path / 'person.csv')
+    monkeypatch.setattr('DatabaseLibrary.result_export.CsvExport.write_rows', lambda self, rows: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        library.export_query_to_file('select * from person', fileName)
+    assert not os.path.exists(fileName)
+
+def test_export_format_is_taken_from_the_extension():
+    assert export_format('out/rows.CSV.gz') == 'csv.gz'
+    assert export_format('rows.jsonl') == 'jsonl'
+    with pytest.raises(ValueError, match="Cannot tell the export format of 'rows.json'"):
+        export_format('rows.json')
+    with pytest.raises(ValueError, match="Unknown export format 'xml'"):
+        export_format('rows.csv', 'xml')
+
+def test_values_without_a_json_type_are_converted():
+    assert _json_value(datetime.date(2020, 2, 29)) == '2020-02-29'
+    assert _json_value(b'\x01\xff') == '01ff'
+    assert _json_value(Decimal('1.10')) == '1.10'
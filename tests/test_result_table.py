@@ -0,0 +1,72 @@
+#  Copyright (c) 2010 Franz Allan Valencia See
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import pytest
+
+from DatabaseLibrary.result_table import ResultTable, ResultTableBuilder
+
+DESCRIPTION = (('id',), ('Name',), ('score',))
+
+def build(batches):
+    builder = ResultTableBuilder(DESCRIPTION)
+    for rows in batches:
+        builder.add_rows(rows)
+    return builder.build()
+
+def test_columnar_query_behaves_as_the_list_of_rows(library):
+    result = library.query('select * from person order by id', columnar=True, fetchSize=1)
+    assert result == library.query('select * from person order by id')
+    assert result.columns == ('id', 'first_name', 'last_name')
+    assert result.col['first_name'] == ['Franz Allan', 'Jerry']
+    assert result.col.last_name == ['See', 'Schneider']
+    assert result[-1] == (2, 'Jerry', 'Schneider')
+
+def test_columnar_query_stops_at_max_rows(library):
+    assert library.query('select id from person order by id', columnar=True, maxRows=1) == [(1,)]
+
+def test_columnar_query_of_a_statement_without_result_is_empty(library):
+    result = library.query("update person set last_name = 'Changed' where id = 3", columnar=True)
+    assert len(result) == 0
+    assert result.columns == ()
+    assert result.description is None
+    assert list(result) == []
+
+def test_numeric_columns_are_packed_until_a_value_does_not_fit():
+    result = build([[(1, 'a', 0.5), (2, 'b', 1.5)], [(3, 'c', None)]])
+    assert result._data[0].typecode == 'q'
+    assert isinstance(result._data[2], list)
+    assert result.col.score == [0.5, 1.5, None]
+    assert build([[(1 << 64, 'a', 0.5)]])._data[0] == [1 << 64]
+
+def test_columns_are_found_by_name_index_or_lower_case_name():
+    result = build([[(1, 'a', 0.5)]])
+    assert result.column('Name') == result.column('name') == result.column(1) == ['a']
+    with pytest.raises(KeyError, match="No column 'missing' in the result, which has id, Name, score"):
+        result.column('missing')
+    with pytest.raises(AttributeError):
+        result.col.missing
+
+def test_slices_share_the_storage():
+    result = build([[(index, 'n%d' % index, index / 2.0) for index in range(10)]])
+    assert result[2:4] == [(2, 'n2', 1.0), (3, 'n3', 1.5)]
+    assert result[2:4]._data is result._data
+    assert result[::4].col.id == [0, 4, 8]
+    assert result[8:2] == []
+    with pytest.raises(IndexError):
+        result[10]
+
+def test_empty_result_table():
+    result = ResultTable(DESCRIPTION, [])
+    assert len(result) == 0
+    assert result.col.id == []
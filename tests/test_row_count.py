@@ -0,0 +1,56 @@
+#  Copyright (c) 2010 Franz Allan Valencia See
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import pytest
+
+from conftest import executed_statements
+
+def test_row_count_is_counted_on_the_server(library):
+    assert library.row_count('select * from person') == 2
+    assert 'SELECT COUNT(*) FROM (select * from person) row_count_query' in executed_statements(library)
+
+def test_row_count_of_a_statement_that_is_not_a_select_counts_fetched_rows(library):
+    assert library.row_count('pragma table_info(person)') == 3
+    assert executed_statements(library)[0].startswith('pragma')
+
+def test_row_count_is_assertions_stop_counting_after_the_rows_they_need(library):
+    library.row_count_is_equal_to_x('select * from person', 2)
+    assert ('SELECT COUNT(*) FROM (SELECT ? AS one FROM (select * from person) limited_query LIMIT ?) row_count_query'
+            in executed_statements(library))
+
+def test_row_count_is_0(library):
+    library.row_count_is_0("select * from person where first_name = 'John'")
+    with pytest.raises(AssertionError, match='Number of rows returned was at least 1'):
+        library.row_count_is_0('select * from person')
+
+def test_row_count_is_equal_to_x(library):
+    library.row_count_is_equal_to_x('select * from person', 2)
+    with pytest.raises(AssertionError, match='than the returned rows of 2$'):
+        library.row_count_is_equal_to_x('select * from person', 3)
+    with pytest.raises(AssertionError, match='than the returned rows of at least 2$'):
+        library.row_count_is_equal_to_x('select * from person', 1)
+
+def test_row_count_is_greater_than_x(library):
+    library.row_count_is_greater_than_x('select * from person', 1)
+    with pytest.raises(AssertionError, match='than the returned rows of 2$'):
+        library.row_count_is_greater_than_x('select * from person', 2)
+
+def test_row_count_is_less_than_x(library):
+    library.row_count_is_less_than_x('select * from person', 3)
+    with pytest.raises(AssertionError, match='than the returned rows of at least 2$'):
+        library.row_count_is_less_than_x('select * from person', 2)
+
+def test_count_falls_back_to_fetched_rows_when_the_server_refuses(library):
+    library._get_dialect().wrap_count = lambda selectStatement: 'SELECT COUNT(*) FROM no_such_table'
+    assert library.row_count('select * from person') == 2
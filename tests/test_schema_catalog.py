@@ -0,0 +1,82 @@
+#  Copyright (c) 2010 Franz Allan Valencia See
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import sqlite3
+
+import pytest
+
+from conftest import executed_statements
+from DatabaseLibrary.dialect import Dialect, MysqlDialect, OracleDialect
+
+def catalog_reads(library):
+    return len([statement for statement in executed_statements(library) if 'pragma_table_info' in statement])
+
+def test_tables_columns_and_indexes_must_exist(library):
+    library.execute_sql_string('create index person_names on person (last_name, first_name)')
+    library.table_must_exist('person')
+    library.table_must_exist('PERSON')
+    library.column_must_exist('person', 'first_name')
+    library.index_must_exist('person', 'person_names')
+    library.index_must_exist('person', columns='last_name')
+    library.index_must_exist('person', 'person_names', columns=['LAST_NAME', 'first_name'])
+    assert library.get_table_columns('person') == ['id', 'first_name', 'last_name']
+
+def test_missing_tables_columns_and_indexes_fail(library):
+    with pytest.raises(AssertionError, match="Table 'nobody' does not exist in the db"):
+        library.table_must_exist('nobody')
+    with pytest.raises(AssertionError, match="Column 'age' does not exist in table 'person'"):
+        library.column_must_exist('person', 'age')
+    with pytest.raises(AssertionError, match="Table 'nobody' does not exist in the db"):
+        library.column_must_exist('nobody', 'age')
+    with pytest.raises(AssertionError, match=r"Index on \(first_name\) does not exist in table 'person'"):
+        library.index_must_exist('person', columns='first_name')
+    with pytest.raises(ValueError):
+        library.index_must_exist('person')
+
+def test_catalog_is_read_once(library):
+    library.table_must_exist('person')
+    library.column_must_exist('person', 'last_name')
+    library.get_table_columns('person')
+    assert catalog_reads(library) == 1
+
+def test_catalog_is_read_again_after_ddl(library):
+    library.table_must_exist('person')
+    library.execute_sql_string('create table city (id integer primary key, name varchar(30))')
+    library.column_must_exist('city', 'name')
+    library.execute_sql_string('alter table city add column country varchar(30)')
+    assert library.get_table_columns('city') == ['id', 'name', 'country']
+
+def test_tables_created_by_someone_else_are_found(library, database):
+    library.table_must_exist('person')
+    connection = sqlite3.connect(database)
+    connection.execute('create table city (id integer primary key)')
+    connection.close()
+    library.table_must_exist('city')
+
+def test_tables_outside_the_catalog_are_found_as_before(library, tmp_path):
+    library.execute_sql_string("attach database '%s' as other" % (tmp_path / 'other.db'))
+    library.execute_sql_string('create table other.city (id integer primary key)')
+    library._get_dialect().table_in_any_schema = \
+        lambda tableName: "select name from other.sqlite_master where name = '%s'" % tableName
+    library.table_must_exist('city')
+    with pytest.raises(RuntimeError, match="Table 'city' does not exist in the db"):
+        library.get_table_columns('city')
+    with pytest.raises(AssertionError, match="Table 'town' does not exist in the db"):
+        library.table_must_exist('town')
+
+def test_tables_of_any_schema_are_looked_up_in_information_schema():
+    assert Dialect().table_in_any_schema("o'brien") == \
+        "SELECT table_name FROM information_schema.tables WHERE table_name = 'o''brien'"
+    assert MysqlDialect().table_in_any_schema('person') == Dialect().table_in_any_schema('person')
+    assert OracleDialect().table_in_any_schema('person') is None
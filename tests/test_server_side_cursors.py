@@ -0,0 +1,75 @@
+#  Copyright (c) 2010 Franz Allan Valencia See
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import pytest
+
+from DatabaseLibrary.dialect import MysqlDialect, Psycopg2Dialect
+
+class FakeServerSideCursors(object):
+    """
+    Makes the sqlite3 connection of `library` look as if it had server-side
+    cursors, opened with `cursorArgs`, and records the connections borrowed
+    from it.
+    """
+
+    def __init__(self, library, cursorArgs=(), blocksConnection=False):
+        self.pooledConnection = library._get_pooled_connection(None)
+        self.pooledConnection.serverSideCursors = True
+        dialect = self.pooledConnection.dialect
+        dialect.server_side_cursor = lambda dbApiModule, withHold=False: (cursorArgs, {})
+        dialect.serverSideCursorBlocksConnection = blocksConnection
+        self.borrowed = []
+        self.givenBack = []
+        borrow, giveBack = self.pooledConnection.borrow_connection, self.pooledConnection.give_back_connection
+        self.pooledConnection.borrow_connection = lambda: self._record(self.borrowed, borrow())
+        self.pooledConnection.give_back_connection = lambda connection, *args: giveBack(self._record(self.givenBack, connection), *args)
+
+    def _record(self, connections, connection):
+        connections.append(connection)
+        return connection
+
+def test_server_side_stream_is_read_on_a_borrowed_connection(library):
+    cursors = FakeServerSideCursors(library)
+    batches = library._stream_batches('select id from person order by id', None, 1)
+    assert next(batches) == [(1,)]
+    assert len(cursors.borrowed) == 1 and cursors.borrowed[0] is not library._get_connection(None)._connection
+    assert library.query('select count(*) from person') == [(2,)]
+    assert list(batches) == [[(2,)]]
+    assert cursors.givenBack == cursors.borrowed
+
+def test_server_side_stream_sees_the_changes_of_a_held_transaction(library):
+    cursors = FakeServerSideCursors(library)
+    library.begin_transaction()
+    library.execute_sql_string("insert into person values (3, 'Not', 'Committed')")
+    assert list(library._stream_batches('select id from person order by id', None, 2)) == [[(1,), (2,)], [(3,)]]
+    assert cursors.borrowed == []
+    library.rollback_transaction()
+
+def test_server_side_cursor_blocking_the_connection_is_not_used_inside_a_transaction(library):
+    cursors = FakeServerSideCursors(library, cursorArgs=('not a cursor factory',), blocksConnection=True)
+    library.begin_isolated_test()
+    assert list(library._stream_batches('select id from person order by id', None, 5)) == [[(1,), (2,)]]
+    assert cursors.borrowed == []
+    library.rollback_isolated_test()
+
+def test_plain_stream_without_server_side_cursors(library):
+    assert list(library._stream_batches('select id from person order by id', None, 1, serverSide=True)) == [[(1,)], [(2,)]]
+
+def test_only_mysql_server_side_cursors_block_the_connection():
+    assert MysqlDialect.serverSideCursorBlocksConnection
+    assert not Psycopg2Dialect.serverSideCursorBlocksConnection
+
+def test_named_cursors_are_declared_with_hold_in_autocommit_mode():
+    args, kwargs = Psycopg2Dialect().server_side_cursor(None, True)
+    assert args[0].startswith('dblib_cursor_') and kwargs == {'withhold': True}
@@ -0,0 +1,166 @@
+#  Copyright (c) 2010 Franz Allan Valencia See
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import sqlite3
+
+import pytest
+
+from DatabaseLibrary.dialect import PostgresqlDialect, SqliteDialect
+from DatabaseLibrary.snapshot import PostgresqlSnapshot, TableDumpSnapshot, _database_name, _parents_first, snapshot_for
+
+def create_cities(library):
+    library.execute_sql_string('PRAGMA foreign_keys = ON')
+    library.execute_sql_string('CREATE TABLE country (id INTEGER PRIMARY KEY, name VARCHAR(30))')
+    library.execute_sql_string('CREATE TABLE city (id INTEGER PRIMARY KEY, country_id INTEGER NOT NULL REFERENCES country (id))')
+    library.execute_sql_string("INSERT INTO country VALUES (1, 'Belgium')")
+    library.execute_sql_string('INSERT INTO city VALUES (1, 1)')
+
+def test_restore_brings_back_the_backed_up_database(library):
+    library.snapshot_database('fixtures')
+    library.execute_sql_string('delete from person')
+    library.execute_sql_string('create table extra (id integer)')
+    library.restore_database_snapshot('fixtures')
+    assert library.query('select id from person order by id') == [(1,), (2,)]
+    assert library.query("select count(*) from sqlite_master where name = 'extra'") == [(0,)]
+
+def test_restore_of_an_unknown_snapshot_fails(library):
+    with pytest.raises(RuntimeError, match="No snapshot 'fixtures' of 'default'"):
+        library.restore_database_snapshot('fixtures')
+
+def test_snapshot_cannot_be_taken_inside_a_transaction(library):
+    library.begin_transaction()
+    with pytest.raises(RuntimeError, match="inside a transaction or an isolated test"):
+        library.snapshot_database()
+    library.rollback_transaction()
+
+def test_table_dump_is_restored_parents_first(library):
+    create_cities(library)
+    library.snapshot_database('cities', tables='city, country, person')
+    snapshot = library._snapshots[('default', 'cities')]
+    assert snapshot.tables == ['country', 'city', 'person']
+    library.execute_sql_string("INSERT INTO country VALUES (2, 'France')")
+    library.execute_sql_string('INSERT INTO city VALUES (2, 2)')
+    library.restore_database_snapshot('cities')
+    assert library.query('select * from city') == [(1, 1)]
+    assert library.query('select * from country') == [(1, 'Belgium')]
+
+def test_tables_are_ordered_by_their_foreign_keys(database):
+    connection = sqlite3.connect(database)
+    connection.executescript('''
+        CREATE TABLE a (id INTEGER PRIMARY KEY, b_id INTEGER REFERENCES b (id), c_id INTEGER REFERENCES c (id));
+        CREATE TABLE b (id INTEGER PRIMARY KEY, c_id INTEGER REFERENCES c (id));
+        CREATE TABLE c (id INTEGER PRIMARY KEY, parent_id INTEGER REFERENCES c (id));
+        CREATE TABLE d (id INTEGER PRIMARY KEY, e_id INTEGER REFERENCES e (id));
+        CREATE TABLE e (id INTEGER PRIMARY KEY, d_id INTEGER REFERENCES d (id));
+    ''')
+    assert _parents_first(connection, SqliteDialect(), ['A', 'person', 'B', 'c']) == ['c', 'B', 'A', 'person']
+    assert _parents_first(connection, SqliteDialect(), ['d', 'e', 'b']) == ['e', 'd', 'b']
+    connection.close()
+
+def test_order_is_kept_when_the_catalog_cannot_be_read(database):
+    connection = sqlite3.connect(database)
+    assert _parents_first(connection, PostgresqlDialect(), ['b', 'a']) == ['b', 'a']
+    connection.close()
+
+def test_long_database_names_do_not_collide_once_cut():
+    prefix = 'a_database_with_a_rather_long_name_snapshot_fixtures_for_the_'
+    first, second = _database_name(prefix + 'first_suite'), _database_name(prefix + 'second_suite')
+    assert len(first) == len(second) == 63
+    assert first != second
+    assert _database_name('test_snapshot_fixtures') == 'test_snapshot_fixtures'
+
+class FakeServer(object):
+    """
+    Stands for a PostgreSQL server whose connections record the statements
+    they run, failing those starting with one of `failing`.
+    """
+
+    def __init__(self, failing=()):
+        self.executed = []
+        self.failing = failing
+        self.opened = 0
+
+    def cursor(self):
+        return self
+
+    def execute(self, sqlStatement):
+        self.executed.append(sqlStatement)
+        if sqlStatement.startswith(self.failing):
+            raise RuntimeError('refused : %s' % sqlStatement)
+
+    def fetchone(self):
+        return ('test',)
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+class FakePooledConnection(object):
+
+    autocommit = False
+
+    def __init__(self, server):
+        self.server = server
+        self.connection = server
+        self.dialect = PostgresqlDialect()
+        self.dialect.set_autocommit = lambda connection, autocommit: None
+        self.loggingPolicy = self
+
+    def log_sql(self, message, sqlStatement):
+        pass
+
+    def close_spare_connections(self):
+        pass
+
+    def connect_to(self, database):
+        return self.server
+
+    def close(self):
+        self.connection = None
+
+    def open(self):
+        self.server.opened += 1
+        self.connection = self.server
+
+def test_failed_postgresql_restore_reports_the_error_of_the_server():
+    server = FakeServer(failing=('CREATE DATABASE "test" ',))
+    pooledConnection = FakePooledConnection(server)
+    snapshot = PostgresqlSnapshot('fixtures')
+    snapshot.take(pooledConnection)
+    with pytest.raises(RuntimeError, match='refused : CREATE DATABASE "test" TEMPLATE "test_snapshot_fixtures"'):
+        snapshot.restore(pooledConnection)
+    assert server.opened == 0
+
+def test_discarded_postgresql_snapshot_is_dropped():
+    server = FakeServer()
+    snapshot = PostgresqlSnapshot('fixtures')
+    snapshot.take(FakePooledConnection(server))
+    snapshot.discard()
+    assert server.executed[-1] == 'DROP DATABASE IF EXISTS "test_snapshot_fixtures"'
+
+class BrokeredServer(FakeServer):
+    """
+    Stands for a connection to a PostgreSQL server through the broker.
+    """
+
+    brokered = True
+
+def test_postgresql_snapshots_through_the_broker_dump_the_tables(tmp_path):
+    pooledConnection = FakePooledConnection(FakeServer())
+    pooledConnection.alias = 'default'
+    assert isinstance(snapshot_for(pooledConnection, 'fixtures', str(tmp_path)), PostgresqlSnapshot)
+    pooledConnection.connection = BrokeredServer()
+    assert isinstance(snapshot_for(pooledConnection, 'fixtures', str(tmp_path)), TableDumpSnapshot)
@@ -0,0 +1,87 @@
+#  Copyright (c) 2010 Franz Allan Valencia See
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import io
+
+import pytest
+
+from DatabaseLibrary.sql_script import SqlScriptReader, batch_statements
+
+def split(script, delimiter=';', backslashEscapes=False):
+    return list(SqlScriptReader(io.StringIO(script), delimiter, backslashEscapes))
+
+def test_statements_end_at_the_delimiter_and_the_last_one_may_omit_it():
+    assert split('delete from a;\ndelete\n  from b;\ndelete from c') == \
+        ['delete from a', 'delete\n  from b', 'delete from c']
+
+def test_comment_lines_and_empty_statements_are_dropped():
+    assert split('# first\ndelete from a;;\n  # second\n;\n-- third\ndelete from b; -- trailing\n') == \
+        ['delete from a', 'delete from b']
+
+def test_delimiters_inside_quotes_do_not_end_a_statement():
+    assert split("insert into a values ('x;y', \"c;d\", `e;f`);select 1") == \
+        ["insert into a values ('x;y', \"c;d\", `e;f`)", 'select 1']
+
+def test_doubled_quotes_stay_in_the_string():
+    assert split("select 'it''s; here';select 2") == ["select 'it''s; here'", 'select 2']
+
+def test_quoted_strings_span_lines():
+    assert split("insert into a values ('one;\ntwo');\nselect 1") == ["insert into a values ('one;\ntwo')", 'select 1']
+
+def test_dashes_and_hashes_inside_strings_are_kept():
+    assert split("select '-- not a comment', '# nor this';") == ["select '-- not a comment', '# nor this'"]
+
+def test_block_comments_are_kept_and_hide_delimiters():
+    assert split('select /* a; b\n c; */ 1;select 2') == ['select /* a; b\n c; */ 1', 'select 2']
+
+def test_dollar_quoted_bodies_hide_delimiters():
+    script = ('create function f() returns int as $$ begin return 1; end; $$ language plpgsql;\n'
+              'create function g() returns int as $body$ select 1; $body$ language sql;\nselect 3')
+    assert split(script) == ['create function f() returns int as $$ begin return 1; end; $$ language plpgsql',
+                             'create function g() returns int as $body$ select 1; $body$ language sql',
+                             'select 3']
+
+def test_positional_parameters_are_not_dollar_quotes():
+    assert split('prepare p as select $1; execute p(1)') == ['prepare p as select $1', 'execute p(1)']
+
+def test_backslash_escapes_only_with_backslash_escapes():
+    script = "select 'a\\';b';select 2"
+    assert split(script, backslashEscapes=True) == ["select 'a\\';b'", 'select 2']
+    assert split(script) == ["select 'a\\'", "b';select 2"]
+
+def test_delimiter_argument():
+    assert split('select 1; select 2//\nselect 3//', delimiter='//') == ['select 1; select 2', 'select 3']
+
+def test_delimiter_directive():
+    script = ('DELIMITER //\ncreate procedure p() begin select 1; select 2; end//\n'
+              'DELIMITER ;\nselect 3;')
+    assert split(script) == ['create procedure p() begin select 1; select 2; end', 'select 3']
+
+def test_word_delimiter_must_stand_on_its_own_line():
+    script = 'select 1; select 2\nGO\nselect category from ago\ngo\n'
+    assert split(script, delimiter='GO') == ['select 1; select 2', 'select category from ago']
+
+@pytest.mark.parametrize('batchSize, expected', [(1, [['a'], ['b'], ['c']]), (2, [['a', 'b'], ['c']]),
+                                                 (5, [['a', 'b', 'c']])])
+def test_batch_statements(batchSize, expected):
+    assert list(batch_statements(iter(['a', 'b', 'c']), batchSize)) == expected
+
+def test_execute_sql_script(library, tmp_path):
+    scriptPath = tmp_path / 'script.sql'
+    scriptPath.write_text("# fixtures\ndelete from person;\n"
+                          "insert into person values (3, 'Semi;colon', 'O''Brien');\n"
+                          "insert into person values (4, '/* no comment */', 'x') -- last one")
+    library.execute_sql_script(str(scriptPath))
+    assert library.query('select id, first_name, last_name from person order by id') == \
+        [(3, 'Semi;colon', "O'Brien"), (4, '/* no comment */', 'x')]
@@ -0,0 +1,121 @@
+#  Copyright (c) 2010 Franz Allan Valencia See
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import pytest
+
+from DatabaseLibrary.statement_cache import PreparedStatement, StatementCache, convert_placeholders
+
+class RecordingCursor(object):
+    """
+    A cursor recording the statements it executes, failing those starting
+    with one of `failing`.
+    """
+
+    def __init__(self, failing=()):
+        self.executed = []
+        self.failing = failing
+        self.connection = self
+
+    autocommit = False
+
+    def execute(self, operation, parameters=None):
+        self.executed.append((operation, parameters))
+        if operation.startswith(self.failing):
+            raise RuntimeError('refused')
+
+@pytest.mark.parametrize('paramstyle, expected', [
+    ('qmark', 'select * from t where a = ? and b = ?'),
+    ('numeric', 'select * from t where a = :1 and b = :2'),
+    ('named', 'select * from t where a = :p1 and b = :p2'),
+    ('format', 'select * from t where a = %s and b = %s'),
+    ('pyformat', 'select * from t where a = %s and b = %s'),
+    ('dollar', 'select * from t where a = $1 and b = $2'),
+])
+def test_positional_placeholders_are_converted(paramstyle, expected):
+    operation, names, namedParameters = convert_placeholders('select * from t where a = ? and b = ?', paramstyle)
+    assert operation == expected
+    assert names is None
+    assert namedParameters == (paramstyle == 'named')
+
+@pytest.mark.parametrize('paramstyle, expected, namedParameters', [
+    ('qmark', 'select * from t where a = ? or b = ? or a = ?', False),
+    ('named', 'select * from t where a = :a or b = :b or a = :a', True),
+    ('pyformat', 'select * from t where a = %(a)s or b = %(b)s or a = %(a)s', True),
+    ('format', 'select * from t where a = %s or b = %s or a = %s', False),
+])
+def test_named_placeholders_are_converted(paramstyle, expected, namedParameters):
+    operation, names, named = convert_placeholders('select * from t where a = :a or b = :b or a = :a', paramstyle)
+    assert operation == expected
+    assert names == ['a', 'b', 'a']
+    assert named == namedParameters
+
+def test_native_placeholders_are_left_alone():
+    sqlStatement = 'select * from t where a = %(a)s and b like \'x%%\''
+    assert convert_placeholders(sqlStatement, 'pyformat') == (sqlStatement, ['a'], True)
+
+def test_placeholders_in_quotes_comments_and_casts_are_left_alone():
+    sqlStatement = ("select '?', \"a:b\", $$ :c $$, x::int -- :d ?\n"
+                    "/* ? :e */ from t where a = :a")
+    operation, names, named = convert_placeholders(sqlStatement, 'qmark')
+    assert operation == sqlStatement.replace('a = :a', 'a = ?')
+    assert names == ['a']
+
+def test_percent_signs_are_escaped_for_format_styles():
+    assert convert_placeholders("select '5%' where a = ?", 'format')[0] == "select '5%%' where a = %s"
+    assert convert_placeholders("select '5%%' where a = %s", 'qmark')[0] == "select '5%' where a = ?"
+
+def test_statement_without_placeholders_is_unchanged():
+    assert convert_placeholders('select 1', 'named') == ('select 1', None, False)
+
+def test_bind_arranges_parameters_for_the_driver():
+    assert PreparedStatement('select :a, :b, :a', 'qmark').bind({'a': 1, 'b': 2}) == [1, 2, 1]
+    assert PreparedStatement('select ?, ?', 'named').bind([1, 2]) == {'p1': 1, 'p2': 2}
+    assert PreparedStatement(':a, :b, :a', 'named').bind([1, 2]) == {'a': 1, 'b': 2}
+    assert PreparedStatement('select :a', 'named').bind({'a': 1}) == {'a': 1}
+    with pytest.raises(ValueError, match='positional placeholders but got named parameters'):
+        PreparedStatement('select ?', 'qmark').bind({'a': 1})
+
+def test_server_side_statements_are_prepared_once():
+    cache = StatementCache('format', serverSide=True)
+    cur = RecordingCursor()
+    cache.execute(cur, 'select * from t where a = ?', [1])
+    cache.execute(cur, 'select * from t where a = ?', [2])
+    operations = [operation for operation, parameters in cur.executed]
+    name = operations[1].split()[1]
+    assert operations == ['SAVEPOINT dblib_prepare', 'PREPARE %s AS select * from t where a = $1' % name,
+                          'RELEASE SAVEPOINT dblib_prepare', 'EXECUTE %s (%%s)' % name, 'EXECUTE %s (%%s)' % name]
+    assert [parameters for operation, parameters in cur.executed[3:]] == [[1], [2]]
+
+def test_statements_the_server_refuses_to_prepare_are_executed_directly():
+    cache = StatementCache('format', serverSide=True)
+    cur = RecordingCursor(failing=('PREPARE',))
+    cache.execute(cur, 'select * from t where a = ?', [1])
+    assert cur.executed[-2][0] == 'ROLLBACK TO SAVEPOINT dblib_prepare'
+    assert cur.executed[-1] == ('select * from t where a = %s', [1])
+
+def test_evicted_statements_are_deallocated_on_the_next_plain_cursor():
+    cache = StatementCache('format', serverSide=True, maxSize=1)
+    cur = RecordingCursor()
+    cache.execute(cur, 'select * from t where a = ?', [1])
+    name = cur.executed[-1][0].split()[1]
+    cache.execute(cur, 'select * from t where b = ?', [1], prepare=False)
+    assert ('DEALLOCATE %s' % name, None) not in cur.executed
+    cache.execute(cur, 'select * from t where c = ?', [1])
+    assert ('DEALLOCATE %s' % name, None) in cur.executed
+
+def test_query_with_parameters(library):
+    assert library.query('select id from person where first_name = :name', parameters={'name': 'Jerry'}) == [(2,)]
+    assert library.query('select id from person where id > %s and id < %s', parameters=[0, 2]) == [(1,)]
+    library.execute_sql_string('insert into person values (?, ?, ?)', parameters=[3, "O'Brien", None])
+    assert library.query('select first_name, last_name from person where id = ?', parameters=[3]) == [("O'Brien", None)]
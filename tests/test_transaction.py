@@ -0,0 +1,138 @@
+#  Copyright (c) 2010 Franz Allan Valencia See
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import pytest
+
+from conftest import connect, run_suite
+
+def count_people(library, alias=None):
+    return library.query('select count(*) from person', alias=alias)[0][0]
+
+def test_rollback_isolated_test_undoes_every_change(library):
+    library.begin_isolated_test()
+    library.execute_sql_string('delete from person')
+    library.execute_sql_string("insert into person values (3, 'Isolated', 'Person')")
+    library.row_count_is_equal_to_x('select * from person', 1)
+    library.rollback_isolated_test()
+    assert library.query('select id from person order by id') == [(1,), (2,)]
+
+def test_isolated_tests_can_be_nested(library):
+    library.begin_isolated_test()
+    library.execute_sql_string("insert into person values (3, 'Outer', 'Person')")
+    library.begin_isolated_test()
+    library.execute_sql_string('delete from person')
+    assert count_people(library) == 0
+    library.rollback_isolated_test()
+    assert count_people(library) == 3
+    library.rollback_isolated_test()
+    assert count_people(library) == 2
+
+def test_changes_of_an_isolated_test_are_not_visible_to_other_connections(library, database):
+    connect(library, database, alias='other')
+    library.begin_isolated_test('default')
+    library.execute_sql_string('delete from person where id = 1', alias='default')
+    assert count_people(library, 'default') == 1
+    library.rollback_isolated_test('default')
+    assert count_people(library, 'other') == 2
+
+def test_rollback_isolated_test_without_one_fails(library):
+    with pytest.raises(RuntimeError, match="No isolated test to roll back on 'default'"):
+        library.rollback_isolated_test()
+
+def test_every_test_is_isolated_with_isolate_tests(tmp_path, database):
+    tests = run_suite(tmp_path, '''
+*** Settings ***
+Library    DatabaseLibrary    isolateTests=True    AS    Isolated
+Suite Setup    Isolated.Connect To Database Using Custom Params    sqlite3    database='${DATABASE}'
+Suite Teardown    Isolated.Disconnect From All Databases
+
+*** Test Cases ***
+Delete Everyone
+    Isolated.Execute Sql String    delete from person
+    Isolated.Row Count Is 0    select * from person
+
+Everyone Is Back
+    Isolated.Row Count Is Equal To X    select * from person    2
+''', DATABASE=database)
+    assert tests['Delete Everyone'].status == 'PASS', tests['Delete Everyone'].message
+    assert tests['Everyone Is Back'].status == 'PASS', tests['Everyone Is Back'].message
+
+def test_commit_transaction_keeps_the_changes(library, database):
+    connect(library, database, alias='other')
+    library.begin_transaction('default')
+    library.execute_sql_string("insert into person values (3, 'Committed', 'Person')", alias='default')
+    assert count_people(library, 'other') == 2
+    library.commit_transaction('default')
+    assert count_people(library, 'other') == 3
+
+def test_rollback_transaction_undoes_the_changes(library):
+    library.begin_transaction()
+    library.execute_sql_string('delete from person')
+    library.rollback_transaction()
+    assert count_people(library) == 2
+
+def test_begin_transaction_twice_fails(library):
+    library.begin_transaction()
+    with pytest.raises(RuntimeError, match="A transaction is already open on 'default'"):
+        library.begin_transaction()
+    library.rollback_transaction()
+
+def test_transaction_inside_an_isolated_test_is_rolled_back_with_it(library):
+    library.begin_isolated_test()
+    library.begin_transaction()
+    library.execute_sql_string('delete from person')
+    library.commit_transaction()
+    assert count_people(library) == 0
+    library.rollback_isolated_test()
+    assert count_people(library) == 2
+
+def test_transaction_cannot_end_before_the_isolated_test_begun_inside_it(library):
+    library.begin_transaction()
+    library.begin_isolated_test()
+    with pytest.raises(RuntimeError, match="Isolated test level 1 begun inside the transaction is still open on 'default'"):
+        library.commit_transaction()
+    with pytest.raises(RuntimeError, match="Isolated test level 1 begun inside the transaction is still open on 'default'"):
+        library.rollback_transaction()
+    library.execute_sql_string('delete from person')
+    library.rollback_isolated_test()
+    assert count_people(library) == 2
+    library.rollback_transaction()
+
+def test_isolated_test_cannot_end_before_the_transaction_begun_inside_it(library):
+    library.begin_isolated_test()
+    library.begin_transaction()
+    with pytest.raises(RuntimeError, match="A transaction begun inside isolated test level 1 is still open on 'default'"):
+        library.rollback_isolated_test()
+    library.rollback_transaction()
+    library.rollback_isolated_test()
+
+def test_transaction_left_open_by_an_isolated_test_is_rolled_back(tmp_path, database):
+    tests = run_suite(tmp_path, '''
+*** Settings ***
+Library    DatabaseLibrary    isolateTests=True    AS    Isolated
+Suite Setup    Isolated.Connect To Database Using Custom Params    sqlite3    database='${DATABASE}'
+Suite Teardown    Isolated.Disconnect From All Databases
+
+*** Test Cases ***
+Leave A Transaction Open
+    Isolated.Begin Transaction
+    Isolated.Execute Sql String    delete from person
+
+Everyone Is Back
+    Isolated.Row Count Is Equal To X    select * from person    2
+    Isolated.Begin Transaction
+    Isolated.Rollback Transaction
+''', DATABASE=database)
+    assert tests['Leave A Transaction Open'].status == 'PASS', tests['Leave A Transaction Open'].message
+    assert tests['Everyone Is Back'].status == 'PASS', tests['Everyone Is Back'].message
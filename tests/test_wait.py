@@ -0,0 +1,102 @@
+#  Copyright (c) 2010 Franz Allan Valencia See
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import sqlite3
+import threading
+
+import pytest
+
+from DatabaseLibrary.wait import _Probe
+
+def later(database, *sqlStatements):
+    """
+    Runs `sqlStatements` on a connection of its own after a short delay, as
+    a worker of the application under test would.
+    """
+    def run():
+        connection = sqlite3.connect(database)
+        for sqlStatement in sqlStatements:
+            connection.execute(sqlStatement)
+        connection.commit()
+        connection.close()
+    timer = threading.Timer(0.2, run)
+    timer.start()
+    return timer
+
+def test_wait_until_exists_sees_rows_committed_meanwhile(library, database):
+    timer = later(database, "insert into person values (3, 'Late', 'Comer')")
+    library.wait_until_exists_in_database('select id from person where id = 3', timeout='5 s')
+    timer.join()
+
+def test_wait_until_row_count_is(library, database):
+    timer = later(database, 'delete from person where id = 2')
+    library.wait_until_row_count_is('select id from person', 1, timeout=5)
+    timer.join()
+
+def test_wait_fails_after_the_timeout(library):
+    with pytest.raises(AssertionError, match=r"Expected at least one row from 'select id from person where id = 3' "
+                                             r"but got 0 rows after \d+ milliseconds?$"):
+        library.wait_until_exists_in_database('select id from person where id = 3', timeout=0.2)
+    with pytest.raises(AssertionError, match="Expected 5 rows to be returned from 'select id from person' but got 2 after"):
+        library.wait_until_row_count_is('select id from person', 5, timeout=0.2)
+
+def test_failing_probes_count_as_not_yet(library, database):
+    timer = later(database, 'create table city (id integer primary key)', 'insert into city values (1)')
+    library.wait_until_exists_in_database('select id from city', timeout=5)
+    timer.join()
+
+def test_last_error_is_reported(library):
+    with pytest.raises(AssertionError, match="but got 0 rows after .*, the last probe failed : no such table: city"):
+        library.wait_until_exists_in_database('select id from city', timeout=0.2)
+
+def test_channel_is_ignored_inside_an_isolated_test(library):
+    library._get_dialect().listen = lambda channel: 'LISTEN %s' % channel
+    library.begin_isolated_test()
+    library.execute_sql_string("insert into person values (3, 'Isolated', 'Person')")
+    library.wait_until_exists_in_database('select id from person where id = 3', timeout=1, channel='person_events')
+    library.rollback_isolated_test()
+
+class FakeCursor(object):
+    """
+    A cursor failing the statements in `failing`, and returning a single
+    row of 1 for the others.
+    """
+
+    def __init__(self, failing):
+        self.failing = set(failing)
+
+    def execute(self, sqlStatement):
+        if sqlStatement in self.failing:
+            raise RuntimeError('refused : %s' % sqlStatement)
+
+    def fetchone(self):
+        return (1,)
+
+    def rollback(self):
+        pass
+
+def run_probe(probe, cur):
+    return probe.run(cur, cur, None, None, lambda attempt: attempt())
+
+def test_probe_is_kept_while_the_select_fails_too():
+    probe = _Probe('select', lambda cur: cur.fetchone() is not None, 'exists', lambda cur: bool(cur.fetchone()[0]))
+    with pytest.raises(RuntimeError, match='refused : select'):
+        run_probe(probe, FakeCursor(['exists', 'select']))
+    assert probe.probeStatement == 'exists'
+    assert run_probe(probe, FakeCursor([])) is True
+
+def test_probe_is_dropped_once_the_select_succeeds_where_it_failed():
+    probe = _Probe('select', lambda cur: cur.fetchone() is not None, 'exists', lambda cur: bool(cur.fetchone()[0]))
+    assert run_probe(probe, FakeCursor(['exists'])) is True
+    assert probe.probeStatement is None